@@ -0,0 +1,153 @@
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.common import peak_rss_mb, percentiles_ms, run_isolated, write_results
+
+SUITE = "autofocus"
+METRICS = ("tenengrad", "laplacian")
+# golden: coarse sweep then golden-section (what autofocus() does);
+# sweep: every tolerance step across the range, as a baseline
+SEARCHES = ("golden", "sweep")
+MODES = ("rgb", "raw")
+SENSOR = (600, 800)
+TRIALS = 5
+QUICK_TRIALS = 2
+
+
+def _sample_image(path: Path) -> None:
+    from PyQt6.QtGui import QImage
+
+    rng = np.random.default_rng(0)
+    height, width = SENSOR
+    # Blobs of several sizes, so every metric has structure at every scale
+    image = np.zeros((height, width), np.float32)
+    for size in (2, 8, 32):
+        noise = rng.random((height // size + 1, width // size + 1), np.float32)
+        image += np.kron(noise, np.ones((size, size), np.float32))[:height, :width]
+    rgb = np.repeat((image * 255 / 3).astype(np.uint8)[..., None], 3, axis=-1)
+    QImage(rgb.tobytes(), width, height, width * 3, QImage.Format.Format_RGB888).save(
+        str(path)
+    )
+
+
+def _sweep(evaluate, lo: float, hi: float, tolerance: float):
+    steps = np.arange(lo, hi + tolerance / 2, tolerance)
+    scores = [evaluate(float(z)) for z in steps]
+    best = int(np.argmax(scores))
+    return float(steps[best]), scores[best]
+
+
+def run_case(metric: str, search: str, mode: str, trials: int) -> dict:
+    from config import AUTOFOCUS_RANGE_UM, AUTOFOCUS_TOLERANCE_UM
+    from devices.camera.autofocus import focus_image, search_focus, settled_frame, sharpness
+    from devices.camera.dummy_camera import DummyCamera
+    from devices.motors.dummy_motor_controller import DummyMotorController
+
+    workdir = Path(tempfile.mkdtemp(prefix="autofocus-bench-"))
+    _sample_image(workdir / "sample.png")
+
+    camera = DummyCamera(workdir / "sample.png")
+    camera.connect()
+    camera.set_raw_mode(mode == "raw")
+    motors = DummyMotorController(settle_time_s=0)
+    motors.connect()
+    camera.attach_stage(motors)
+    stream = camera.start_stream()
+
+    rng = np.random.default_rng(1)
+    lo, hi = -AUTOFOCUS_RANGE_UM, AUTOFOCUS_RANGE_UM
+    frames, durations, errors, metric_s = [], [], [], []
+    for _ in range(trials):
+        camera.focus_z = float(rng.uniform(0.8 * lo, 0.8 * hi))
+        motors.move_z(0.0)
+        count = 0
+
+        def evaluate(z: float) -> float:
+            nonlocal count
+            motors.move_z(z)
+            frame = settled_frame(stream)
+            t0 = time.perf_counter()
+            value = sharpness(focus_image(frame), metric)
+            metric_s.append(time.perf_counter() - t0)
+            frame.release()
+            count += 1
+            return value
+
+        t0 = time.perf_counter()
+        if search == "golden":
+            z, _ = search_focus(evaluate, lo, hi)
+        else:
+            z, _ = _sweep(evaluate, lo, hi, AUTOFOCUS_TOLERANCE_UM)
+        durations.append(time.perf_counter() - t0)
+        frames.append(count)
+        errors.append(abs(z - camera.focus_z))
+
+    camera.stop_stream()
+    return {
+        "name": f"{metric}_{search}_{mode}",
+        "metric": metric,
+        "search": search,
+        "mode": mode,
+        "width": SENSOR[1],
+        "height": SENSOR[0],
+        "stream_fps": camera.stream_fps,
+        "trials": trials,
+        "frames_mean": float(np.mean(frames)),
+        "focus_ms": percentiles_ms(durations),
+        "metric_ms": percentiles_ms(metric_s),
+        "error_um_mean": float(np.mean(errors)),
+        "error_um_max": float(np.max(errors)),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Frames, time and accuracy of autofocus on the dummy camera."
+    )
+    parser.add_argument("--metrics", nargs="+", default=list(METRICS))
+    parser.add_argument("--searches", nargs="+", default=list(SEARCHES))
+    parser.add_argument("--modes", nargs="+", default=list(MODES))
+    parser.add_argument("--trials", type=int, default=TRIALS)
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--output", default=f"{SUITE}.json")
+    parser.add_argument("--single", nargs=3, metavar=("METRIC", "SEARCH", "MODE"))
+    args = parser.parse_args(argv)
+
+    if args.single:
+        from loguru import logger
+
+        logger.remove()
+        print(json.dumps(run_case(*args.single, args.trials)))
+        return 0
+
+    trials = QUICK_TRIALS if args.quick else args.trials
+    results = []
+    for metric in args.metrics:
+        for search in args.searches:
+            for mode in args.modes:
+                result = run_isolated(
+                    "benchmarks.autofocus",
+                    ["--single", metric, search, mode, "--trials", str(trials)],
+                )
+                results.append(result)
+                print(
+                    f"{result['name']:>22}  {result['frames_mean']:6.1f} frames  "
+                    f"p50 {result['focus_ms']['p50']:7.0f} ms  "
+                    f"metric {result['metric_ms']['p50']:5.2f} ms  "
+                    f"error mean {result['error_um_mean']:5.2f} "
+                    f"max {result['error_um_max']:5.2f} um"
+                )
+
+    write_results(args.output, SUITE, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
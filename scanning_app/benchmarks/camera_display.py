@@ -0,0 +1,147 @@
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.common import peak_rss_mb, percentiles_ms, run_isolated, write_results
+
+SUITE = "camera_display"
+SENSORS = {
+    "5MP": (1944, 2592),
+    "20MP": (3648, 5472),
+}
+LAYOUTS = ("mono", "rgb", "rgbx", "qimage")
+# Raw Bayer frames developed for display by each method
+RAW_LAYOUTS = ("bayer_bilinear", "bayer_superpixel", "bayer_luminance")
+FRAMES = 30
+QUICK_FRAMES = 8
+MB = 2**20
+
+
+def make_frames(layout: str, shape: tuple[int, int], count: int = 2):
+    height, width = shape
+    rng = np.random.default_rng(0)
+    if layout in RAW_LAYOUTS:
+        from devices.camera.frame_buffer import Frame
+
+        return [
+            Frame(
+                rng.integers(0, 256, shape, dtype=np.uint8), seq, 0.0, 0, bayer="RGGB"
+            )
+            for seq in range(count)
+        ]
+
+    channels = {"mono": None, "rgb": 3, "rgbx": 4, "qimage": 4}[layout]
+    full = (height, width) if channels is None else (height, width, channels)
+    frames = [rng.integers(0, 256, full, dtype=np.uint8) for _ in range(count)]
+
+    if layout != "qimage":
+        return frames
+
+    from PyQt6.QtGui import QImage
+
+    # Legacy input: a 32-bit QImage as produced by QImage(path) / capture().
+    return [
+        QImage(f.data, width, height, width * 4, QImage.Format.Format_RGB32).copy()
+        for f in frames
+    ]
+
+
+def run_case(sensor: str, layout: str, frames: int) -> dict:
+    from PyQt6.QtWidgets import QApplication
+
+    app = QApplication(sys.argv[:1])
+
+    from ui.camera_view_widget import CameraViewWidget
+
+    widget = CameraViewWidget()
+    if layout in RAW_LAYOUTS:
+        widget.raw_display = layout.split("_", 1)[1]
+    widget.resize(800, 600)
+    widget.show()
+    app.processEvents()
+
+    images = make_frames(layout, SENSORS[sensor])
+    viewport = widget.plot.viewport()
+
+    # Warm-up: first frame sets the view range and builds the render path.
+    widget.set_image(images[0])
+    viewport.repaint()
+
+    set_samples, frame_samples = [], []
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+
+    for i in range(frames):
+        image = images[i % len(images)]
+        t0 = time.perf_counter()
+        widget.set_image(image)
+        t1 = time.perf_counter()
+        viewport.repaint()
+        t2 = time.perf_counter()
+        set_samples.append(t1 - t0)
+        frame_samples.append(t2 - t0)
+
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    height, width = SENSORS[sensor]
+    return {
+        "name": f"{sensor}_{layout}",
+        "sensor": sensor,
+        "layout": layout,
+        "width": width,
+        "height": height,
+        "frames": frames,
+        "set_image_ms": percentiles_ms(set_samples),
+        "frame_ms": percentiles_ms(frame_samples),
+        "python_alloc_mb": (peak - before) / MB,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Time CameraViewWidget.set_image plus repaint for large frames."
+    )
+    parser.add_argument("--sensors", nargs="+", default=list(SENSORS))
+    parser.add_argument("--layouts", nargs="+", default=list(LAYOUTS + RAW_LAYOUTS))
+    parser.add_argument("--frames", type=int, default=FRAMES)
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--output", default=f"{SUITE}.json")
+    parser.add_argument("--single", nargs=2, metavar=("SENSOR", "LAYOUT"))
+    args = parser.parse_args(argv)
+
+    if args.single:
+        from loguru import logger
+
+        logger.remove()
+        print(json.dumps(run_case(*args.single, args.frames)))
+        return 0
+
+    frames = QUICK_FRAMES if args.quick else args.frames
+    results = []
+    for sensor in args.sensors:
+        for layout in args.layouts:
+            result = run_isolated(
+                "benchmarks.camera_display",
+                ["--single", sensor, layout, "--frames", str(frames)],
+            )
+            results.append(result)
+            print(
+                f"{result['name']:>21}  set_image p50 {result['set_image_ms']['p50']:7.2f} ms  "
+                f"frame p50 {result['frame_ms']['p50']:7.2f} ms  "
+                f"p95 {result['frame_ms']['p95']:7.2f} ms  "
+                f"alloc {result['python_alloc_mb']:7.1f} MB"
+            )
+
+    write_results(args.output, SUITE, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
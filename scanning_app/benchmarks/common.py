@@ -0,0 +1,83 @@
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+SCANNING_APP_DIR = Path(__file__).resolve().parents[1]
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_rss_mb() -> float | None:
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+    try:
+        import psutil
+    except ImportError:
+        return None
+
+    info = psutil.Process().memory_info()
+    return getattr(info, "peak_wset", info.rss) / 2**20
+
+
+def percentiles_ms(samples_s) -> dict:
+    if not len(samples_s):
+        return {"p50": None, "p95": None, "max": None}
+
+    ms = np.asarray(samples_s) * 1e3
+    return {
+        "p50": float(np.percentile(ms, 50)),
+        "p95": float(np.percentile(ms, 95)),
+        "max": float(ms.max()),
+    }
+
+
+def environment_meta() -> dict:
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "numpy": np.__version__,
+    }
+
+
+def run_isolated(module: str, args: list[str]) -> dict:
+    # Each configuration runs in a fresh interpreter so peak RSS is per-case.
+    proc = subprocess.run(
+        [sys.executable, "-m", module, *args],
+        cwd=SCANNING_APP_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{module} {' '.join(args)} failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def write_results(path: Path, suite: str, results: list[dict]) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"suite": suite, "meta": environment_meta(), "results": results}
+    path.write_text(json.dumps(payload, indent=2))
+
+
+class Stopwatch:
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self._start
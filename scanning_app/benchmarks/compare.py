@@ -0,0 +1,106 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from benchmarks.common import BASELINE_DIR
+
+# +1: higher is better, -1: lower is better
+METRIC_DIRECTIONS = {
+    "points_per_s": +1,
+    "alloc_bytes_per_point": -1,
+    "alloc_blocks_per_point": -1,
+    "peak_rss_mb": -1,
+    "signal_latency_ms.p95": -1,
+    "save_s": -1,
+    "open_s": -1,
+    "first_heatmap_s": -1,
+    "random_access_ms.p50": -1,
+    "save_peak_rss_mb": -1,
+    "open_peak_rss_mb": -1,
+}
+
+
+def _lookup(result: dict, metric: str):
+    value = result
+    for key in metric.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list[dict]:
+    baseline_by_name = {r["name"]: r for r in baseline["results"]}
+    rows = []
+
+    for result in current["results"]:
+        reference = baseline_by_name.get(result["name"])
+        if reference is None:
+            continue
+
+        for metric, direction in METRIC_DIRECTIONS.items():
+            old = _lookup(reference, metric)
+            new = _lookup(result, metric)
+            if old is None or new is None or old == 0:
+                continue
+
+            change = (new - old) / abs(old)
+            rows.append(
+                {
+                    "name": result["name"],
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "change": change,
+                    "regression": change * direction < -tolerance,
+                }
+            )
+
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Flag benchmark regressions against a stored baseline."
+    )
+    parser.add_argument("current")
+    parser.add_argument(
+        "--baseline",
+        help="Baseline JSON (default: baselines/<suite>.json)",
+    )
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store the current results as the new baseline",
+    )
+    args = parser.parse_args(argv)
+
+    current = json.loads(Path(args.current).read_text())
+    baseline_path = Path(args.baseline or BASELINE_DIR / f"{current['suite']}.json")
+
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(current, indent=2))
+        print(f"Baseline updated: {baseline_path}")
+        return 0
+
+    baseline = json.loads(baseline_path.read_text())
+    rows = compare(baseline, current, args.tolerance)
+
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else "ok"
+        print(
+            f"{row['name']:<28} {row['metric']:<26} "
+            f"{row['baseline']:>12.4g} -> {row['current']:>12.4g} "
+            f"({row['change']:+7.1%})  {flag}"
+        )
+
+    regressions = [row for row in rows if row["regression"]]
+    print(f"{len(regressions)} regression(s) out of {len(rows)} comparisons")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
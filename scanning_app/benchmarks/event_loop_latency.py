@@ -0,0 +1,130 @@
+import argparse
+import json
+import sys
+import time
+
+from benchmarks.common import percentiles_ms, run_isolated, write_results
+
+SUITE = "event_loop_latency"
+FRAME_BUDGET_MS = 16.0
+TICK_MS = 1
+SETTLE_MS = 500
+SLOW_CAMERA = "Slow Dummy Camera"
+
+
+def probe(delay_s: float) -> dict:
+    from PyQt6.QtCore import Qt, QTimer
+    from PyQt6.QtWidgets import QApplication
+
+    import config
+
+    config.SLOW_DUMMY_DEVICE_DELAY_SEC = delay_s
+
+    app = QApplication(sys.argv[:1])
+
+    from ui.main_window import MainWindow
+
+    window = MainWindow()
+    window.show()
+
+    ticks: list[float] = []
+    marks: dict[str, float] = {}
+
+    timer = QTimer()
+    timer.setTimerType(Qt.TimerType.PreciseTimer)
+    timer.timeout.connect(lambda: ticks.append(time.perf_counter()))
+
+    def camera_listed() -> bool:
+        combo = window.sidebar.cam_conn.combo
+        return combo.findText(SLOW_CAMERA) >= 0
+
+    def wait_for_plots():
+        # Measure only once the deferred plot widgets have been built and
+        # painted, so their one-off cost is not counted against the drivers.
+        if window.heatmap_widget is None:
+            QTimer.singleShot(5, wait_for_plots)
+            return
+        QTimer.singleShot(SETTLE_MS, start)
+
+    def start():
+        timer.start(TICK_MS)
+        marks["start"] = time.perf_counter()
+        window._populate_device_lists(max_age_s=0.0)
+        wait_for_enumeration()
+
+    def wait_for_enumeration():
+        if not camera_listed():
+            QTimer.singleShot(TICK_MS, wait_for_enumeration)
+            return
+        marks["enumerated"] = time.perf_counter()
+        window._connect_camera(SLOW_CAMERA)
+        wait_for_connection()
+
+    def wait_for_connection():
+        if window.controller.camera is None:
+            QTimer.singleShot(TICK_MS, wait_for_connection)
+            return
+        marks["connected"] = time.perf_counter()
+        window._disconnect_camera()
+        QTimer.singleShot(int(delay_s * 1000) + 100, finish)
+
+    def finish():
+        timer.stop()
+        marks["finished"] = time.perf_counter()
+        window.close()
+        app.quit()
+
+    QTimer.singleShot(0, wait_for_plots)
+    app.exec()
+
+    gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+    return {
+        "name": "slow_camera",
+        "driver_delay_s": delay_s,
+        "enumerate_s": marks["enumerated"] - marks["start"],
+        "connect_s": marks["connected"] - marks["enumerated"],
+        "ticks": len(ticks),
+        "gap_ms": percentiles_ms(gaps),
+        "max_gap_ms": max(gaps) * 1000 if gaps else None,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Check that the GUI event loop keeps running while a slow device "
+            "driver is enumerated, connected and disconnected."
+        )
+    )
+    parser.add_argument("--delay-s", type=float, default=2.0)
+    parser.add_argument("--budget-ms", type=float, default=FRAME_BUDGET_MS)
+    parser.add_argument("--output", default=f"{SUITE}.json")
+    parser.add_argument("--single", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.single:
+        from loguru import logger
+
+        logger.remove()
+        print(json.dumps(probe(args.delay_s)))
+        return 0
+
+    result = run_isolated(
+        "benchmarks.event_loop_latency", ["--single", "--delay-s", str(args.delay_s)]
+    )
+    write_results(args.output, SUITE, [result])
+
+    print(
+        f"enumerate {result['enumerate_s']:.2f} s, connect {result['connect_s']:.2f} s, "
+        f"{result['ticks']} ticks, gap p95 {result['gap_ms']['p95']:.2f} ms, "
+        f"max {result['max_gap_ms']:.2f} ms"
+    )
+
+    if result["max_gap_ms"] is None or result["max_gap_ms"] > args.budget_ms:
+        print(f"FAIL: event loop stalled longer than {args.budget_ms:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import peak_rss_mb, percentiles_ms, run_isolated, write_results
+
+SUITE = "frame_stacking"
+SENSORS = {
+    "1MP": (960, 1280),
+    "5MP": (1944, 2592),
+    "20MP": (3648, 5472),
+}
+LAYOUTS = ("rgbx", "bayer")
+# none: plain sum; integer: whole-pixel alignment; subpixel: bilinear alignment
+MODES = ("none", "integer", "subpixel")
+FRAMES = 16
+QUICK_FRAMES = 6
+
+
+def make_frames(layout: str, shape: tuple[int, int], count: int):
+    """Textured frames drifting by random sub-pixel offsets, with noise."""
+    height, width = shape
+    rng = np.random.default_rng(0)
+    margin = 8
+    scene = rng.integers(0, 256, (height + 2 * margin, width + 2 * margin), np.uint8)
+
+    frames = []
+    for _ in range(count):
+        dy, dx = rng.integers(-margin // 2, margin // 2 + 1, 2)
+        view = scene[margin + dy : margin + dy + height, margin + dx : margin + dx + width]
+        noisy = view + rng.integers(0, 8, view.shape, dtype=np.uint8)
+        if layout == "rgbx":
+            noisy = np.repeat(noisy[..., None], 4, axis=-1)
+        frames.append(np.ascontiguousarray(noisy))
+    return frames
+
+
+def run_case(sensor: str, layout: str, mode: str, frames: int) -> dict:
+    from devices.camera.stacking import FrameStacker
+
+    images = make_frames(layout, SENSORS[sensor], frames)
+    stacker = FrameStacker(
+        images[0].shape,
+        images[0].dtype,
+        align=mode != "none",
+        integer_shifts=mode == "integer",
+        shift_step=2 if layout == "bayer" and mode != "none" else 1,
+    )
+
+    samples = []
+    for image in images:
+        t0 = time.perf_counter()
+        stacker.add(image)
+        samples.append(time.perf_counter() - t0)
+
+    # The first aligned frame only sets the reference.
+    add_ms = percentiles_ms(samples[1:])
+    height, width = SENSORS[sensor]
+    return {
+        "name": f"{sensor}_{layout}_{mode}",
+        "sensor": sensor,
+        "layout": layout,
+        "mode": mode,
+        "width": width,
+        "height": height,
+        "frames": frames,
+        "add_ms": add_ms,
+        "max_fps": 1e3 / add_ms["p50"],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Time FrameStacker.add per frame, with and without alignment."
+    )
+    parser.add_argument("--sensors", nargs="+", default=list(SENSORS))
+    parser.add_argument("--layouts", nargs="+", default=list(LAYOUTS))
+    parser.add_argument("--modes", nargs="+", default=list(MODES))
+    parser.add_argument("--frames", type=int, default=FRAMES)
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--output", default=f"{SUITE}.json")
+    parser.add_argument("--single", nargs=3, metavar=("SENSOR", "LAYOUT", "MODE"))
+    args = parser.parse_args(argv)
+
+    if args.single:
+        from loguru import logger
+
+        logger.remove()
+        print(json.dumps(run_case(*args.single, args.frames)))
+        return 0
+
+    frames = QUICK_FRAMES if args.quick else args.frames
+    results = []
+    for sensor in args.sensors:
+        for layout in args.layouts:
+            for mode in args.modes:
+                result = run_isolated(
+                    "benchmarks.frame_stacking",
+                    ["--single", sensor, layout, mode, "--frames", str(frames)],
+                )
+                results.append(result)
+                print(
+                    f"{result['name']:>22}  add p50 {result['add_ms']['p50']:7.2f} ms  "
+                    f"p95 {result['add_ms']['p95']:7.2f} ms  "
+                    f"({result['max_fps']:6.1f} fps)  "
+                    f"rss {result['peak_rss_mb']:7.1f} MB"
+                )
+
+    write_results(args.output, SUITE, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import peak_rss_mb, percentiles_ms, run_isolated, write_results
+
+SUITE = "mosaic_pyramid"
+FIELD = (480, 640)
+OVERLAP = 0.1
+# Fields per side; 40 x 40 fields of 640 x 480 is roughly half a gigapixel
+GRIDS = {
+    "4x4": 4,
+    "16x16": 16,
+    "40x40": 40,
+}
+CACHE_MB = 64
+SCREEN = (1080, 1920)
+VIEWS = 200
+
+
+def run_case(grid: str, cache_mb: int) -> dict:
+    from devices.camera.stage_mosaic import TilePyramid
+
+    side = GRIDS[grid]
+    height, width = FIELD
+    step_y, step_x = int(height * (1 - OVERLAP)), int(width * (1 - OVERLAP))
+    feather = int(min(FIELD) * OVERLAP)
+    rng = np.random.default_rng(0)
+    field = rng.integers(0, 256, (height, width, 4), np.uint8)
+
+    pyramid = TilePyramid(cache_bytes=cache_mb * 2**20)
+    paste = []
+    for row in range(side):
+        for col in range(side):
+            t0 = time.perf_counter()
+            pyramid.paste(field, col * step_x, row * step_y, feather)
+            paste.append(time.perf_counter() - t0)
+
+    # Random viewports of a 1080p view, from full zoom to the whole mosaic,
+    # fetching the tiles a redraw would draw.
+    x, y, w, h = pyramid.bounds()
+    screen_h, screen_w = SCREEN
+    fetch = []
+    tiles_per_view = []
+    for _ in range(VIEWS):
+        scale = 2 ** rng.uniform(0, np.log2(max(1.0, w / screen_w)) + 1)
+        vw, vh = screen_w * scale, screen_h * scale
+        vx = x + rng.uniform(0, max(0.0, w - vw))
+        vy = y + rng.uniform(0, max(0.0, h - vh))
+
+        t0 = time.perf_counter()
+        level = pyramid.level_for(scale)
+        visible = pyramid.visible_tiles(level, vx, vy, vx + vw, vy + vh)
+        for key, _ in visible:
+            pyramid.tile(key)
+        fetch.append(time.perf_counter() - t0)
+        tiles_per_view.append(len(visible))
+
+    result = {
+        "name": f"{grid}_{cache_mb}MB",
+        "grid": grid,
+        "fields": side * side,
+        "mosaic_mpix": w * h / 1e6,
+        "tiles": len(pyramid),
+        "levels": pyramid.top_level + 1,
+        "cache_mb": cache_mb,
+        "paste_ms": percentiles_ms(paste),
+        "view_fetch_ms": percentiles_ms(fetch),
+        "tiles_per_view_max": int(max(tiles_per_view)),
+        "tiles_spilled": pyramid.tiles_spilled,
+        "tiles_loaded": pyramid.tiles_loaded,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    pyramid.close()
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Time TilePyramid pastes and viewport tile fetches."
+    )
+    parser.add_argument("--grids", nargs="+", default=list(GRIDS))
+    parser.add_argument("--cache-mb", type=int, default=CACHE_MB)
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--output", default=f"{SUITE}.json")
+    parser.add_argument("--single", metavar="GRID")
+    args = parser.parse_args(argv)
+
+    if args.single:
+        from loguru import logger
+
+        logger.remove()
+        print(json.dumps(run_case(args.single, args.cache_mb)))
+        return 0
+
+    grids = args.grids[:2] if args.quick else args.grids
+    results = []
+    for grid in grids:
+        result = run_isolated(
+            "benchmarks.mosaic_pyramid",
+            ["--single", grid, "--cache-mb", str(args.cache_mb)],
+        )
+        results.append(result)
+        print(
+            f"{result['name']:>14}  {result['mosaic_mpix']:7.1f} MP  "
+            f"paste p50 {result['paste_ms']['p50']:6.1f} ms  "
+            f"view p95 {result['view_fetch_ms']['p95']:6.2f} ms  "
+            f"({result['tiles_per_view_max']} tiles)  "
+            f"rss {result['peak_rss_mb']:7.1f} MB"
+        )
+
+    write_results(args.output, SUITE, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
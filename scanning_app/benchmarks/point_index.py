@@ -0,0 +1,108 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import percentiles_ms, write_results
+
+SUITE = "point_index"
+# full: every node of a square grid; masked: 10 % of the nodes
+LAYOUTS = ("full", "masked")
+SIZES = (10**4, 10**5, 10**6)
+QUICK_SIZES = (10**4, 10**5)
+QUERIES = 2000
+QUICK_QUERIES = 200
+# Hover and click must answer within this
+BUDGET_MS = 1.0
+
+
+def _points(layout: str, size: int, rng):
+    from devices.scan_grid import ScanGrid
+
+    side = int(np.sqrt(size / (0.1 if layout == "masked" else 1.0)))
+    grid = ScanGrid.from_roi(0, 0, side, side, 1.0, 1.0)
+    nodes = np.ones(grid.shape, dtype=bool)
+    if layout == "masked":
+        nodes = rng.random(grid.shape) < 0.1
+    rows, cols = np.nonzero(nodes)
+    return grid.x(cols), grid.y(rows), grid
+
+
+def _time(query, probes) -> dict:
+    samples = []
+    for x, y in probes:
+        t0 = time.perf_counter()
+        query(x, y)
+        samples.append(time.perf_counter() - t0)
+    return percentiles_ms(samples)
+
+
+def run_case(layout: str, size: int, queries: int) -> dict:
+    from devices.point_index import GridPointIndex
+
+    rng = np.random.default_rng(0)
+    xs, ys, grid = _points(layout, size, rng)
+
+    # As the heatmap fills it: the node of each point gets its id
+    t0 = time.perf_counter()
+    rows, cols, _ = grid.indices(xs, ys)
+    ids = np.full(grid.shape, -1, dtype=np.intp)
+    ids[rows, cols] = np.arange(len(xs))
+    index = GridPointIndex(grid, ids)
+    build_s = time.perf_counter() - t0
+
+    span = float(max(xs.max(), ys.max()))
+    probes = rng.uniform(0, span, (queries, 2))
+
+    def hover(x, y):
+        node = grid.index(x, y)
+        return None if node is None else index.at(*node)
+
+    timings = {
+        "at_ms": _time(hover, probes),
+        "nearest_ms": _time(index.nearest, probes),
+    }
+    return {
+        "name": f"{layout}/{len(xs)}",
+        "layout": layout,
+        "points": int(len(xs)),
+        "build_s": build_s,
+        "queries": queries,
+        **timings,
+        "within_budget": all(t["p95"] <= BUDGET_MS for t in timings.values()),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Build time, and point-at-node (hover) and nearest-point "
+        "(click) query latency of the scan point index."
+    )
+    parser.add_argument("--layouts", nargs="+", default=list(LAYOUTS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES))
+    parser.add_argument("--queries", type=int, default=QUERIES)
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--output", default=f"{SUITE}.json")
+    args = parser.parse_args(argv)
+
+    sizes = QUICK_SIZES if args.quick else args.sizes
+    queries = QUICK_QUERIES if args.quick else args.queries
+    results = []
+    for layout in args.layouts:
+        for size in sizes:
+            result = run_case(layout, size, queries)
+            results.append(result)
+            print(
+                f"{result['name']:>18}  "
+                f"build {result['build_s'] * 1e3:7.1f} ms  p95 "
+                f"at {result['at_ms']['p95']:.3f} ms  "
+                f"nearest {result['nearest_ms']['p95']:.3f} ms"
+            )
+
+    write_results(args.output, SUITE, results)
+    return 0 if all(r["within_budget"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
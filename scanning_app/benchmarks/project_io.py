@@ -0,0 +1,245 @@
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+from benchmarks.common import (
+    Stopwatch,
+    peak_rss_mb,
+    percentiles_ms,
+    run_isolated,
+    write_results,
+)
+
+SUITE = "project_io"
+MB = 2**20
+DEFAULT_SIZES_MB = [1, 10, 100, 1024, 10240]
+QUICK_SIZES_MB = [1, 10]
+CHANNELS = 1024
+# Compressed bytes per spectral value in the current CSV-in-zip layout
+FILE_BYTES_PER_VALUE = 17
+RANDOM_ACCESS_SAMPLES = 50
+IN_MEMORY_FACTOR = 4
+
+
+def grid_side_for_size(size_mb: float, channels: int = CHANNELS) -> int:
+    values = size_mb * MB / FILE_BYTES_PER_VALUE
+    return max(2, int(round(np.sqrt(values / channels))))
+
+
+def make_synthetic_scan(side: int, channels: int = CHANNELS, seed: int = 0):
+    import pandas as pd
+
+    from config import SPECTRUM_WAVELENGTH_END, SPECTRUM_WAVELENGTH_START
+    from devices.spectrometer.virtual_sample import VirtualSample
+
+    raman_shifts = np.linspace(
+        SPECTRUM_WAVELENGTH_START, SPECTRUM_WAVELENGTH_END, channels
+    )
+    sample = VirtualSample.procedural(raman_shifts, shape=(side, side), seed=seed)
+    rng = np.random.default_rng(seed)
+
+    ys, xs = np.indices((side, side)).reshape(2, -1).astype(float)
+    intensities = sample.add_noise(sample.spectra_at(xs, ys), rng)
+
+    spectra_df = pd.DataFrame(
+        {
+            "x": np.repeat(xs, channels),
+            "y": np.repeat(ys, channels),
+            "wavenumber_cm1": np.tile(raman_shifts, side * side),
+            "intensity": intensities.ravel().astype(float),
+        }
+    )
+
+    left, right = 900.0, 1100.0
+    band = (raman_shifts >= left) & (raman_shifts <= right)
+    heatmap_grid = intensities[:, band].sum(axis=1).reshape(side, side).astype(float)
+
+    scan_meta = {
+        "num_points": side * side,
+        "step_size_x": 1.0,
+        "step_size_y": 1.0,
+        "roi": (0.0, 0.0, float(side), float(side)),
+    }
+    spectrometer_meta = {
+        "integration_time_ms": 500,
+        "averages": 1,
+        "excitation_wavelength_nm": 535,
+    }
+    return scan_meta, spectrometer_meta, (left, right), spectra_df, heatmap_grid
+
+
+def run_save(size_mb: float, path: Path) -> dict:
+    from project_io.save_project import Raman2DScanWriter
+
+    side = grid_side_for_size(size_mb)
+    scan_meta, spec_meta, bounds, spectra_df, grid = make_synthetic_scan(side)
+
+    with Stopwatch() as sw:
+        Raman2DScanWriter().write(
+            path=path,
+            scan_meta=scan_meta,
+            spectrometer_meta=spec_meta,
+            heatmap_bounds=bounds,
+            spectra_df=spectra_df,
+            heatmap_grid=grid,
+        )
+
+    return {
+        "grid": [side, side],
+        "channels": CHANNELS,
+        "uncompressed_mb": float(spectra_df.memory_usage(index=False).sum() / MB),
+        "file_size_mb": path.stat().st_size / MB,
+        "save_s": sw.elapsed,
+        "save_peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _render_heatmap(grid: np.ndarray) -> None:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    fig.add_subplot(111).imshow(grid, origin="lower", aspect="auto")
+    fig.canvas.draw()
+
+
+def run_open(path: Path) -> dict:
+    from project_io.load_project import Raman2DScanReader
+
+    # Import the plotting stack up front so it is not billed to the open path.
+    import matplotlib.backends.backend_agg  # noqa: F401
+
+    start = time.perf_counter()
+    scan = Raman2DScanReader().read(path)
+    open_s = time.perf_counter() - start
+
+    _render_heatmap(scan.heatmap_grid)
+    first_heatmap_s = time.perf_counter() - start
+
+    df = scan.spectra_df
+    x0, y0, w, h = scan.scan_meta["roi"]
+    rng = np.random.default_rng(0)
+    samples = []
+    for x, y in zip(
+        rng.integers(0, int(w), RANDOM_ACCESS_SAMPLES),
+        rng.integers(0, int(h), RANDOM_ACCESS_SAMPLES),
+    ):
+        t0 = time.perf_counter()
+        rows = df[(df["x"] == x0 + x) & (df["y"] == y0 + y)]
+        rows["intensity"].to_numpy(float)
+        samples.append(time.perf_counter() - t0)
+
+    return {
+        "open_s": open_s,
+        "first_heatmap_s": first_heatmap_s,
+        "random_access_ms": percentiles_ms(samples),
+        "open_peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def scaling_exponents(results: list[dict], metrics: list[str]) -> dict:
+    exponents = {}
+    sizes = np.array([r["file_size_mb"] for r in results])
+    if len(results) < 2 or np.ptp(np.log(sizes)) == 0:
+        return exponents
+
+    for metric in metrics:
+        values = np.array([r[metric] for r in results])
+        if np.all(values > 0):
+            exponents[metric] = float(np.polyfit(np.log(sizes), np.log(values), 1)[0])
+    return exponents
+
+
+def scaling_report(results: list[dict]) -> str:
+    lines = [
+        "| target | grid | file MB | save s | open s | first heatmap s "
+        "| random access p50 ms | save RSS MB | open RSS MB |",
+        "|---|---|---|---|---|---|---|---|---|",
+    ]
+    for r in results:
+        lines.append(
+            f"| {r['name']} | {r['grid'][0]}x{r['grid'][1]} | {r['file_size_mb']:.1f} "
+            f"| {r['save_s']:.2f} | {r['open_s']:.2f} | {r['first_heatmap_s']:.2f} "
+            f"| {r['random_access_ms']['p50']:.2f} | {r['save_peak_rss_mb'] or 0:.0f} "
+            f"| {r['open_peak_rss_mb'] or 0:.0f} |"
+        )
+
+    exponents = scaling_exponents(results, ["save_s", "open_s", "first_heatmap_s"])
+    if exponents:
+        lines.append("")
+        lines.append("Scaling exponents (time ~ size^k):")
+        lines.extend(f"- {metric}: k = {k:.2f}" for metric, k in exponents.items())
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Time Raman2DScanWriter/Raman2DScanReader on synthetic projects."
+    )
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=DEFAULT_SIZES_MB)
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--memory-limit-gb", type=float, default=8.0)
+    parser.add_argument("--workdir", help="Directory for generated projects")
+    parser.add_argument("--output", default=f"{SUITE}.json")
+    parser.add_argument("--report", help="Write the markdown scaling report here")
+    parser.add_argument("--single", nargs=2, metavar=("PHASE", "ARG"))
+    parser.add_argument("--path")
+    args = parser.parse_args(argv)
+
+    if args.single:
+        logger.remove()
+        phase, value = args.single
+        if phase == "save":
+            result = run_save(float(value), Path(args.path))
+        else:
+            result = run_open(Path(args.path))
+        print(json.dumps(result))
+        return 0
+
+    sizes = QUICK_SIZES_MB if args.quick else args.sizes_mb
+    results = []
+
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        for size_mb in sizes:
+            if size_mb * IN_MEMORY_FACTOR > args.memory_limit_gb * 1024:
+                print(f"skip {size_mb:g} MB: exceeds memory limit")
+                continue
+
+            path = Path(workdir) / f"synthetic_{size_mb:g}MB.raman2dscan"
+            saved = run_isolated(
+                "benchmarks.project_io",
+                ["--single", "save", str(size_mb), "--path", str(path)],
+            )
+            opened = run_isolated(
+                "benchmarks.project_io",
+                ["--single", "open", "-", "--path", str(path)],
+            )
+            path.unlink()
+
+            result = {"name": f"{size_mb:g}MB", **saved, **opened}
+            results.append(result)
+            print(
+                f"{result['name']:>8}  file {result['file_size_mb']:8.1f} MB  "
+                f"save {result['save_s']:7.2f} s  open {result['open_s']:7.2f} s  "
+                f"heatmap {result['first_heatmap_s']:7.2f} s  "
+                f"access p50 {result['random_access_ms']['p50']:7.2f} ms"
+            )
+
+    write_results(args.output, SUITE, results)
+
+    report = scaling_report(results)
+    print(report)
+    if args.report:
+        Path(args.report).write_text(report + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import percentiles_ms, write_results
+
+SUITE = "region_stats"
+SIDES = (64, 128, 256)
+QUICK_SIDES = (64, 128)
+CHANNELS = 512
+# Region side as a fraction of the map side
+FRACTIONS = (0.1, 0.3, 0.6, 1.0)
+QUERIES = 50
+QUICK_QUERIES = 10
+# Unmeasured pixels, as in masked and sparse scans
+MISSING = 0.1
+
+
+def _cube(side: int, channels: int, rng) -> np.ndarray:
+    cube = rng.normal(1000, 30, (side, side, channels)).astype(np.float32)
+    cube[rng.random((side, side)) < MISSING] = np.nan
+    return cube
+
+
+def _time(query, regions) -> dict:
+    samples = []
+    for region in regions:
+        t0 = time.perf_counter()
+        query(*region)
+        samples.append(time.perf_counter() - t0)
+    return percentiles_ms(samples)
+
+
+def run_case(side: int, channels: int, fraction: float, queries: int, rng) -> dict:
+    from devices.region_stats import RegionStats
+    from devices.scan_mask import polygon_mask
+
+    cube = _cube(side, channels, rng)
+    stats = RegionStats(np.arange(channels), cube)
+
+    # The first query is reduced directly; the second builds the tables.
+    t0 = time.perf_counter()
+    stats.rect(0, side, 0, side)
+    first_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    stats.rect(0, 1, 0, 1)
+    build_s = time.perf_counter() - t0
+
+    size = max(1, round(fraction * side))
+    corners = rng.integers(0, side - size + 1, (queries, 2))
+    rects = [(r, r + size, c, c + size) for r, c in corners]
+
+    # Lassos: circles inscribed in the same squares
+    angles = np.linspace(0, 2 * np.pi, 64, endpoint=False)
+    nodes = np.arange(side, dtype=float)
+    masks = []
+    for r, c in corners[: max(1, queries // 5)]:
+        radius = size / 2
+        polygon = np.column_stack(
+            [c + radius + radius * np.cos(angles), r + radius + radius * np.sin(angles)]
+        )
+        masks.append((polygon_mask(nodes, nodes, polygon),))
+
+    def direct(r0, r1, c0, c1):
+        block = cube[r0:r1, c0:c1]
+        return np.nanmean(block, axis=(0, 1)), np.nanstd(block, axis=(0, 1))
+
+    return {
+        "name": f"{side}/{size}",
+        "side": side,
+        "channels": channels,
+        "region_side": size,
+        "uses_tables": stats.uses_tables,
+        "first_s": first_s,
+        "build_s": build_s,
+        "rect_ms": _time(stats.rect, rects),
+        "lasso_ms": _time(stats.masked, masks),
+        "direct_rect_ms": _time(direct, rects),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Mean/std/min/max spectrum of rectangle regions from "
+        "summed-area tables and of lasso regions by masked reduction, "
+        "against a direct NaN-aware reduction of the rectangle."
+    )
+    parser.add_argument("--sides", nargs="+", type=int, default=list(SIDES))
+    parser.add_argument("--channels", type=int, default=CHANNELS)
+    parser.add_argument("--queries", type=int, default=QUERIES)
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--output", default=f"{SUITE}.json")
+    args = parser.parse_args(argv)
+
+    sides = QUICK_SIDES if args.quick else args.sides
+    queries = QUICK_QUERIES if args.quick else args.queries
+    rng = np.random.default_rng(0)
+    results = []
+    for side in sides:
+        for fraction in FRACTIONS:
+            result = run_case(side, args.channels, fraction, queries, rng)
+            results.append(result)
+            print(
+                f"{result['name']:>9}  first {result['first_s'] * 1e3:7.1f} ms  "
+                f"build {result['build_s'] * 1e3:7.1f} ms  "
+                f"p50 rect {result['rect_ms']['p50']:7.3f} ms  "
+                f"lasso {result['lasso_ms']['p50']:7.3f} ms  "
+                f"direct rect {result['direct_rect_ms']['p50']:7.3f} ms"
+            )
+
+    write_results(args.output, SUITE, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+import argparse
+import collections
+import json
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from loguru import logger
+
+from benchmarks.common import (
+    BASELINE_DIR,
+    Stopwatch,
+    peak_rss_mb,
+    percentiles_ms,
+    run_isolated,
+    write_results,
+)
+
+SUITE = "scan_throughput"
+DEFAULT_GRIDS = [10, 100, 316, 1000]
+DEFAULT_CHANNELS = [256, 1024, 4096]
+QUICK_GRIDS = [10, 100]
+QUICK_CHANNELS = [256, 1024]
+MODES = ["headless", "gui"]
+ALLOC_SAMPLE_SIDE = 50
+POINT_OVERHEAD_BYTES = 512
+
+
+def _make_devices(grid: int, channels: int):
+    from config import SPECTRUM_WAVELENGTH_END, SPECTRUM_WAVELENGTH_START
+    from devices.motors.dummy_motor_controller import DummyMotorController
+    from devices.spectrometer.virtual_sample import VirtualSample
+    from devices.spectrometer.virtual_sample_spectrometer import (
+        VirtualSampleSpectrometer,
+    )
+
+    class TimestampingSpectrometer(VirtualSampleSpectrometer):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.acquired_at = collections.deque()
+
+        def acquire_spectrum(self):
+            spectrum = super().acquire_spectrum()
+            self.acquired_at.append(time.perf_counter())
+            return spectrum
+
+    raman_shifts = np.linspace(
+        SPECTRUM_WAVELENGTH_START, SPECTRUM_WAVELENGTH_END, channels
+    )
+    sample = VirtualSample.procedural(raman_shifts, shape=(grid, grid))
+
+    motors = DummyMotorController(settle_time_s=0.0)
+    spectrometer = TimestampingSpectrometer(sample, acquisition_delay_s=0.0, seed=0)
+    spectrometer.attach_stage(motors)
+    motors.connect()
+    spectrometer.connect()
+    return motors, spectrometer
+
+
+def _make_worker(grid: int, motors, spectrometer):
+    from PyQt6.QtCore import QRectF
+
+    from devices.scan_worker import ScanWorker
+
+    return ScanWorker(
+        roi_rect=QRectF(0.0, 0.0, float(grid), float(grid)),
+        scan_params={"step_size_x": 1.0, "step_size_y": 1.0},
+        motor_controller=motors,
+        spectrometer=spectrometer,
+    )
+
+
+def _measure_allocations(grid: int, channels: int) -> dict:
+    side = min(grid, ALLOC_SAMPLE_SIDE)
+    motors, spectrometer = _make_devices(side, channels)
+    worker = _make_worker(side, motors, spectrometer)
+    spectrometer.acquired_at = collections.deque(maxlen=1)
+    retained = []
+    worker.finished.connect(retained.extend)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    worker.run()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    diff = after.compare_to(before, "filename")
+    points = side * side
+    return {
+        "alloc_blocks_per_point": sum(s.count_diff for s in diff) / points,
+        "alloc_bytes_per_point": sum(s.size_diff for s in diff) / points,
+        "traced_peak_bytes_per_point": peak / points,
+    }
+
+
+def _run_headless(grid: int, motors, spectrometer) -> dict:
+    worker = _make_worker(grid, motors, spectrometer)
+    collected = []
+    worker.finished.connect(collected.extend)
+
+    with Stopwatch() as sw:
+        worker.run()
+
+    return {"points": len(collected), "elapsed_s": sw.elapsed, "signal_latency_ms": None}
+
+
+def _run_gui(grid: int, motors, spectrometer) -> dict:
+    from PyQt6.QtCore import QCoreApplication
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    worker = _make_worker(grid, motors, spectrometer)
+
+    latencies = []
+    collected = []
+
+    def on_point(_point):
+        latencies.append(time.perf_counter() - spectrometer.acquired_at.popleft())
+
+    def on_finished(points):
+        collected.extend(points)
+        app.quit()
+
+    worker.point_acquired.connect(on_point)
+    worker.finished.connect(on_finished)
+
+    with Stopwatch() as sw:
+        worker.start()
+        app.exec()
+        worker.wait()
+
+    return {
+        "points": len(collected),
+        "elapsed_s": sw.elapsed,
+        "signal_latency_ms": percentiles_ms(latencies),
+    }
+
+
+def run_case(grid: int, channels: int, mode: str) -> dict:
+    logger.remove()
+    allocations = _measure_allocations(grid, channels)
+
+    motors, spectrometer = _make_devices(grid, channels)
+    runner = _run_headless if mode == "headless" else _run_gui
+    measured = runner(grid, motors, spectrometer)
+
+    return {
+        "name": f"{mode}/{grid}x{grid}/{channels}ch",
+        "mode": mode,
+        "grid": [grid, grid],
+        "channels": channels,
+        "points": measured["points"],
+        "elapsed_s": measured["elapsed_s"],
+        "points_per_s": measured["points"] / measured["elapsed_s"],
+        "us_per_point": measured["elapsed_s"] / max(measured["points"], 1) * 1e6,
+        "signal_latency_ms": measured["signal_latency_ms"],
+        "peak_rss_mb": peak_rss_mb(),
+        **allocations,
+    }
+
+
+def estimated_bytes(grid: int, channels: int) -> int:
+    return grid * grid * (channels * 4 + POINT_OVERHEAD_BYTES)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Measure ScanWorker software overhead with zero-latency devices."
+    )
+    parser.add_argument("--grids", type=int, nargs="+", default=DEFAULT_GRIDS)
+    parser.add_argument("--channels", type=int, nargs="+", default=DEFAULT_CHANNELS)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--memory-limit-gb", type=float, default=4.0)
+    parser.add_argument("--output", default=f"{SUITE}.json")
+    parser.add_argument("--single", nargs=3, metavar=("GRID", "CHANNELS", "MODE"))
+    args = parser.parse_args(argv)
+
+    if args.single:
+        grid, channels, mode = int(args.single[0]), int(args.single[1]), args.single[2]
+        print(json.dumps(run_case(grid, channels, mode)))
+        return 0
+
+    grids = QUICK_GRIDS if args.quick else args.grids
+    channel_counts = QUICK_CHANNELS if args.quick else args.channels
+
+    results = []
+    for grid in grids:
+        for channels in channel_counts:
+            if estimated_bytes(grid, channels) > args.memory_limit_gb * 2**30:
+                print(f"skip {grid}x{grid}/{channels}ch: exceeds memory limit")
+                continue
+
+            for mode in args.modes:
+                result = run_isolated(
+                    "benchmarks.scan_throughput",
+                    ["--single", str(grid), str(channels), mode],
+                )
+                results.append(result)
+                latency = result["signal_latency_ms"] or {}
+                print(
+                    f"{result['name']:<24} {result['points_per_s']:>10.0f} pts/s  "
+                    f"{result['alloc_bytes_per_point']:>8.0f} B/pt  "
+                    f"rss {result['peak_rss_mb'] or float('nan'):>7.1f} MB  "
+                    f"latency p95 {latency.get('p95') or float('nan'):>7.2f} ms"
+                )
+
+    write_results(args.output, SUITE, results)
+    print(f"Results written to {args.output} (baselines live in {BASELINE_DIR})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import percentiles_ms, write_results
+
+SUITE = "sparse_reconstruction"
+FRACTIONS = (0.10, 0.15, 0.25)
+GRID = 120
+QUICK_GRID = 60
+TRIALS = 3
+QUICK_TRIALS = 1
+
+
+def _full_scan(size: int):
+    """Noisy and noise-free spectra of a size x size grid spread over the
+    virtual sample, so the maps cross several domains."""
+    from devices.spectrometer.virtual_sample_spectrometer import (
+        VirtualSampleSpectrometer,
+    )
+
+    spectrometer = VirtualSampleSpectrometer(acquisition_delay_s=0, seed=0)
+    spectrometer.connect()
+    sample = spectrometer.sample
+    step = min(sample.shape) * sample.pixel_size_um / size
+    ys, xs = np.mgrid[0:size, 0:size] * step
+    shifts, noisy = spectrometer.acquire_spectra(xs.ravel(), ys.ravel())
+    clean = spectrometer.sample.spectra_at(xs.ravel(), ys.ravel())
+    return (
+        shifts,
+        noisy.reshape(size, size, -1),
+        clean.reshape(size, size, -1),
+    )
+
+
+def _bands(shifts) -> list[tuple[float, float]]:
+    """The strongest peak of each virtual sample component, +-2 widths."""
+    from config import VIRTUAL_SAMPLE_COMPONENTS
+
+    bands = []
+    for component in VIRTUAL_SAMPLE_COMPONENTS:
+        center, _, width = max(component, key=lambda peak: peak[1])
+        bands.append((center - 2 * width, center + 2 * width))
+    return bands
+
+
+def _band_maps(shifts, cube, bands) -> np.ndarray:
+    return np.stack(
+        [cube[..., (shifts >= lo) & (shifts <= hi)].sum(axis=-1) for lo, hi in bands],
+        axis=-1,
+    )
+
+
+def _nrmse(maps, reference, nodes) -> float:
+    """RMS error over ``nodes`` per band, relative to the reference map's
+    1-99 percentile range, averaged over bands."""
+    errors = []
+    for k in range(reference.shape[-1]):
+        ref = reference[..., k]
+        span = np.percentile(ref, 99) - np.percentile(ref, 1)
+        rms = np.sqrt(np.mean((maps[..., k][nodes] - ref[nodes]) ** 2))
+        errors.append(rms / max(span, 1e-12))
+    return float(np.mean(errors))
+
+
+def run_case(data, fraction, pattern, method, trials) -> dict:
+    from config import SPARSE_LOW_RANK
+    from devices.sparse_scan import (
+        BIHARMONIC,
+        LOW_RANK,
+        complete_cube,
+        inpaint,
+        sample_nodes,
+    )
+
+    shifts, noisy, clean, bands, full_maps, clean_maps = data
+    rng = np.random.default_rng(1)
+    durations, errors_full, errors_clean = [], [], []
+    for _ in range(trials):
+        known = sample_nodes(full_maps.shape[:2], fraction, pattern, rng)
+        t0 = time.perf_counter()
+        if method == LOW_RANK:
+            cube = complete_cube(
+                shifts, noisy[known], known, SPARSE_LOW_RANK, BIHARMONIC
+            )
+            maps = np.stack([cube.band_map(lo, hi) for lo, hi in bands], axis=-1)
+        else:
+            maps = inpaint(np.where(known[..., None], full_maps, np.nan), known, method)
+        durations.append(time.perf_counter() - t0)
+        errors_full.append(_nrmse(maps, full_maps, ~known))
+        errors_clean.append(_nrmse(maps, clean_maps, ~known))
+
+    return {
+        "name": f"{pattern}_{method}_{round(fraction * 100)}",
+        "pattern": pattern,
+        "method": method,
+        "fraction": fraction,
+        "grid": list(full_maps.shape[:2]),
+        "channels": len(shifts),
+        "bands": len(bands),
+        "trials": trials,
+        "reconstruct_ms": percentiles_ms(durations),
+        "nrmse_full": float(np.mean(errors_full)),
+        "nrmse_clean": float(np.mean(errors_clean)),
+        # The full scan's own noise, for scale
+        "full_scan_nrmse_clean": _nrmse(
+            full_maps, clean_maps, np.ones(full_maps.shape[:2], dtype=bool)
+        ),
+    }
+
+
+def main(argv=None) -> int:
+    from devices.sparse_scan import METHODS, PATTERNS
+
+    parser = argparse.ArgumentParser(
+        description="Band map error of sparse scans against full scans of "
+        "the virtual sample, by sampling pattern and reconstruction."
+    )
+    parser.add_argument("--fractions", nargs="+", type=float, default=FRACTIONS)
+    parser.add_argument("--patterns", nargs="+", default=list(PATTERNS))
+    parser.add_argument("--methods", nargs="+", default=list(METHODS))
+    parser.add_argument("--grid", type=int, default=GRID)
+    parser.add_argument("--trials", type=int, default=TRIALS)
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--output", default=f"{SUITE}.json")
+    args = parser.parse_args(argv)
+
+    from loguru import logger
+
+    logger.remove()
+    size = QUICK_GRID if args.quick else args.grid
+    trials = QUICK_TRIALS if args.quick else args.trials
+
+    shifts, noisy, clean = _full_scan(size)
+    bands = _bands(shifts)
+    data = (
+        shifts,
+        noisy,
+        clean,
+        bands,
+        _band_maps(shifts, noisy, bands),
+        _band_maps(shifts, clean, bands),
+    )
+
+    results = []
+    for fraction in args.fractions:
+        for pattern in args.patterns:
+            for method in args.methods:
+                result = run_case(data, fraction, pattern, method, trials)
+                results.append(result)
+                print(
+                    f"{result['name']:>24}  "
+                    f"p50 {result['reconstruct_ms']['p50']:7.1f} ms  "
+                    f"NRMSE vs full {result['nrmse_full']:.3f}  "
+                    f"vs noise-free {result['nrmse_clean']:.3f} "
+                    f"(full scan {result['full_scan_nrmse_clean']:.3f})"
+                )
+
+    write_results(args.output, SUITE, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
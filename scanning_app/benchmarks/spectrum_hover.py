@@ -0,0 +1,186 @@
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.common import percentiles_ms, write_results
+
+SUITE = "spectrum_hover"
+# (side, channels) of the square map
+CASES = ((250, 1024), (1000, 2048))
+QUICK_CASES = ((250, 1024),)
+# Mouse move events: interval, count, and distance per event in cells
+EVENT_INTERVAL_MS = 2
+EVENTS = 2000
+QUICK_EVENTS = 500
+STEP_CELLS = 1.5
+LOOKUP_BUDGET_MS = 1.0
+FRAME_BUDGET_MS = 16.0
+
+
+def _mouse_path(side: int, events: int, rng) -> np.ndarray:
+    """(x, y) of a random walk over the map, reflected at its edges."""
+    angles = np.cumsum(rng.normal(0, 0.3, events)) + rng.uniform(0, 2 * np.pi)
+    steps = STEP_CELLS * np.column_stack([np.cos(angles), np.sin(angles)])
+    path = np.cumsum(steps, axis=0) + side / 2
+    path = np.mod(path, 2 * (side - 1))
+    return np.where(path > side - 1, 2 * (side - 1) - path, path)
+
+
+def _disk_cube(directory: Path, side: int, channels: int, path, rng):
+    """Lazily loaded float32 ``(side, side, channels)`` cube on disk. Only the
+    spectra along the mouse path are written; the rest of the file is left
+    sparse."""
+    from numpy.lib.format import open_memmap
+
+    file = directory / f"cube_{side}_{channels}.npy"
+    cube = open_memmap(file, mode="w+", dtype=np.float32, shape=(side, side, channels))
+    cells = np.unique(np.rint(path).astype(int), axis=0)
+    shifts = np.linspace(100, 3200, channels)
+    centers = 500 + 2000 * cells[:, 0] / side
+    cube[cells[:, 1], cells[:, 0]] = np.exp(
+        -0.5 * ((shifts - centers[:, None]) / 30) ** 2
+    ) + rng.normal(0, 0.05, (len(cells), channels))
+    cube.flush()
+    del cube
+    return shifts, np.load(file, mmap_mode="r")
+
+
+def run_case(side: int, channels: int, events: int, app, directory: Path) -> dict:
+    from PyQt6.QtCore import Qt, QTimer
+
+    from devices.point_index import GridPointIndex
+    from devices.scan_grid import ScanGrid
+    from ui.spectra_preview_widget import SpectraPreviewWidget
+
+    rng = np.random.default_rng(0)
+    path = _mouse_path(side, events, rng)
+    shifts, cube = _disk_cube(directory, side, channels, path, rng)
+
+    # As the heatmap does: node of the pointer, then the point id at the node
+    grid = ScanGrid.from_roi(0, 0, side, side, 1.0, 1.0)
+    index = GridPointIndex(grid, np.arange(len(grid)).reshape(grid.shape))
+
+    widget = SpectraPreviewWidget()
+    widget.resize(800, 300)
+    widget.show()
+    app.processEvents()
+
+    # Full draws (rescaled axes) and blits of the lines alone
+    draws, blits = [], []
+    widget.canvas.mpl_connect("draw_event", lambda _: draws.append(time.perf_counter()))
+    blit = widget.canvas.blit
+
+    def counted_blit(bbox=None):
+        blits.append(time.perf_counter())
+        blit(bbox)
+
+    widget.canvas.blit = counted_blit
+
+    lookups, handlers, ticks, shown = [], [], [], []
+
+    def on_move():
+        t0 = time.perf_counter()
+        ticks.append(t0)
+        x, y = path[len(handlers)]
+        row, col = grid.index(x, y)
+        point = index.at(row, col)
+        spectrum = cube[point // side, point % side]
+        t1 = time.perf_counter()
+        widget.preview_spectrum(shifts, spectrum)
+        lookups.append(t1 - t0)
+        handlers.append(time.perf_counter() - t0)
+        shown.append(spectrum)
+        if len(handlers) == events:
+            timer.stop()
+            # Let the last throttled redraw land.
+            QTimer.singleShot(200, app.quit)
+
+    timer = QTimer()
+    timer.setTimerType(Qt.TimerType.PreciseTimer)
+    timer.timeout.connect(on_move)
+    timer.start(EVENT_INTERVAL_MS)
+    app.exec()
+
+    elapsed = ticks[-1] - ticks[0]
+    # The default Raman band covers the whole spectrum.
+    last_wins = bool(np.array_equal(widget._band_line.get_ydata(), shown[-1]))
+    widget.close()
+    del cube
+
+    gaps = np.diff(ticks)
+    result = {
+        "name": f"{side}x{side}x{channels}",
+        "side": side,
+        "channels": channels,
+        "cube_gb": side * side * channels * 4 / 1e9,
+        "events": events,
+        "events_per_s": (events - 1) / elapsed,
+        "frames_per_s": (len(draws) + len(blits)) / elapsed,
+        "full_draws_per_s": len(draws) / elapsed,
+        "lookup_ms": percentiles_ms(lookups),
+        "handler_ms": percentiles_ms(handlers),
+        "gap_ms": percentiles_ms(gaps),
+        "last_wins": last_wins,
+    }
+    result["within_budget"] = (
+        last_wins
+        and result["lookup_ms"]["p95"] <= LOOKUP_BUDGET_MS
+        and result["gap_ms"]["p95"] <= FRAME_BUDGET_MS
+    )
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Hover-to-preview over a lazily loaded on-disk cube: "
+        "spectrum lookup time, redraw rate and event loop gaps while the "
+        "mouse moves at 500 events/s."
+    )
+    parser.add_argument(
+        "--cases",
+        nargs="+",
+        default=[f"{side}x{channels}" for side, channels in CASES],
+        help="side x channels, e.g. 1000x2048",
+    )
+    parser.add_argument("--events", type=int, default=EVENTS)
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--output", default=f"{SUITE}.json")
+    args = parser.parse_args(argv)
+
+    from loguru import logger
+    from PyQt6.QtWidgets import QApplication
+
+    logger.remove()
+    app = QApplication(sys.argv[:1])
+
+    if args.quick:
+        cases, events = QUICK_CASES, QUICK_EVENTS
+    else:
+        cases = [tuple(int(v) for v in case.split("x")) for case in args.cases]
+        events = args.events
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for side, channels in cases:
+            result = run_case(side, channels, events, app, Path(directory))
+            results.append(result)
+            print(
+                f"{result['name']:>16}  lookup p95 "
+                f"{result['lookup_ms']['p95']:.3f} ms  handler p95 "
+                f"{result['handler_ms']['p95']:.2f} ms  gap p95 "
+                f"{result['gap_ms']['p95']:.2f} ms  "
+                f"{result['frames_per_s']:.0f} frames/s "
+                f"({result['full_draws_per_s']:.0f} full)  "
+                f"last wins {result['last_wins']}"
+            )
+
+    write_results(args.output, SUITE, results)
+    return 0 if all(r["within_budget"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
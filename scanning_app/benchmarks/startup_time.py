@@ -0,0 +1,101 @@
+import argparse
+import json
+import sys
+import time
+
+from benchmarks.common import run_isolated, write_results
+
+SUITE = "startup_time"
+WINDOW_VISIBLE_BUDGET_S = 1.0
+DEFERRED_MODULES = ("pandas", "matplotlib", "project_io.load_project")
+
+
+def probe() -> dict:
+    start = time.perf_counter()
+
+    from PyQt6.QtCore import QEvent, QObject, QTimer
+    from PyQt6.QtWidgets import QApplication
+
+    app = QApplication(sys.argv[:1])
+
+    from ui.main_window import MainWindow
+
+    imported_s = time.perf_counter() - start
+    marks = {}
+
+    class FirstPaint(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint and "visible" not in marks:
+                marks["visible"] = time.perf_counter() - start
+                marks["loaded"] = [m for m in DEFERRED_MODULES if m in sys.modules]
+            return False
+
+    window = MainWindow()
+    paint_filter = FirstPaint()
+    window.installEventFilter(paint_filter)
+    window.show()
+
+    def wait_for_plots():
+        if window.heatmap_widget is None or "visible" not in marks:
+            QTimer.singleShot(5, wait_for_plots)
+            return
+        marks["plots"] = time.perf_counter() - start
+        app.quit()
+
+    QTimer.singleShot(0, wait_for_plots)
+    app.exec()
+
+    return {
+        "name": "main_window",
+        "import_s": imported_s,
+        "window_visible_s": marks["visible"],
+        "plots_ready_s": marks["plots"],
+        "modules_loaded_before_visible": marks["loaded"],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Check the time until the main window is first painted."
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-s", type=float, default=WINDOW_VISIBLE_BUDGET_S)
+    parser.add_argument("--output", default=f"{SUITE}.json")
+    parser.add_argument("--single", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.single:
+        from loguru import logger
+
+        logger.remove()
+        print(json.dumps(probe()))
+        return 0
+
+    runs = [run_isolated("benchmarks.startup_time", ["--single"]) for _ in range(args.runs)]
+    best = min(runs, key=lambda r: r["window_visible_s"])
+    write_results(args.output, SUITE, [best])
+
+    print(
+        f"import {best['import_s']:.3f} s, window visible {best['window_visible_s']:.3f} s, "
+        f"plots ready {best['plots_ready_s']:.3f} s (best of {args.runs})"
+    )
+
+    failures = []
+    if best["window_visible_s"] > args.budget_s:
+        failures.append(
+            f"window visible after {best['window_visible_s']:.3f} s "
+            f"(budget {args.budget_s:.3f} s)"
+        )
+    if best["modules_loaded_before_visible"]:
+        failures.append(
+            "imported before first paint: "
+            + ", ".join(best["modules_loaded_before_visible"])
+        )
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import percentiles_ms, write_results
+
+SUITE = "toupcam_still"
+# (binning, sensor ROI) driven through the real driver on the fake SDK
+GEOMETRIES = (
+    (1, None),
+    (2, None),
+    (4, None),
+    (1, (200, 100, 640, 480)),
+    (2, (200, 100, 640, 480)),
+    (3, (64, 32, 600, 450)),
+)
+QUICK_GEOMETRIES = ((1, None), (2, (200, 100, 640, 480)))
+EXPOSURES_US = (1_000, 10_000, 100_000)
+CAPTURES = 20
+QUICK_CAPTURES = 5
+# Time from capture_frame() to its return beyond the exposure and readout;
+# well under the fixed 300 ms wait stills used to take
+OVERHEAD_BUDGET_MS = 50.0
+STREAM_TIMEOUT_S = 2.0
+
+
+def _connect():
+    from devices.camera import fake_toupcam
+    from devices.camera.toupcam_camera import ToupcamCamera
+
+    _, options = fake_toupcam.enumerate_devices()[0]
+    camera = ToupcamCamera(**options)
+    camera.connect()
+    camera.set_auto_exposure(False)
+    camera.set_exposure(10_000)
+    camera.set_gain(100)
+    return camera
+
+
+def _count_restarts(camera) -> list:
+    """Wrap the SDK handle's StartPullModeWithCallback to count restarts."""
+    starts = []
+    hcam = camera._hcam
+    start = hcam.StartPullModeWithCallback
+
+    def counted(*args):
+        starts.append(time.perf_counter())
+        start(*args)
+
+    hcam.StartPullModeWithCallback = counted
+    return starts
+
+
+def _expected_pixels(geometry, shape) -> np.ndarray:
+    """The fake's test pattern at nominal brightness over the frame's sensor
+    area, sampled every ``binning`` pixels as the fake bins."""
+    from devices.camera import fake_toupcam
+
+    pattern = fake_toupcam._test_pattern(*fake_toupcam.RESOLUTIONS[0])
+    x, y, width, height = geometry.sensor_rect(shape)
+    step = geometry.binning
+    pixels = pattern[y : y + height : step, x : x + width : step]
+    return np.clip(pixels * 255, 0, 255).astype(np.uint8)
+
+
+def check_geometry(camera, binning: int, roi, raw: bool) -> dict:
+    """Still and stream frames for one configuration, against the pattern."""
+    starts = _count_restarts(camera)
+    camera.set_raw_mode(raw)
+    camera.set_binning(binning)
+    camera.set_sensor_roi(roi)
+    restarts = len(starts)
+    # Settings pushed again unchanged, as before every capture
+    camera.set_binning(binning)
+    camera.set_sensor_roi(None if roi is None else list(roi))
+    restarted_unchanged = len(starts) > restarts
+
+    frame = camera.capture_frame()
+    try:
+        shape = frame.data.shape
+        geometry = frame.geometry
+        expected = _expected_pixels(geometry, shape)
+        if raw:
+            from devices.camera.demosaic import mosaic
+
+            expected = mosaic(expected, frame.bayer)
+            still = frame.data >> (frame.bit_depth - 8)
+        else:
+            still = frame.data[..., :3]
+        matches = still.shape == expected.shape and bool(
+            np.array_equal(still, expected)
+        )
+    finally:
+        frame.release()
+
+    stream = camera.start_stream()
+    try:
+        live = stream.wait_latest(timeout=STREAM_TIMEOUT_S)
+        stream_shape = None if live is None else live.data.shape
+        stream.release(live)
+    finally:
+        camera.stop_stream()
+
+    area = "roi" if roi else "full"
+    return {
+        "name": f"bin{binning}/{area}/{'raw' if raw else 'rgb'}",
+        "binning": binning,
+        "roi": roi,
+        "raw": raw,
+        "shape": list(shape),
+        "stream_shape": None if stream_shape is None else list(stream_shape),
+        "restarts": restarts,
+        "restarted_unchanged": restarted_unchanged,
+        "pixels_match": matches,
+        "passed": matches and stream_shape == shape and not restarted_unchanged,
+    }
+
+
+def time_stills(camera, exposure_us: int, captures: int) -> dict:
+    """Capture latency at one exposure, and whether each still follows the
+    gain set just before it."""
+    from devices.camera import fake_toupcam
+
+    camera.set_raw_mode(False)
+    camera.set_binning(2)
+    camera.set_sensor_roi(None)
+    camera.set_exposure(exposure_us)
+
+    latencies, follows = [], []
+    for i in range(captures):
+        # Alternate full and half brightness, so a still exposed before the
+        # gain change is told apart.
+        level = 0.5 if i % 2 else 1.0
+        gain = round(level * fake_toupcam.NOMINAL_EXPOSURE / exposure_us)
+        camera.set_gain(gain)
+        t0 = time.perf_counter()
+        frame = camera.capture_frame()
+        latencies.append(time.perf_counter() - t0)
+        expected = np.clip(
+            _expected_pixels(frame.geometry, frame.data.shape) * level, 0, 255
+        )
+        follows.append(
+            float(np.abs(frame.data[..., :3].mean() - expected.mean())) < 1.0
+        )
+        frame.release()
+
+    floor_s = exposure_us / 1e6 + fake_toupcam.READOUT_S
+    overhead = percentiles_ms([latency - floor_s for latency in latencies])
+    return {
+        "name": f"still/{exposure_us}us",
+        "exposure_us": exposure_us,
+        "captures": captures,
+        "latency_ms": percentiles_ms(latencies),
+        "overhead_ms": overhead,
+        "settings_followed": all(follows),
+        "passed": all(follows) and overhead["p95"] <= OVERHEAD_BUDGET_MS,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Drive ToupcamCamera against the in-process fake SDK: "
+        "still capture latency per exposure, and still/stream frames for "
+        "each binning and sensor ROI in RGB and raw mode."
+    )
+    parser.add_argument("--captures", type=int, default=CAPTURES)
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--output", default=f"{SUITE}.json")
+    args = parser.parse_args(argv)
+
+    from loguru import logger
+
+    logger.remove()
+
+    geometries = QUICK_GEOMETRIES if args.quick else GEOMETRIES
+    captures = QUICK_CAPTURES if args.quick else args.captures
+
+    camera = _connect()
+    results = []
+    try:
+        for binning, roi in geometries:
+            for raw in (False, True):
+                result = check_geometry(camera, binning, roi, raw)
+                results.append(result)
+                print(
+                    f"{result['name']:>16}  {'x'.join(map(str, result['shape']))}"
+                    f"  pixels match {result['pixels_match']}  restarted "
+                    f"unchanged {result['restarted_unchanged']}  "
+                    f"{'ok' if result['passed'] else 'FAILED'}"
+                )
+
+        for exposure_us in EXPOSURES_US:
+            result = time_stills(camera, exposure_us, captures)
+            results.append(result)
+            print(
+                f"{result['name']:>16}  p50 {result['latency_ms']['p50']:7.1f} ms"
+                f"  overhead p95 {result['overhead_ms']['p95']:5.1f} ms  "
+                f"settings followed {result['settings_followed']}  "
+                f"{'ok' if result['passed'] else 'FAILED'}"
+            )
+    finally:
+        camera.disconnect()
+
+    write_results(args.output, SUITE, results)
+    return 0 if all(r["passed"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
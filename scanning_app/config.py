@@ -52,11 +52,41 @@ ZOOM_OUT_BUTTON_TEXT = "-"
 # Scanning Parameters
 DEFAULT_STEP_SIZE_X = 1.0
 DEFAULT_STEP_SIZE_Y = 1.0
+# Z-stack scans: focus range and step
+DEFAULT_Z_START = -5.0
+DEFAULT_Z_STOP = 5.0
+DEFAULT_STEP_SIZE_Z = 1.0
+# Survey scans: every point at a short integration time, then the points
+# whose band signal clears the threshold (grown by the dilation, in grid
+# cells) again at the full integration time. The threshold is an SNR for
+# the "snr" metric, robust sigmas above the median for "intensity".
+SURVEY_INTEGRATION_TIME_MS = 50
+SURVEY_METRIC = "snr"
+SURVEY_THRESHOLD = 5.0
+SURVEY_DILATION = 1
+# Adaptive dwell: sub-exposures are accumulated at each point until the band
+# SNR reaches the target or the dwell limit; saturated frames are dropped and
+# the exposure halved, down to the minimum
+ADAPTIVE_DWELL_TARGET_SNR = 20.0
+ADAPTIVE_DWELL_EXPOSURE_MS = 100
+ADAPTIVE_DWELL_MAX_MS = 2000
+ADAPTIVE_DWELL_MIN_EXPOSURE_MS = 1.0
+# Sparse scans: only this share of the grid is acquired ("blue_noise" or
+# "random" placement) and the band maps are reconstructed by "biharmonic" or
+# "tv" inpainting, or by a rank-limited completion of the spectral cube
+# ("low_rank")
+SPARSE_FRACTION_PERCENT = 20
+SPARSE_PATTERN = "blue_noise"
+SPARSE_METHOD = "biharmonic"
+SPARSE_LOW_RANK = 8
 MOTOR_STEP_RANGE_MIN = 0.1
 MOTOR_STEP_RANGE_MAX = 100.0
 MOTOR_XY_RANGE_MIN = -1000
 MOTOR_XY_RANGE_MAX = 1000
 MOTOR_SETTLE_TIME_SEC = 0.5
+# Focus (Z) axis travel, for controllers that have one
+MOTOR_Z_RANGE_MIN = -500.0
+MOTOR_Z_RANGE_MAX = 500.0
 
 
 # Raman / Spectrometer
@@ -73,6 +103,24 @@ SPECTRUM_INTEGRATION_TIME_MS = 500
 SPECTRUM_AVERAGES_AMOUNT = 1
 SPECTRUM_PUMP_WAVELENGTH = 535
 
+# Virtual Sample (spatially varying dummy spectra)
+VIRTUAL_SAMPLE_IMAGE_PATH = None
+VIRTUAL_SAMPLE_PIXEL_SIZE_UM = 1.0
+VIRTUAL_SAMPLE_NUM_DOMAINS = 40
+VIRTUAL_SAMPLE_SEED = 0
+VIRTUAL_SAMPLE_ACQUISITION_DELAY_SEC = 0.02
+# Stage Z (um) of the sample plane, where the signal peaks with a focus axis
+VIRTUAL_SAMPLE_FOCUS_Z_UM = 0.0
+# Away from that plane the signal falls off as a Gaussian of this sigma (um)
+VIRTUAL_SAMPLE_DEPTH_UM = 10.0
+# Detector full scale; readings are clipped here
+VIRTUAL_SAMPLE_SATURATION_LEVEL = 4.0
+VIRTUAL_SAMPLE_COMPONENTS = [
+    [(520, 1.0, 8)],
+    [(1000, 0.7, 20), (1450, 0.3, 30)],
+    [(1350, 0.6, 45), (1600, 0.8, 30)],
+]
+
 # Camera Hardware (General)
 EXPOSURE_MIN = 100
 EXPOSURE_MAX = 1_000_000
@@ -83,17 +131,79 @@ GAIN_DEFAULT = 100
 CAMERA_IMAGE_WIDTH = 800
 CAMERA_IMAGE_HEIGHT = 600
 
+# Live View
+CAMERA_STREAM_BUFFER_SLOTS = 4
+CAMERA_FRAME_POOL_SIZE = 3
+LIVE_VIEW_MAX_FPS = 30
+LIVE_VIEW_STATS_INTERVAL_MS = 1000
+DUMMY_CAMERA_STREAM_FPS = 60
+
+# Raw sensor mode: how raw frames are converted for display and export
+# ("bilinear", "superpixel" or "luminance")
+CAMERA_RAW_DISPLAY = "bilinear"
+DUMMY_CAMERA_BAYER_PATTERN = "RGGB"
+
+# Frame stacking: average N live frames into one capture (1 = off)
+CAMERA_STACK_FRAMES = 1
+CAMERA_STACK_MAX_FRAMES = 256
+CAMERA_STACK_ALIGN = False
+# Side of the central crop used to estimate the shift between frames
+CAMERA_STACK_ALIGN_WINDOW = 256
+CAMERA_STACK_TIMEOUT_SEC = 2.0
+
+# Stage mosaic
+# Stage travel per full-resolution camera pixel (1.0 matches the ROI -> scan
+# mapping, where stage units are camera pixels)
+CAMERA_PIXEL_SIZE_UM = 1.0
+MOSAIC_TILE_SIZE = 256
+# Tiles beyond this are spilled to a temporary directory
+MOSAIC_TILE_CACHE_MB = 256
+MOSAIC_DEFAULT_COLUMNS = 3
+MOSAIC_DEFAULT_ROWS = 3
+MOSAIC_DEFAULT_OVERLAP = 0.1
+MOSAIC_BLEND = True
+# Longest side of the mosaic image embedded in saved projects
+MOSAIC_EXPORT_MAX_SIZE = 4096
+
+# Autofocus: sharpness ("laplacian" or "tenengrad") of a binned centre crop,
+# maximised over Z by a coarse sweep then golden-section search
+AUTOFOCUS_METRIC = "tenengrad"
+# Searched half-range around the current Z, and the final bracket width
+AUTOFOCUS_RANGE_UM = 50.0
+AUTOFOCUS_TOLERANCE_UM = 1.0
+AUTOFOCUS_COARSE_STEPS = 9
+AUTOFOCUS_ROI_FRACTION = 0.25
+AUTOFOCUS_BINNING = 2
+# Live frames dropped after each Z move (their exposure may predate it)
+AUTOFOCUS_SETTLE_FRAMES = 1
+AUTOFOCUS_TIMEOUT_SEC = 2.0
+# Dummy camera: in-focus Z, and blur sigma (sensor pixels) per um of defocus
+DUMMY_CAMERA_FOCUS_Z_UM = 0.0
+DUMMY_CAMERA_DEFOCUS_PX_PER_UM = 0.2
+
 # ToupCam-Specific
 TOUPCAM_AUTO_EXPO_ENABLED = False
 TOUPCAM_DEFAULT_EXPO_TIME_US = 10000
 TOUPCAM_DEFAULT_EXPO_AGAIN = 100
-TOUPCAM_SNAP_WAIT_SECONDS = 0.3
-TOUPCAM_PIXEL_FORMAT_BITS = 24
-TOUPCAM_IMAGE_FORMAT = "RGB888"
+# Still capture waits for TOUPCAM_EVENT_STILLIMAGE at most this long, plus
+# twice the exposure time
+TOUPCAM_STILL_TIMEOUT_SEC = 2.0
+TOUPCAM_PIXEL_FORMAT_BITS = 32
+TOUPCAM_IMAGE_FORMAT = "RGBX8888"
+# Raw mode sample depth: 8, or 16 to keep the sensor's full bit depth
+TOUPCAM_RAW_BITS = 8
 
 # Heatmap & Plotting
 PLOT_DPI = 100
 HEATMAP_CMAP = "viridis"
+# Spectrum plot redraws (hover preview, live scan) are capped at the screen
+# refresh rate, and at this when it is higher or unknown
+SPECTRUM_REDRAW_MAX_FPS = 60
+# Statistics of a selected map region follow a running scan at most this often
+REGION_STATS_REFRESH_MS = 500
+# Memory the summed-area tables of a map's region statistics may take; regions
+# of larger maps are reduced directly every time
+REGION_STATS_TABLE_BUDGET_MB = 512
 HEATMAP_ORIGIN = "lower"
 HEATMAP_ASPECT = "auto"
 X_LABEL_TEXT = "X Position (μm)"
@@ -108,4 +218,10 @@ SAMPLE_GRID_SIZE = 50
 PICKLE_FILENAME = "scan_data.pkl"
 
 # Threading
-THREAD_POOL_SIZE = 4
\ No newline at end of file
+THREAD_POOL_SIZE = 4
+
+# Device discovery / connection
+DEVICE_ENUM_CACHE_SEC = 30.0
+DEVICE_ENUM_TIMEOUT_SEC = 10.0
+DEVICE_CONNECT_TIMEOUT_SEC = 10.0
+SLOW_DUMMY_DEVICE_DELAY_SEC = 2.0
\ No newline at end of file
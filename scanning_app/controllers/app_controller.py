@@ -1,13 +1,12 @@
 from pathlib import Path
 
 import numpy as np
-import pandas as pd
 
 from controllers.scan_result import ScanResult
 from devices.device_factory import DeviceFactory
+from devices.registry import CAMERA, MOTORS, SPECTROMETER
+from devices.scan_grid import ScanGrid
 from devices.scan_worker import ScanWorker
-from project_io.load_project import Raman2DScanReader
-from project_io.save_project import Raman2DScanWriter
 
 
 class AppController:
@@ -45,37 +44,85 @@ class AppController:
     def list_motors(self):
         return self.device_factory.available_motors()
 
+    def device_plugins(self, kind: str):
+        return self.device_factory.plugins(kind)
+
+    def enumerate_plugin(self, plugin, max_age_s: float):
+        return self.device_factory.enumerate_plugin(plugin, max_age_s)
+
+    def open_device(self, kind: str, name: str):
+        """Create and connect a device without touching controller state.
+
+        Safe to call from a worker thread; hand the result to
+        ``set_camera``/``set_spectrometer``/``set_motors`` on the GUI thread.
+        """
+        device = self.device_factory.create(kind, name)
+        device.connect()
+        return device
+
+    def set_camera(self, camera):
+        self.camera = camera
+        self._link_stage()
+
+    def set_spectrometer(self, spectrometer):
+        self.spectrometer = spectrometer
+        self._link_stage()
+
+    def set_motors(self, motors):
+        self.motors = motors
+        self._link_stage()
+
+    def release_camera(self):
+        camera, self.camera = self.camera, None
+        return camera
+
+    def release_spectrometer(self):
+        spectrometer, self.spectrometer = self.spectrometer, None
+        return spectrometer
+
+    def release_motors(self):
+        motors = self.motors
+        self.set_motors(None)
+        return motors
+
     def connect_camera(self, name):
-        self.camera = self.device_factory.create_camera(name)
-        self.camera.connect()
+        self.set_camera(self.open_device(CAMERA, name))
 
     def disconnect_camera(self):
-        if self.camera:
-            self.camera.disconnect()
-        self.camera = None
+        camera = self.release_camera()
+        if camera:
+            camera.disconnect()
 
     def connect_spectrometer(self, name):
-        self.spectrometer = self.device_factory.create_spectrometer(name)
-        self.spectrometer.connect()
+        self.set_spectrometer(self.open_device(SPECTROMETER, name))
 
     def connect_motors(self, name):
-        self.motors = self.device_factory.create_motors(name)
-        self.motors.connect()
+        self.set_motors(self.open_device(MOTORS, name))
+
+    def _link_stage(self):
+        for device in (self.spectrometer, self.camera):
+            if device is not None and hasattr(device, "attach_stage"):
+                device.attach_stage(self.motors)
 
     def capture_camera_image(self):
         if not self.camera:
             raise RuntimeError("Camera not ready")
         return self.camera.capture()
 
+    def capture_camera_frame(self):
+        if not self.camera:
+            raise RuntimeError("Camera not ready")
+        return self.camera.capture_frame()
+
     def disconnect_spectrometer(self):
-        if self.spectrometer:
-            self.spectrometer.disconnect()
-        self.spectrometer = None
+        spectrometer = self.release_spectrometer()
+        if spectrometer:
+            spectrometer.disconnect()
 
     def disconnect_motors(self):
-        if self.motors:
-            self.motors.disconnect()
-        self.motors = None
+        motors = self.release_motors()
+        if motors:
+            motors.disconnect()
 
     def start_scan(self, roi_rect, scan_params):
         if not self.motors or not self.spectrometer:
@@ -105,24 +152,59 @@ class AppController:
             self.scan_worker.stop()
             self.scan_worker = None
 
-    def finalize_scan(self, scan_points, scan_params):
-        self.current_scan = self._build_scan_result(scan_points)
+    def finalize_scan(
+        self,
+        scan_points,
+        scan_params,
+        volume=None,
+        survey=None,
+        mask_grid=None,
+        mask_report=None,
+        sparse_nodes=None,
+    ):
+        self.current_scan = self._build_scan_result(
+            scan_points, volume, survey, mask_grid, mask_report, sparse_nodes
+        )
         self.scan_dirty = True
 
-    def _build_scan_result(self, scan_points):
+    def _build_scan_result(
+        self,
+        scan_points,
+        volume=None,
+        survey=None,
+        mask_grid=None,
+        mask_report=None,
+        sparse_nodes=None,
+    ):
+        import pandas as pd
+
+        columns = ["x", "y", "wavenumber_cm1", "intensity", "integration_time_ms"]
+        adaptive = bool(self._current_scan_params.get("adaptive_dwell"))
+        if adaptive:
+            columns += ["dwell_ms", "accumulations"]
+
         rows = []
-        for point in scan_points:
+        # A Z-stack keeps its spectra in the volume, not in the table.
+        for point in scan_points if volume is None else []:
+            integration_ms = (
+                point.integration_time_ms
+                if point.integration_time_ms is not None
+                else self.spectrometer.integration_time_ms
+            )
             for wn, inten in zip(point.raman_shifts, point.intensities):
-                rows.append(
-                    {
-                        "x": float(point.x),
-                        "y": float(point.y),
-                        "wavenumber_cm1": float(wn),
-                        "intensity": float(inten),
-                    }
-                )
-
-        spectra_df = pd.DataFrame(rows)
+                row = {
+                    "x": float(point.x),
+                    "y": float(point.y),
+                    "wavenumber_cm1": float(wn),
+                    "intensity": float(inten),
+                    "integration_time_ms": float(integration_ms),
+                }
+                if adaptive:
+                    row["dwell_ms"] = float(point.dwell_ms)
+                    row["accumulations"] = int(point.accumulations)
+                rows.append(row)
+
+        spectra_df = pd.DataFrame(rows, columns=columns)
 
         scan_meta = {
             "num_points": len(scan_points),
@@ -130,6 +212,42 @@ class AppController:
             "step_size_y": self._current_scan_params["step_size_y"],
             "roi": self._current_roi,
         }
+        if volume is not None:
+            scan_meta["num_points"] = volume.measured_points()
+            scan_meta["step_size_z"] = self._current_scan_params["step_size_z"]
+            scan_meta["z_positions"] = volume.zs.tolist()
+        if adaptive:
+            scan_meta["adaptive_dwell"] = {
+                "target_snr": self._current_scan_params["dwell_target_snr"],
+                "exposure_ms": self._current_scan_params["dwell_exposure_ms"],
+                "max_dwell_ms": self._current_scan_params["dwell_max_ms"],
+                # Spectra are accumulated counts divided by dwell_ms
+                "intensity_unit": "counts/s",
+            }
+        if mask_report is not None:
+            scan_meta["mask"] = mask_report.as_dict()
+        if sparse_nodes is not None:
+            # Maps are reconstructed from the acquired points when shown;
+            # the stored heatmap grid holds the acquired nodes only.
+            scan_meta["sparse"] = {
+                "pattern": self._current_scan_params["sparse_pattern"],
+                "fraction": self._current_scan_params["sparse_fraction"],
+                "method": self._current_scan_params["sparse_method"],
+                "planned_points": int(sparse_nodes.sum()),
+                "grid_points": int(
+                    sparse_nodes.size if mask_grid is None else mask_grid.sum()
+                ),
+            }
+        if survey is not None:
+            scan_meta["survey"] = {
+                "metric": self._current_scan_params["survey_metric"],
+                "threshold": self._current_scan_params["survey_threshold"],
+                "dilation": self._current_scan_params["survey_dilation"],
+                **survey.as_dict(),
+                # Spectra less the readout offset, divided by each point's
+                # integration_time_ms
+                "intensity_unit": "counts/s",
+            }
 
         spectrometer_meta = {
             "integration_time_ms": self.spectrometer.integration_time_ms,
@@ -142,10 +260,13 @@ class AppController:
             self._current_scan_params["raman_max"],
         )
 
-        heatmap_grid = self._compute_heatmap_from_points(
-            scan_points,
-            heatmap_bounds,
-        )
+        if volume is not None:
+            heatmap_grid, _ = volume.max_projection(*heatmap_bounds)
+        else:
+            heatmap_grid = self._compute_heatmap_from_points(
+                scan_points,
+                heatmap_bounds,
+            )
 
         return ScanResult(
             scan_meta=scan_meta,
@@ -156,34 +277,29 @@ class AppController:
             heatmap_png=self.heatmap_png_bytes,
             camera_overview_png=self.camera_overview_png,
             camera_raw_png=self.camera_raw_png,
+            volume=volume,
+            scan_mask=mask_grid,
         )
 
     def _compute_heatmap_from_points(self, scan_points, heatmap_bounds):
-        x0, y0, w, h = self._current_roi
-        step_x = self._current_scan_params["step_size_x"]
-        step_y = self._current_scan_params["step_size_y"]
-
-        xs = np.arange(x0, x0 + w, step_x)
-        ys = np.arange(y0, y0 + h, step_y)
-
-        grid = np.full((len(ys), len(xs)), np.nan)
-
-        x_index = {round(x, 6): i for i, x in enumerate(xs)}
-        y_index = {round(y, 6): i for i, y in enumerate(ys)}
+        grid = ScanGrid.from_roi(
+            *self._current_roi,
+            self._current_scan_params["step_size_x"],
+            self._current_scan_params["step_size_y"],
+        )
+        heatmap = np.full(grid.shape, np.nan)
 
         left, right = heatmap_bounds
 
         for point in scan_points:
-            xi = x_index.get(round(point.x, 6))
-            yi = y_index.get(round(point.y, 6))
-
-            if xi is None or yi is None:
+            index = grid.index(point.x, point.y)
+            if index is None:
                 continue
 
             mask = (point.raman_shifts >= left) & (point.raman_shifts <= right)
-            grid[yi, xi] = float(point.intensities[mask].sum())
+            heatmap[index] = float(point.intensities[mask].sum())
 
-        return grid
+        return heatmap
 
     def save_current_scan(self, path: Path):
         if self.current_scan is None:
@@ -192,6 +308,8 @@ class AppController:
         self.current_scan.camera_png = self.camera_overview_png
         self.current_scan.camera_raw_png = self.camera_raw_png
 
+        from project_io.save_project import Raman2DScanWriter
+
         writer = Raman2DScanWriter()
         writer.write(
             path=path,
@@ -203,16 +321,27 @@ class AppController:
             heatmap_png=self.current_scan.heatmap_png,
             camera_png=self.current_scan.camera_png,
             camera_raw_png=self.current_scan.camera_raw_png,
+            volume=self.current_scan.volume,
+            scan_mask=self.current_scan.scan_mask,
         )
 
         self.scan_dirty = False
 
     def load_scan(self, path: Path):
+        from project_io.load_project import Raman2DScanReader
+
         reader = Raman2DScanReader()
+        self.close_scan()
         self.current_scan = reader.read(path)
         self.scan_dirty = False
         return self.current_scan
 
+    def close_scan(self):
+        """Drop the current scan, deleting a Z-stack's temporary slices."""
+        scan, self.current_scan = self.current_scan, None
+        if scan is not None and scan.volume is not None:
+            scan.volume.close()
+
     def update_camera_images(self, *, raw: bytes, overview: bytes):
         self.camera_raw_png = raw
         self.camera_overview_png = overview
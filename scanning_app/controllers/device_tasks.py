@@ -0,0 +1,94 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import count
+
+from loguru import logger
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from config import THREAD_POOL_SIZE
+
+
+class DeviceTaskRunner(QObject):
+    """Runs blocking driver calls on a worker pool.
+
+    Results are re-emitted as Qt signals, so slots run on the GUI thread.
+    A task that exceeds its timeout is reported as failed; if it completes
+    later, its result goes to ``on_late_result`` instead of the caller.
+    """
+
+    _completed = pyqtSignal(int, object, object)
+
+    def __init__(self, max_workers: int = THREAD_POOL_SIZE, parent=None):
+        super().__init__(parent)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="device"
+        )
+        self._ids = count()
+        self._tasks: dict[int, dict] = {}
+        self._completed.connect(self._on_completed)
+
+    def submit(
+        self,
+        fn,
+        *args,
+        on_result=None,
+        on_error=None,
+        timeout_s: float | None = None,
+        on_late_result=None,
+    ) -> int:
+        task_id = next(self._ids)
+        self._tasks[task_id] = {
+            "on_result": on_result,
+            "on_error": on_error,
+            "on_late_result": on_late_result,
+            "timed_out": False,
+        }
+
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(lambda f: self._emit_completed(task_id, f))
+
+        if timeout_s is not None:
+            QTimer.singleShot(
+                int(timeout_s * 1000), lambda: self._on_timeout(task_id, timeout_s)
+            )
+        return task_id
+
+    def _emit_completed(self, task_id: int, future: Future) -> None:
+        # Called on the worker thread; the queued signal hops to the GUI thread.
+        if future.cancelled():
+            # Dropped by shutdown(); nobody is waiting for it any more.
+            return
+        error = future.exception()
+        self._completed.emit(task_id, None if error else future.result(), error)
+
+    def _on_completed(self, task_id: int, result, error) -> None:
+        task = self._tasks.pop(task_id, None)
+        if task is None:
+            return
+
+        if task["timed_out"]:
+            if error is None and task["on_late_result"] is not None:
+                task["on_late_result"](result)
+            return
+
+        if error is not None:
+            logger.opt(exception=error).debug(f"Device task {task_id} failed")
+            if task["on_error"] is not None:
+                task["on_error"](str(error) or type(error).__name__)
+            return
+
+        if task["on_result"] is not None:
+            task["on_result"](result)
+
+    def _on_timeout(self, task_id: int, timeout_s: float) -> None:
+        task = self._tasks.get(task_id)
+        if task is None or task["timed_out"]:
+            return
+
+        task["timed_out"] = True
+        logger.warning(f"Device task {task_id} timed out after {timeout_s:.1f} s")
+        if task["on_error"] is not None:
+            task["on_error"](f"Timed out after {timeout_s:.1f} s")
+
+    def shutdown(self) -> None:
+        self._tasks.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
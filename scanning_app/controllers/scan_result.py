@@ -11,3 +11,7 @@ class ScanResult:
     heatmap_png: bytes
     camera_overview_png: bytes
     camera_raw_png: bytes
+    # ScanVolume of a Z-stack scan; spectra_df is then empty
+    volume: object = None
+    # Boolean (ny, nx) grid of the nodes a masked scan acquired
+    scan_mask: object = None
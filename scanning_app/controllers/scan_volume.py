@@ -0,0 +1,246 @@
+import io
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+from devices.scan_worker import ScanPoint
+
+
+class ScanVolume:
+    """Spectra on an (x, y, z) grid, stored as one chunk per z slice.
+
+    A slice is a float32 ``(ny, nx, channels)`` array; points never measured
+    are NaN. Slices are written once, when complete, and read back one at a
+    time, so acquisition and every view need at most one slice in memory.
+    Slices live in a temporary directory while scanning and in the project
+    archive once saved (see ``project_io.format.VOLUME_DIR``).
+    """
+
+    def __init__(self, xs, ys, zs, raman_shifts, source):
+        self.xs = np.asarray(xs, dtype=float)
+        self.ys = np.asarray(ys, dtype=float)
+        self.zs = np.asarray(zs, dtype=float)
+        self.raman_shifts = np.asarray(raman_shifts, dtype=float)
+        self._source = source
+        self._current: tuple[int, np.ndarray] | None = None
+
+    @classmethod
+    def create(cls, xs, ys, zs, raman_shifts) -> "ScanVolume":
+        """Empty volume backed by a temporary directory."""
+        return cls(xs, ys, zs, raman_shifts, _DirectorySlices())
+
+    @classmethod
+    def from_archive(cls, path: Path, meta: dict) -> "ScanVolume":
+        """Volume whose slices are members of a saved project."""
+        source = _ArchiveSlices(Path(path), meta["slices"])
+        with zipfile.ZipFile(path, "r") as zf:
+            raman_shifts = np.load(
+                io.BytesIO(zf.read(meta["raman_shifts"])), allow_pickle=False
+            )
+        return cls(meta["xs"], meta["ys"], meta["zs"], raman_shifts, source)
+
+    @property
+    def shape(self) -> tuple[int, int, int, int]:
+        """``(nz, ny, nx, channels)``."""
+        return (len(self.zs), len(self.ys), len(self.xs), len(self.raman_shifts))
+
+    @property
+    def completed_slices(self) -> int:
+        return len(self._source)
+
+    def measured_points(self) -> int:
+        """Number of spectra stored across all slices."""
+        return sum(
+            int(np.isfinite(self.slice(k)[..., 0]).sum()) for k in range(len(self.zs))
+        )
+
+    # -- acquisition ---------------------------------------------------------
+
+    def begin_slice(self, k: int) -> np.ndarray:
+        """Buffer for slice ``k``, filled by the scan and kept until
+        ``finish_slice``."""
+        _, ny, nx, channels = self.shape
+        buffer = np.full((ny, nx, channels), np.nan, dtype=np.float32)
+        self._current = (k, buffer)
+        return buffer
+
+    def finish_slice(self) -> None:
+        """Write the slice being acquired and drop it from memory."""
+        if self._current is None:
+            return
+        k, buffer = self._current
+        self._current = None
+        self._source.write(k, buffer)
+
+    # -- reading -------------------------------------------------------------
+
+    def slice(self, k: int) -> np.ndarray:
+        """Spectra of slice ``k`` (read-only; all NaN if never acquired)."""
+        if self._current is not None and self._current[0] == k:
+            return self._current[1]
+        data = self._source.read(k)
+        if data is None:
+            _, ny, nx, channels = self.shape
+            data = np.full((ny, nx, channels), np.nan, dtype=np.float32)
+        return data
+
+    def _band(self, raman_min: float, raman_max: float) -> np.ndarray:
+        mask = (self.raman_shifts >= raman_min) & (self.raman_shifts <= raman_max)
+        return mask.astype(np.float32)
+
+    def integrate_slice(self, k: int, raman_min: float, raman_max: float) -> np.ndarray:
+        """Integrated intensity of slice ``k`` over a Raman band, ``(ny, nx)``."""
+        return self.slice(k) @ self._band(raman_min, raman_max)
+
+    def max_projection(
+        self, raman_min: float, raman_max: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Maximum integrated intensity over z and the slice it comes from.
+
+        Reads each slice once; unmeasured pixels are NaN with index -1.
+        """
+        grid, best, _ = self._project(raman_min, raman_max, keep_spectra=False)
+        return grid, best
+
+    def _project(self, raman_min, raman_max, keep_spectra: bool):
+        _, ny, nx, channels = self.shape
+        band = self._band(raman_min, raman_max)
+        grid = np.full((ny, nx), np.nan)
+        best = np.full((ny, nx), -1, dtype=np.intp)
+        spectra = (
+            np.full((ny, nx, channels), np.nan, dtype=np.float32)
+            if keep_spectra
+            else None
+        )
+
+        for k in range(len(self.zs)):
+            data = self.slice(k)
+            values = data @ band
+            better = np.isfinite(values) & ~(values <= grid)
+            grid[better] = values[better]
+            best[better] = k
+            if spectra is not None:
+                spectra[better] = data[better]
+        return grid, best, spectra
+
+    def slice_points(self, k: int) -> list[ScanPoint]:
+        """Measured points of slice ``k``; spectra are views into the slice."""
+        data = self.slice(k)
+        z = float(self.zs[k])
+        return [
+            ScanPoint(
+                float(self.xs[xi]),
+                float(self.ys[yi]),
+                self.raman_shifts,
+                data[yi, xi],
+                z,
+            )
+            for yi, xi in zip(*np.nonzero(np.isfinite(data[..., 0])))
+        ]
+
+    def projection_points(self, raman_min: float, raman_max: float) -> list[ScanPoint]:
+        """One point per (x, y): the spectrum of its brightest slice."""
+        _, best, spectra = self._project(raman_min, raman_max, keep_spectra=True)
+        return [
+            ScanPoint(
+                float(self.xs[xi]),
+                float(self.ys[yi]),
+                self.raman_shifts,
+                spectra[yi, xi],
+                float(self.zs[best[yi, xi]]),
+            )
+            for yi, xi in zip(*np.nonzero(best >= 0))
+        ]
+
+    # -- storage -------------------------------------------------------------
+
+    def write_to_archive(self, zf: zipfile.ZipFile, directory: str) -> dict:
+        """Store the volume under ``directory``, each slice uncompressed so a
+        reader can load one without inflating the others.
+
+        Returns the metadata ``from_archive`` needs.
+        """
+        shifts_name = f"{directory}/raman_shifts.npy"
+        buffer = io.BytesIO()
+        np.save(buffer, self.raman_shifts, allow_pickle=False)
+        zf.writestr(shifts_name, buffer.getvalue())
+
+        slices = {}
+        for k in range(len(self.zs)):
+            data = self._source.read(k)
+            if data is None:
+                continue
+            name = f"{directory}/slice_{k:04d}.npy"
+            info = zipfile.ZipInfo(name)
+            info.compress_type = zipfile.ZIP_STORED
+            with zf.open(info, "w", force_zip64=True) as member:
+                np.save(member, data, allow_pickle=False)
+            slices[str(k)] = name
+
+        return {
+            "xs": self.xs.tolist(),
+            "ys": self.ys.tolist(),
+            "zs": self.zs.tolist(),
+            "raman_shifts": shifts_name,
+            "slices": slices,
+        }
+
+    def close(self) -> None:
+        self._current = None
+        self._source.close()
+
+
+class _DirectorySlices:
+    """Slices as ``.npy`` files in a temporary directory, memory-mapped on read."""
+
+    def __init__(self):
+        self._dir = Path(tempfile.mkdtemp(prefix="scan-volume-"))
+        self._written: set[int] = set()
+        logger.debug(f"Scan volume slices in {self._dir}")
+
+    def __len__(self) -> int:
+        return len(self._written)
+
+    def _path(self, k: int) -> Path:
+        return self._dir / f"slice_{k:04d}.npy"
+
+    def write(self, k: int, data: np.ndarray) -> None:
+        np.save(self._path(k), data, allow_pickle=False)
+        self._written.add(k)
+
+    def read(self, k: int) -> np.ndarray | None:
+        if k not in self._written:
+            return None
+        return np.load(self._path(k), mmap_mode="r", allow_pickle=False)
+
+    def close(self) -> None:
+        shutil.rmtree(self._dir, ignore_errors=True)
+        self._written.clear()
+
+
+class _ArchiveSlices:
+    """Slices stored in a project archive, keyed by slice index."""
+
+    def __init__(self, path: Path, names: dict):
+        self._path = path
+        self._names = {int(k): name for k, name in names.items()}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def write(self, k: int, data: np.ndarray) -> None:
+        raise RuntimeError("Saved scan volumes are read-only")
+
+    def read(self, k: int) -> np.ndarray | None:
+        name = self._names.get(k)
+        if name is None:
+            return None
+        with zipfile.ZipFile(self._path, "r") as zf, zf.open(name) as member:
+            return np.load(member, allow_pickle=False)
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,90 @@
+"""SNR-targeted dwell: accumulate short exposures until the band is clear.
+
+Instead of one exposure of fixed length per point, a point is measured with
+repeated sub-exposures whose sum is checked after each one. Bright points stop
+as soon as the band SNR reaches the target; dark points keep integrating up to
+the dwell limit. A frame that reaches the spectrometer's saturation level is
+discarded and the exposure halved.
+
+Spectra are returned as counts per second of integration, so band sums of
+points with different dwell times are directly comparable.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from config import ADAPTIVE_DWELL_MIN_EXPOSURE_MS
+from .survey_scan import SNR, band_metric
+
+
+@dataclass
+class DwellResult:
+    raman_shifts: np.ndarray
+    # Accumulated spectrum divided by the dwell time, in counts per second
+    intensities: np.ndarray
+    dwell_ms: float
+    accumulations: int
+    # Sub-exposure in use at the end (shorter than requested after saturation)
+    exposure_ms: float
+    snr: float
+    saturated_frames: int
+
+
+def acquire_to_snr(
+    spectrometer,
+    raman_min: float,
+    raman_max: float,
+    target_snr: float,
+    exposure_ms: float,
+    max_dwell_ms: float,
+) -> DwellResult:
+    """Accumulate exposures at the current position until the band SNR of
+    the sum reaches ``target_snr`` or the kept exposures add up to
+    ``max_dwell_ms``. At least one exposure is always kept.
+
+    Saturation is checked against ``spectrometer.saturation_level`` when the
+    spectrometer has one. The spectrometer's integration time is restored
+    afterwards.
+    """
+    saturation = getattr(spectrometer, "saturation_level", None)
+    original_ms = spectrometer.integration_time_ms
+
+    total = None
+    dwell_ms = 0.0
+    accumulations = 0
+    saturated = 0
+    snr = 0.0
+    try:
+        while total is None or (snr < target_snr and dwell_ms < max_dwell_ms):
+            spectrometer.integration_time_ms = exposure_ms
+            raman_shifts, frame = spectrometer.acquire_spectrum()
+
+            if (
+                saturation is not None
+                and exposure_ms > ADAPTIVE_DWELL_MIN_EXPOSURE_MS
+                and float(np.max(frame)) >= saturation
+            ):
+                saturated += 1
+                exposure_ms = max(ADAPTIVE_DWELL_MIN_EXPOSURE_MS, exposure_ms / 2)
+                continue
+
+            if total is None:
+                total = np.asarray(frame, dtype=np.float64).copy()
+            else:
+                total += frame
+            dwell_ms += exposure_ms
+            accumulations += 1
+            snr = band_metric(raman_shifts, total, raman_min, raman_max, SNR)
+    finally:
+        spectrometer.integration_time_ms = original_ms
+
+    return DwellResult(
+        raman_shifts=raman_shifts,
+        intensities=total / (dwell_ms / 1000.0),
+        dwell_ms=dwell_ms,
+        accumulations=accumulations,
+        exposure_ms=exposure_ms,
+        snr=snr,
+        saturated_frames=saturated,
+    )
@@ -1,6 +1,13 @@
 from abc import ABC, abstractmethod
 from PyQt6.QtGui import QImage
 
+from config import CAMERA_STACK_TIMEOUT_SEC
+from .frame_buffer import Frame, FrameGeometry, FrameRingBuffer, qimage_to_array
+from .stacking import stack_stream
+
+# (x, y, width, height) in full-resolution sensor pixels
+SensorRoi = tuple[int, int, int, int]
+
 
 class BaseCamera(ABC):
 
@@ -33,3 +40,41 @@ class BaseCamera(ABC):
     def set_gamma(self, value: int): ...
     def set_contrast(self, value: int): ...
     def set_binning(self, value: int): ...
+    def set_sensor_roi(self, roi: SensorRoi | None): ...
+    def set_raw_mode(self, enabled: bool): ...
+
+    def frame_geometry(self) -> FrameGeometry:
+        return FrameGeometry()
+
+    def capture_frame(self) -> Frame:
+        """Capture one frame as an array; release it when done."""
+        image = self.capture()
+        return Frame(
+            data=qimage_to_array(image),
+            seq=0,
+            timestamp=0.0,
+            slot=0,
+            geometry=self.frame_geometry(),
+        )
+
+    def capture_stacked(self, count: int, align: bool = False) -> Frame:
+        """Average ``count`` consecutive live frames into one frame.
+
+        With ``align``, each frame is registered to the first before it is
+        added, so slow drift does not blur the result.
+        """
+        was_streaming = self.is_streaming()
+        stream = self.start_stream()
+        try:
+            return stack_stream(stream, count, align, CAMERA_STACK_TIMEOUT_SEC)
+        finally:
+            if not was_streaming:
+                self.stop_stream()
+
+    def start_stream(self) -> FrameRingBuffer:
+        raise NotImplementedError(f"{type(self).__name__} does not support live view")
+
+    def stop_stream(self) -> None: ...
+
+    def is_streaming(self) -> bool:
+        return False
@@ -0,0 +1,176 @@
+"""Vectorised conversion of raw sensor frames for display.
+
+Raw frames are 2-D uint8/uint16 arrays. A Bayer frame carries its 2x2 colour
+filter pattern ("RGGB", "BGGR", "GRBG" or "GBRG", read row-major from the
+top-left pixel); a monochrome frame has no pattern and is already luminance.
+"""
+
+import numpy as np
+
+from .frame_buffer import Frame, FrameGeometry
+
+BAYER_PATTERNS = ("RGGB", "BGGR", "GRBG", "GBRG")
+
+BILINEAR = "bilinear"
+SUPERPIXEL = "superpixel"
+LUMINANCE = "luminance"
+RAW_DISPLAY_METHODS = (BILINEAR, SUPERPIXEL, LUMINANCE)
+
+_CHANNEL = {"R": 0, "G": 1, "B": 2}
+# Position of each pattern letter within the 2x2 tile: (row, col)
+_SITES = ((0, 0), (0, 1), (1, 0), (1, 1))
+
+
+def pattern_from_fourcc(fourcc: int) -> str | None:
+    """Bayer pattern for a Toupcam ``get_RawFormat`` FourCC; None for mono."""
+    code = "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4))
+    return code if code in BAYER_PATTERNS else None
+
+
+def mosaic(rgb: np.ndarray, pattern: str) -> np.ndarray:
+    """Sample an (H, W, 3) image through a Bayer filter (for synthetic frames)."""
+    height, width = rgb.shape[0] // 2 * 2, rgb.shape[1] // 2 * 2
+    raw = np.empty((height, width), dtype=rgb.dtype)
+    for (dy, dx), colour in zip(_SITES, pattern):
+        raw[dy::2, dx::2] = rgb[dy:height:2, dx:width:2, _CHANNEL[colour]]
+    return raw
+
+
+def to_8bit(raw: np.ndarray, bit_depth: int = 8) -> np.ndarray:
+    """Scale ``bit_depth``-bit samples to uint8; uint8 input is returned as-is."""
+    if raw.dtype == np.uint8:
+        return raw
+    return (raw >> max(0, bit_depth - 8)).astype(np.uint8)
+
+
+def _quarters(raw: np.ndarray, pattern: str):
+    """Yield ``(dy, dx, colour, plane)`` for the four sub-lattices of ``raw``."""
+    for (dy, dx), colour in zip(_SITES, pattern):
+        yield dy, dx, colour, raw[dy::2, dx::2]
+
+
+def _check(raw: np.ndarray, pattern: str) -> None:
+    if pattern not in BAYER_PATTERNS:
+        raise ValueError(f"Unknown Bayer pattern: {pattern!r}")
+    if raw.ndim != 2 or raw.shape[0] % 2 or raw.shape[1] % 2:
+        raise ValueError(f"Bayer frames must be 2-D with even size, got {raw.shape}")
+
+
+def _work_dtype(raw: np.ndarray):
+    # Room for the sum of four samples without overflow.
+    return np.uint16 if raw.dtype == np.uint8 else np.uint32
+
+
+def superpixel(raw: np.ndarray, pattern: str) -> np.ndarray:
+    """Half-resolution RGB: each 2x2 tile becomes one pixel, no interpolation."""
+    _check(raw, pattern)
+    height, width = raw.shape
+    out = np.empty((height // 2, width // 2, 3), dtype=raw.dtype)
+    green = np.zeros(out.shape[:2], dtype=_work_dtype(raw))
+
+    for _, _, colour, plane in _quarters(raw, pattern):
+        if colour == "G":
+            green += plane
+        else:
+            out[..., _CHANNEL[colour]] = plane
+
+    green += 1
+    green >>= 1
+    out[..., 1] = green
+    return out
+
+
+def luminance(raw: np.ndarray, pattern: str | None) -> np.ndarray:
+    """Half-resolution (R + 2G + B) / 4 per 2x2 tile; mono frames pass through."""
+    if pattern is None:
+        return raw
+
+    _check(raw, pattern)
+    total = np.zeros((raw.shape[0] // 2, raw.shape[1] // 2), dtype=_work_dtype(raw))
+    for _, _, _, plane in _quarters(raw, pattern):
+        total += plane
+    total += 2
+    total >>= 2
+    return total.astype(raw.dtype)
+
+
+def bilinear(raw: np.ndarray, pattern: str) -> np.ndarray:
+    """Full-resolution RGB by bilinear interpolation of the missing colours.
+
+    Each sub-lattice is interpolated with strided views of a 1-pixel reflected
+    border (reflection keeps the Bayer phase at the edges), so the whole frame
+    is a handful of array adds with no Python-level pixel loops.
+    """
+    _check(raw, pattern)
+    height, width = raw.shape
+    padded = np.pad(raw, 1, mode="reflect")
+    out = np.empty((height, width, 3), dtype=raw.dtype)
+    acc = np.empty((height // 2, width // 2), dtype=_work_dtype(raw))
+
+    def near(dy, dx, oy, ox):
+        # Neighbour (oy, ox) of every pixel of sub-lattice (dy, dx).
+        y0, x0 = 1 + dy + oy, 1 + dx + ox
+        return padded[y0 : y0 + height : 2, x0 : x0 + width : 2]
+
+    def mean_into(target, offsets):
+        # Rounded mean of 2 or 4 neighbours, accumulated without temporaries.
+        shift = len(offsets) // 2
+        np.add(near(*offsets[0]), near(*offsets[1]), out=acc, dtype=acc.dtype)
+        for offset in offsets[2:]:
+            np.add(acc, near(*offset), out=acc)
+        np.add(acc, shift, out=acc)
+        np.right_shift(acc, shift, out=acc)
+        target[...] = acc
+
+    colour_at = dict(zip(_SITES, pattern))
+    for (dy, dx), colour in colour_at.items():
+        site = out[dy::2, dx::2]
+        site[..., _CHANNEL[colour]] = raw[dy::2, dx::2]
+
+        if colour == "G":
+            row_colour = colour_at[(dy, 1 - dx)]
+            col_colour = colour_at[(1 - dy, dx)]
+            mean_into(site[..., _CHANNEL[row_colour]], [(dy, dx, 0, -1), (dy, dx, 0, 1)])
+            mean_into(site[..., _CHANNEL[col_colour]], [(dy, dx, -1, 0), (dy, dx, 1, 0)])
+        else:
+            other = "B" if colour == "R" else "R"
+            mean_into(
+                site[..., 1],
+                [(dy, dx, -1, 0), (dy, dx, 1, 0), (dy, dx, 0, -1), (dy, dx, 0, 1)],
+            )
+            mean_into(
+                site[..., _CHANNEL[other]],
+                [(dy, dx, -1, -1), (dy, dx, -1, 1), (dy, dx, 1, -1), (dy, dx, 1, 1)],
+            )
+
+    return out
+
+
+def develop(frame: Frame, method: str = BILINEAR) -> tuple[np.ndarray, FrameGeometry]:
+    """Turn a raw frame into uint8 display pixels and their geometry.
+
+    Frames that are already displayable are returned unchanged. Half-resolution
+    methods double the geometry's binning so the image still covers the same
+    sensor area.
+    """
+    if method not in RAW_DISPLAY_METHODS:
+        raise ValueError(f"Unknown raw display method: {method!r}")
+
+    pixels = to_8bit(frame.data, frame.bit_depth)
+    geometry = frame.geometry
+    if frame.bayer is None:
+        return pixels, geometry
+
+    if method == BILINEAR:
+        return bilinear(pixels, frame.bayer), geometry
+
+    half = FrameGeometry(
+        geometry.binning * 2,
+        geometry.origin_x,
+        geometry.origin_y,
+        geometry.sensor_width,
+        geometry.sensor_height,
+    )
+    if method == SUPERPIXEL:
+        return superpixel(pixels, frame.bayer), half
+    return luminance(pixels, frame.bayer), half
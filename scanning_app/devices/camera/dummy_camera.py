@@ -1,13 +1,30 @@
+import threading
+import time
 from pathlib import Path
 
+import numpy as np
 from loguru import logger
 from PyQt6.QtGui import QImage
 
-from .base_camera import BaseCamera
+from config import (
+    CAMERA_PIXEL_SIZE_UM,
+    CAMERA_STREAM_BUFFER_SLOTS,
+    DUMMY_CAMERA_BAYER_PATTERN,
+    DUMMY_CAMERA_DEFOCUS_PX_PER_UM,
+    DUMMY_CAMERA_FOCUS_Z_UM,
+    DUMMY_CAMERA_STREAM_FPS,
+)
+from .base_camera import BaseCamera, SensorRoi
+from .demosaic import bilinear, mosaic
+from .frame_buffer import Frame, FrameGeometry, FrameRingBuffer, qimage_to_array
 
 
 class DummyCamera(BaseCamera):
-    def __init__(self, image_path: str | Path | None = None):
+    def __init__(
+        self,
+        image_path: str | Path | None = None,
+        stream_fps: float = DUMMY_CAMERA_STREAM_FPS,
+    ):
         self._connected = False
 
         if image_path is None:
@@ -18,26 +35,243 @@ class DummyCamera(BaseCamera):
         self._image_path = self._image_path.resolve()
         logger.info(f"Using dummy image: {self._image_path}")
 
+        self.stream_fps = stream_fps
+        self._binning = 1
+        self._sensor_roi: SensorRoi | None = None
+        self._raw = False
+        self.bayer_pattern = DUMMY_CAMERA_BAYER_PATTERN
+        self._sensor_pixels: np.ndarray | None = None
+        self._stage = None
+        self.focus_z = DUMMY_CAMERA_FOCUS_Z_UM
+        self._stream: FrameRingBuffer | None = None
+        self._stream_thread: threading.Thread | None = None
+        self._stop_stream = threading.Event()
+
     def connect(self) -> None:
         self._connected = True
         logger.info("Dummy camera connected")
 
     def disconnect(self) -> None:
+        self.stop_stream()
         self._connected = False
         logger.info("Dummy camera disconnected")
 
     def is_connected(self) -> bool:
         return self._connected
 
-    def capture(self) -> QImage:
+    def _load_image(self) -> QImage:
         image = QImage(str(self._image_path))
         if image.isNull():
             raise RuntimeError(f"Failed to load dummy image: {self._image_path}")
 
         return image
 
+    def _sensor(self) -> np.ndarray:
+        if self._sensor_pixels is None:
+            self._sensor_pixels = qimage_to_array(self._load_image())
+        return self._sensor_pixels
+
+    def attach_stage(self, motor_controller) -> None:
+        """Follow the stage: the image is treated as a sample that repeats
+        (mirrored) in every direction, and the field moves over it. With a
+        focus axis, frames blur in proportion to ``|z - focus_z|``."""
+        self._stage = motor_controller
+
+    def _stage_offset(self) -> tuple[int, int]:
+        """Field offset in sensor pixels (view y points down, stage y up)."""
+        if self._stage is None:
+            return (0, 0)
+        x, y = self._stage.position[:2]
+        return (
+            int(round(x / CAMERA_PIXEL_SIZE_UM)),
+            int(round(-y / CAMERA_PIXEL_SIZE_UM)),
+        )
+
+    def _defocus_sigma(self) -> float:
+        """Gaussian blur of the delivered (binned) frame, in its pixels."""
+        if self._stage is None or not self._stage.has_focus_axis():
+            return 0.0
+        defocus = abs(self._stage.get_z() - self.focus_z)
+        return defocus * DUMMY_CAMERA_DEFOCUS_PX_PER_UM / self._binning
+
+    def _stage_state(self) -> tuple:
+        return self._stage_offset(), self._defocus_sigma()
+
+    def set_binning(self, value: int) -> None:
+        self._binning = max(1, int(value))
+        logger.debug(f"Dummy camera binning set to {self._binning}x")
+
+    def set_sensor_roi(self, roi: SensorRoi | None) -> None:
+        self._sensor_roi = roi
+        logger.debug(f"Dummy camera sensor ROI set to {roi}")
+
+    def set_raw_mode(self, enabled: bool) -> None:
+        self._raw = bool(enabled)
+        logger.debug(f"Dummy camera raw mode {'on' if self._raw else 'off'}")
+
+    @property
+    def _bayer(self) -> str | None:
+        return self.bayer_pattern if self._raw else None
+
+    def frame_geometry(self) -> FrameGeometry:
+        sensor_h, sensor_w = self._sensor().shape[:2]
+        x, y, _, _ = self._roi_bounds(sensor_w, sensor_h)
+        return FrameGeometry(self._binning, x, y, sensor_w, sensor_h)
+
+    def _roi_bounds(self, sensor_w: int, sensor_h: int) -> SensorRoi:
+        if self._sensor_roi is None:
+            return (0, 0, sensor_w, sensor_h)
+
+        x, y, w, h = (int(v) for v in self._sensor_roi)
+        x = min(max(0, x), sensor_w - 1)
+        y = min(max(0, y), sensor_h - 1)
+        return (x, y, min(w, sensor_w - x), min(h, sensor_h - y))
+
+    def _read_sensor(self) -> np.ndarray:
+        """Crop to the sensor ROI and average-bin, as the hardware would."""
+        sensor = self._sensor()
+        x, y, w, h = self._roi_bounds(sensor.shape[1], sensor.shape[0])
+
+        b = self._binning
+        w, h = max(b, w // b * b), max(b, h // b * b)
+        dx, dy = self._stage_offset()
+        if dx or dy:
+            rows = _mirror(np.arange(y + dy, y + dy + h), sensor.shape[0])
+            cols = _mirror(np.arange(x + dx, x + dx + w), sensor.shape[1])
+            pixels = sensor[np.ix_(rows, cols)]
+        else:
+            pixels = sensor[y : y + h, x : x + w]
+        if b > 1:
+            pixels = pixels.reshape(h // b, b, w // b, b, 3).mean(
+                axis=(1, 3), dtype=np.float32
+            )
+            pixels = pixels.astype(np.uint8)
+
+        sigma = self._defocus_sigma()
+        if sigma > 0:
+            pixels = _gaussian_blur(pixels, sigma)
+        return pixels
+
+    def _read_frame(self) -> np.ndarray:
+        """Sensor data as delivered: RGB, or a synthetic Bayer mosaic in raw mode."""
+        pixels = self._read_sensor()
+        if self._raw:
+            return mosaic(pixels, self.bayer_pattern)
+        return np.ascontiguousarray(pixels)
+
+    def capture(self) -> QImage:
+        unchanged = self._binning == 1 and self._sensor_roi is None and not self._raw
+        if unchanged and self._stage_state() == ((0, 0), 0.0):
+            return self._load_image()
+
+        pixels = self._read_frame()
+        if self._raw:
+            pixels = bilinear(pixels, self.bayer_pattern)
+        height, width = pixels.shape[:2]
+        return QImage(
+            pixels.data, width, height, width * 3, QImage.Format.Format_RGB888
+        ).copy()
+
+    def capture_frame(self) -> Frame:
+        return Frame(
+            data=self._read_frame(),
+            seq=0,
+            timestamp=time.perf_counter(),
+            slot=0,
+            geometry=self.frame_geometry(),
+            bayer=self._bayer,
+        )
+
+    def start_stream(self) -> FrameRingBuffer:
+        if not self._connected:
+            raise RuntimeError("Camera not connected")
+
+        self.stop_stream()
+
+        base = self._read_frame()
+        self._stream = FrameRingBuffer(
+            CAMERA_STREAM_BUFFER_SLOTS,
+            base.shape,
+            geometry=self.frame_geometry(),
+            bayer=self._bayer,
+        )
+        self._stop_stream.clear()
+        self._stream_thread = threading.Thread(
+            target=self._generate_frames,
+            args=(base, self._stream),
+            name="dummy-camera-stream",
+            daemon=True,
+        )
+        self._stream_thread.start()
+        logger.info(f"Dummy camera streaming at {self.stream_fps:g} fps")
+        return self._stream
+
+    def _generate_frames(self, base: np.ndarray, stream: FrameRingBuffer) -> None:
+        # Synthetic live view: the still image drifts sideways so consecutive
+        # frames differ, written straight into the ring buffer slots. The
+        # shift stays even so a Bayer mosaic keeps its phase. With a stage
+        # attached the field follows the stage instead, and the image is read
+        # again whenever it moves or refocuses.
+        width = base.shape[1]
+        period = 1.0 / self.stream_fps
+        next_due = time.perf_counter()
+        shift = 0
+        drift = 2 if self._stage is None else 0
+        state = self._stage_state()
+
+        while not self._stop_stream.is_set():
+            if self._stage_state() != state:
+                state = self._stage_state()
+                frame = self._read_frame()
+                # Settings meant for the next stream may already be applied.
+                if frame.shape == base.shape:
+                    base = frame
+
+            acquired = stream.acquire_write()
+            if acquired is not None:
+                index, slot = acquired
+                slot[:, : width - shift] = base[:, shift:]
+                slot[:, width - shift :] = base[:, :shift]
+                stream.commit(index)
+
+            shift = (shift + drift) % width
+            next_due += period
+            delay = next_due - time.perf_counter()
+            if delay > 0:
+                self._stop_stream.wait(delay)
+            else:
+                next_due = time.perf_counter()
+
+    def stop_stream(self) -> None:
+        self._stop_stream.set()
+        if self._stream_thread is not None:
+            self._stream_thread.join()
+        self._stream_thread = None
+        self._stream = None
+
+    def is_streaming(self) -> bool:
+        return self._stream_thread is not None
+
     def set_exposure(self, value: int) -> None:
         logger.debug(f"Dummy camera exposure set to {value}")
 
     def set_gain(self, value: int) -> None:
         logger.debug(f"Dummy camera gain set to {value}")
+
+
+def _gaussian_blur(pixels: np.ndarray, sigma: float) -> np.ndarray:
+    """Blur an (H, W, C) uint8 image; the image wraps at its edges."""
+    height, width = pixels.shape[:2]
+    fy = np.fft.fftfreq(height)[:, None]
+    fx = np.fft.rfftfreq(width)[None, :]
+    transfer = np.exp(-2 * (np.pi * sigma) ** 2 * (fx**2 + fy**2))
+    spectrum = np.fft.rfft2(pixels.astype(np.float32), axes=(0, 1))
+    spectrum *= transfer[..., None]
+    blurred = np.fft.irfft2(spectrum, s=(height, width), axes=(0, 1))
+    return np.clip(blurred + 0.5, 0, 255).astype(np.uint8)
+
+
+def _mirror(index: np.ndarray, size: int) -> np.ndarray:
+    """Fold indices into ``[0, size)`` by reflecting at the edges."""
+    index = np.mod(index, 2 * size)
+    return np.where(index < size, index, 2 * size - 1 - index)
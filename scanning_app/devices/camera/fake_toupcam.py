@@ -0,0 +1,297 @@
+"""In-process stand-in for the ``toupcam`` SDK module.
+
+Implements the subset of ``toupcam.Toupcam`` that ``ToupcamCamera`` uses, with
+the SDK's threading model: callbacks fire from an internal thread, live frames
+arrive as TOUPCAM_EVENT_IMAGE at a fixed rate and a ``Snap`` produces
+TOUPCAM_EVENT_STILLIMAGE once the exposure has elapsed. Pixel brightness
+follows exposure time and gain, so a still taken after a settings change can
+be told apart from one exposed before it.
+
+Pass the module as ``ToupcamCamera(model, sdk=fake_toupcam)``; in debug mode
+it is available as the "Simulated Toupcam" device.
+"""
+
+import ctypes
+import sys
+import threading
+
+import numpy as np
+
+from .demosaic import mosaic
+from .toupcam import (
+    HRESULTException,
+    TOUPCAM_EVENT_DISCONNECTED,
+    TOUPCAM_EVENT_ERROR,
+    TOUPCAM_EVENT_IMAGE,
+    TOUPCAM_EVENT_STILLIMAGE,
+    TOUPCAM_OPTION_AWB_CONTINUOUS,
+    TOUPCAM_OPTION_BINNING,
+    TOUPCAM_OPTION_BITDEPTH,
+    TOUPCAM_OPTION_BYTEORDER,
+    TOUPCAM_OPTION_RAW,
+    ToupcamDeviceV2,
+    ToupcamFrameInfoV2,
+)
+
+__all__ = [
+    "HRESULTException",
+    "TOUPCAM_EVENT_DISCONNECTED",
+    "TOUPCAM_EVENT_ERROR",
+    "TOUPCAM_EVENT_IMAGE",
+    "TOUPCAM_EVENT_STILLIMAGE",
+    "TOUPCAM_OPTION_AWB_CONTINUOUS",
+    "TOUPCAM_OPTION_BINNING",
+    "TOUPCAM_OPTION_BITDEPTH",
+    "TOUPCAM_OPTION_BYTEORDER",
+    "TOUPCAM_OPTION_RAW",
+    "Toupcam",
+    "ToupcamFrameInfoV2",
+    "enumerate_devices",
+]
+
+# Preview resolutions; index 0 is the full sensor.
+RESOLUTIONS = ((1280, 960), (640, 480), (320, 240))
+LIVE_FPS = 30.0
+# Sensor readout added on top of the exposure before a still is delivered
+READOUT_S = 0.02
+RAW_PATTERN = "RGGB"
+RAW_BITS = 12
+# Exposure (µs) x gain (%) that renders the test pattern at nominal brightness
+NOMINAL_EXPOSURE = 10_000 * 100
+
+E_UNEXPECTED = 0x8000FFFF
+
+
+class _Model:
+    name = "Simulated Toupcam"
+    flag = 0
+    preview = len(RESOLUTIONS)
+    still = len(RESOLUTIONS)
+
+
+_DEVICE = ToupcamDeviceV2("Simulated Toupcam", "sim-0", _Model())
+
+
+def enumerate_devices():
+    return [("Simulated Toupcam", {"model": _DEVICE, "sdk": sys.modules[__name__]})]
+
+
+def _test_pattern(width: int, height: int) -> np.ndarray:
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    stripes = 0.5 + 0.5 * np.sin(x / 23.0) * np.cos(y / 31.0)
+    return np.stack(
+        [0.2 + 0.6 * x / width, 0.3 + 0.5 * stripes, 0.8 - 0.6 * y / height], axis=-1
+    )
+
+
+class Toupcam:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pattern = _test_pattern(*RESOLUTIONS[0])
+
+        self._esize = 0
+        self._roi = (0, 0, 0, 0)
+        self._options = {
+            TOUPCAM_OPTION_BINNING: 1,
+            TOUPCAM_OPTION_RAW: 0,
+            TOUPCAM_OPTION_BITDEPTH: 0,
+            TOUPCAM_OPTION_BYTEORDER: 1,
+        }
+        self._auto_expo = 1
+        self._expo_us = 10_000
+        self._gain = 100
+
+        self._callback = None
+        self._ctx = None
+        self._running = threading.Event()
+        self._closed = threading.Event()
+        self._live_thread: threading.Thread | None = None
+        self._live_frame: np.ndarray | None = None
+        self._stills: list[np.ndarray] = []
+
+        self.snaps = 0
+
+    # -- lifecycle ---------------------------------------------------------
+
+    @classmethod
+    def EnumV2(cls):
+        return [_DEVICE]
+
+    @classmethod
+    def Open(cls, camId):
+        return cls()
+
+    def Close(self):
+        self.Stop()
+        self._closed.set()
+
+    def StartPullModeWithCallback(self, fun, ctx):
+        self.Stop()
+        self._callback, self._ctx = fun, ctx
+        with self._lock:
+            self._live_frame = None
+            self._stills.clear()
+        self._running.set()
+        self._live_thread = threading.Thread(
+            target=self._run_live, name="fake-toupcam", daemon=True
+        )
+        self._live_thread.start()
+
+    def Stop(self):
+        self._running.clear()
+        thread = self._live_thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._live_thread = None
+
+    def _fire(self, event: int) -> None:
+        if self._callback is not None and self._running.is_set():
+            self._callback(event, self._ctx)
+
+    def _run_live(self) -> None:
+        period = 1.0 / LIVE_FPS
+        while self._running.is_set():
+            frame = self._render()
+            with self._lock:
+                self._live_frame = frame
+            self._fire(TOUPCAM_EVENT_IMAGE)
+            self._closed.wait(period)
+
+    # -- geometry ----------------------------------------------------------
+
+    def ResolutionNumber(self):
+        return len(RESOLUTIONS)
+
+    def get_Resolution(self, nResolutionIndex):
+        return RESOLUTIONS[nResolutionIndex]
+
+    def put_eSize(self, nResolutionIndex):
+        self._require_stopped()
+        self._esize = int(nResolutionIndex)
+
+    def get_eSize(self):
+        return self._esize
+
+    def get_Size(self):
+        return RESOLUTIONS[self._esize]
+
+    def put_Roi(self, xOffset, yOffset, xWidth, yHeight):
+        self._roi = (int(xOffset), int(yOffset), int(xWidth), int(yHeight))
+
+    def get_Roi(self):
+        return self._roi
+
+    def get_FinalSize(self):
+        width, height = self._roi[2:] if self._roi[2] else self.get_Size()
+        binning = self._options[TOUPCAM_OPTION_BINNING] & 0x7F
+        return (width // binning, height // binning)
+
+    def put_Option(self, iOption, iValue):
+        if iOption in (TOUPCAM_OPTION_RAW, TOUPCAM_OPTION_BITDEPTH):
+            self._require_stopped()
+        self._options[iOption] = int(iValue)
+
+    def get_Option(self, iOption):
+        return self._options.get(iOption, 0)
+
+    def MaxBitDepth(self):
+        return RAW_BITS
+
+    def get_RawFormat(self):
+        fourcc = int.from_bytes(RAW_PATTERN.encode(), "little")
+        bits = RAW_BITS if self._options[TOUPCAM_OPTION_BITDEPTH] else 8
+        return (fourcc, bits)
+
+    def _require_stopped(self):
+        if self._running.is_set():
+            raise HRESULTException(E_UNEXPECTED)
+
+    # -- exposure ----------------------------------------------------------
+
+    def put_AutoExpoEnable(self, bAutoExposure):
+        self._auto_expo = int(bAutoExposure)
+
+    def put_ExpoTime(self, Time):
+        self._expo_us = int(Time)
+
+    def get_ExpoTime(self):
+        return self._expo_us
+
+    def put_ExpoAGain(self, Gain):
+        self._gain = int(Gain)
+
+    def put_Gamma(self, Gamma):
+        pass
+
+    def put_Contrast(self, Contrast):
+        pass
+
+    # -- frames ------------------------------------------------------------
+
+    def _render(self) -> np.ndarray:
+        """Current settings applied to the test pattern, in the output format."""
+        level = (
+            1.0 if self._auto_expo else self._expo_us * self._gain / NOMINAL_EXPOSURE
+        )
+
+        scale = RESOLUTIONS[0][0] // self.get_Size()[0]
+        binning = (self._options[TOUPCAM_OPTION_BINNING] & 0x7F) * scale
+        x, y, w, h = self._roi
+        if not w:
+            x, y, (w, h) = 0, 0, self.get_Size()
+        x, y, w, h = (v * scale for v in (x, y, w, h))
+
+        pixels = self._pattern[y : y + h : binning, x : x + w : binning]
+        width, height = self.get_FinalSize()
+        pixels = np.clip(pixels[:height, :width] * (255 * level), 0, 255).astype(np.uint8)
+
+        if self._options[TOUPCAM_OPTION_RAW]:
+            raw = mosaic(pixels, RAW_PATTERN)
+            if self._options[TOUPCAM_OPTION_BITDEPTH]:
+                return raw.astype(np.uint16) << (RAW_BITS - 8)
+            return raw
+
+        rgbx = np.full(pixels.shape[:2] + (4,), 255, dtype=np.uint8)
+        bgr = self._options[TOUPCAM_OPTION_BYTEORDER] != 0
+        rgbx[..., :3] = pixels[..., ::-1] if bgr else pixels
+        return rgbx
+
+    def Snap(self, nResolutionIndex):
+        if not self._running.is_set():
+            raise HRESULTException(E_UNEXPECTED)
+
+        self.snaps += 1
+        # The still is exposed with the settings in force now.
+        exposure_s = self._expo_us / 1e6
+        frame = self._render()
+
+        def deliver():
+            with self._lock:
+                self._stills.append(frame)
+            self._fire(TOUPCAM_EVENT_STILLIMAGE)
+
+        timer = threading.Timer(exposure_s + READOUT_S, deliver)
+        timer.daemon = True
+        timer.start()
+
+    def PullImageV2(self, pImageData, bits, pInfo):
+        with self._lock:
+            frame = self._live_frame
+        if frame is None:
+            raise HRESULTException(E_UNEXPECTED)
+        self._copy_out(frame, pImageData, pInfo)
+
+    def PullStillImageV2(self, pImageData, bits, pInfo):
+        with self._lock:
+            if not self._stills:
+                raise HRESULTException(E_UNEXPECTED)
+            # A null buffer only peeks at the size, as in the SDK.
+            frame = self._stills[0] if pImageData is None else self._stills.pop(0)
+        self._copy_out(frame, pImageData, pInfo)
+
+    @staticmethod
+    def _copy_out(frame: np.ndarray, pImageData, pInfo) -> None:
+        if pInfo is not None:
+            pInfo.height, pInfo.width = frame.shape[:2]
+        if pImageData is not None:
+            ctypes.memmove(pImageData, frame.ctypes.data, frame.nbytes)
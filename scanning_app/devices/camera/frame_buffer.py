@@ -0,0 +1,288 @@
+import ctypes
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+from PyQt6.QtGui import QImage
+
+from config import CAMERA_FRAME_POOL_SIZE
+
+BUFFER_ALIGNMENT = 64
+
+
+def aligned_empty(shape, dtype=np.uint8, alignment: int = BUFFER_ALIGNMENT):
+    """Uninitialised array whose first byte sits on an ``alignment`` boundary."""
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    raw = np.empty(nbytes + alignment, dtype=np.uint8)
+    offset = (-raw.ctypes.data) % alignment
+    return raw[offset : offset + nbytes].view(dtype).reshape(shape)
+
+
+def buffer_pointer(array: np.ndarray):
+    """Pointer to ``array``'s memory in the form the SDK's ``char*`` args take."""
+    return array.ctypes.data_as(ctypes.POINTER(ctypes.c_char))
+
+
+def qimage_to_array(image: QImage) -> np.ndarray:
+    """Copy ``image`` into a tightly packed (H, W, 3) RGB array."""
+    image = image.convertToFormat(QImage.Format.Format_RGB888)
+    width, height = image.width(), image.height()
+
+    ptr = image.constBits()
+    ptr.setsize(image.sizeInBytes())
+    rows = np.frombuffer(ptr, dtype=np.uint8).reshape(height, image.bytesPerLine())
+    return rows[:, : width * 3].reshape(height, width, 3).copy()
+
+
+@dataclass(frozen=True)
+class FrameGeometry:
+    """Where a frame's pixels sit on the full-resolution sensor.
+
+    Frame pixel (col, row) covers sensor pixels starting at
+    ``(origin_x + col * binning, origin_y + row * binning)``.
+    """
+
+    binning: int = 1
+    origin_x: int = 0
+    origin_y: int = 0
+    sensor_width: int | None = None
+    sensor_height: int | None = None
+
+    def sensor_rect(self, shape) -> tuple[int, int, int, int]:
+        height, width = shape[:2]
+        return (
+            self.origin_x,
+            self.origin_y,
+            width * self.binning,
+            height * self.binning,
+        )
+
+
+@dataclass
+class Frame:
+    """One captured image.
+
+    ``data`` is display-ready uint8 pixels unless the frame is raw (a Bayer
+    mosaic, or more than 8 bits per sample). Raw frames are kept as the sensor
+    delivered them and converted only when shown or exported (see
+    ``demosaic.develop``).
+    """
+
+    data: np.ndarray
+    seq: int
+    timestamp: float
+    slot: int
+    owner: "FrameRingBuffer | FramePool | None" = field(default=None, repr=False)
+    geometry: FrameGeometry = FrameGeometry()
+    bayer: str | None = None
+    bit_depth: int = 8
+
+    @property
+    def is_raw(self) -> bool:
+        return self.bayer is not None or self.data.dtype != np.uint8
+
+    def release(self) -> None:
+        if self.owner is not None:
+            self.owner.release(self)
+            self.owner = None
+
+
+class FrameRingBuffer:
+    """Fixed set of preallocated frame slots shared by one producer and readers.
+
+    The producer (an SDK callback or a generator thread) asks for a free slot,
+    fills it in place and commits it. Readers lease the newest committed frame;
+    a leased slot is never overwritten, so the reader can hand the array to the
+    display without copying. Frames overwritten before anyone leased them are
+    counted as skipped; frames that found no free slot are counted as dropped.
+    """
+
+    def __init__(
+        self,
+        slots: int,
+        shape: tuple[int, ...],
+        dtype=np.uint8,
+        geometry: FrameGeometry = FrameGeometry(),
+        bayer: str | None = None,
+        bit_depth: int = 8,
+    ):
+        if slots < 2:
+            raise ValueError("Ring buffer needs at least two slots")
+
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.geometry = geometry
+        self.bayer = bayer
+        self.bit_depth = bit_depth
+        self._slots = [aligned_empty(self.shape, self.dtype) for _ in range(slots)]
+        self._seq = [-1] * slots
+        self._stamp = [0.0] * slots
+        self._leases = [0] * slots
+
+        self._lock = threading.Condition()
+        self._next_seq = 0
+        self._newest: int | None = None
+
+        self.frames_written = 0
+        self.frames_read = 0
+        self.frames_dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @property
+    def frames_skipped(self) -> int:
+        return self.frames_written - self.frames_read
+
+    @property
+    def latest_seq(self) -> int:
+        """Sequence number of the newest committed frame (-1 if none)."""
+        with self._lock:
+            return self._next_seq - 1
+
+    def acquire_write(self) -> tuple[int, np.ndarray] | None:
+        """Return the oldest free slot, or None if every slot is in use."""
+        with self._lock:
+            free = [
+                i
+                for i in range(len(self._slots))
+                if self._leases[i] == 0 and i != self._newest
+            ]
+            if not free:
+                self.frames_dropped += 1
+                return None
+
+            index = min(free, key=lambda i: self._seq[i])
+            self._seq[index] = -1
+            return index, self._slots[index]
+
+    def commit(self, index: int, timestamp: float | None = None) -> int:
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._seq[index] = seq
+            self._stamp[index] = time.perf_counter() if timestamp is None else timestamp
+            self._newest = index
+            self.frames_written += 1
+            self._lock.notify_all()
+            return seq
+
+    def write(self, image: np.ndarray, timestamp: float | None = None) -> int | None:
+        """Copy ``image`` into a free slot and commit it."""
+        acquired = self.acquire_write()
+        if acquired is None:
+            return None
+        index, slot = acquired
+        np.copyto(slot, image, casting="unsafe")
+        return self.commit(index, timestamp)
+
+    def lease_latest(self, after_seq: int = -1) -> Frame | None:
+        """Lease the newest frame if it is newer than ``after_seq``."""
+        with self._lock:
+            index = self._newest
+            if index is None or self._seq[index] <= after_seq:
+                return None
+
+            self._leases[index] += 1
+            self.frames_read += 1
+            return Frame(
+                data=self._slots[index],
+                seq=self._seq[index],
+                timestamp=self._stamp[index],
+                slot=index,
+                owner=self,
+                geometry=self.geometry,
+                bayer=self.bayer,
+                bit_depth=self.bit_depth,
+            )
+
+    def wait_latest(
+        self, after_seq: int = -1, timeout: float | None = None
+    ) -> Frame | None:
+        """Like ``lease_latest``, but waits up to ``timeout`` for a newer frame."""
+        with self._lock:
+            self._lock.wait_for(
+                lambda: self._newest is not None and self._seq[self._newest] > after_seq,
+                timeout,
+            )
+            return self.lease_latest(after_seq)
+
+    def release(self, frame: Frame | None) -> None:
+        if frame is None:
+            return
+        with self._lock:
+            self._leases[frame.slot] = max(0, self._leases[frame.slot] - 1)
+
+
+class FramePool:
+    """Reusable, aligned buffers for single-frame captures.
+
+    ``acquire`` leases a buffer that the driver fills in place; releasing the
+    frame returns the buffer to the pool, so steady-state capture allocates
+    nothing.
+    """
+
+    def __init__(
+        self,
+        shape: tuple[int, ...],
+        dtype=np.uint8,
+        max_buffers: int = CAMERA_FRAME_POOL_SIZE,
+        geometry: FrameGeometry = FrameGeometry(),
+        bayer: str | None = None,
+        bit_depth: int = 8,
+    ):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.geometry = geometry
+        self.bayer = bayer
+        self.bit_depth = bit_depth
+        self.max_buffers = max_buffers
+
+        self._lock = threading.Lock()
+        self._buffers: list[np.ndarray] = []
+        self._free: list[int] = []
+        self._next_seq = 0
+
+    @property
+    def allocated(self) -> int:
+        return len(self._buffers)
+
+    @property
+    def leased(self) -> int:
+        return len(self._buffers) - len(self._free)
+
+    def acquire(self) -> Frame:
+        with self._lock:
+            if self._free:
+                index = self._free.pop()
+            elif len(self._buffers) < self.max_buffers:
+                index = len(self._buffers)
+                self._buffers.append(aligned_empty(self.shape, self.dtype))
+            else:
+                raise RuntimeError(
+                    f"All {self.max_buffers} frame buffers are leased; "
+                    "release frames after use"
+                )
+
+            seq = self._next_seq
+            self._next_seq += 1
+
+        return Frame(
+            data=self._buffers[index],
+            seq=seq,
+            timestamp=time.perf_counter(),
+            slot=index,
+            owner=self,
+            geometry=self.geometry,
+            bayer=self.bayer,
+            bit_depth=self.bit_depth,
+        )
+
+    def release(self, frame: Frame | None) -> None:
+        if frame is None:
+            return
+        with self._lock:
+            if frame.slot not in self._free:
+                self._free.append(frame.slot)
@@ -0,0 +1,28 @@
+import time
+
+from loguru import logger
+
+from config import SLOW_DUMMY_DEVICE_DELAY_SEC
+from .dummy_camera import DummyCamera
+
+
+def enumerate_devices():
+    time.sleep(SLOW_DUMMY_DEVICE_DELAY_SEC)
+    return [("Slow Dummy Camera", {})]
+
+
+class SlowDummyCamera(DummyCamera):
+    """Dummy camera whose enumeration and connect block like a slow USB driver."""
+
+    def __init__(self, delay_s: float = SLOW_DUMMY_DEVICE_DELAY_SEC, **kwargs):
+        super().__init__(**kwargs)
+        self.delay_s = delay_s
+
+    def connect(self) -> None:
+        logger.info(f"Slow dummy camera connecting ({self.delay_s:.1f} s)")
+        time.sleep(self.delay_s)
+        super().connect()
+
+    def disconnect(self) -> None:
+        time.sleep(self.delay_s)
+        super().disconnect()
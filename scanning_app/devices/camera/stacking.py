@@ -0,0 +1,264 @@
+"""Frame stacking: average many short exposures into one low-noise frame.
+
+Frames are summed into a preallocated float32 buffer. With alignment on, each
+frame is first registered against the first one by FFT phase correlation on a
+windowed central crop, then added at its sub-pixel offset with bilinear
+weights; a per-pixel count keeps the mean correct where frames do not overlap.
+"""
+
+import numpy as np
+
+from config import CAMERA_STACK_ALIGN_WINDOW, CAMERA_STACK_TIMEOUT_SEC
+from .frame_buffer import Frame, FrameRingBuffer
+
+# Cross-power spectrum weight, in cycles per pixel
+LOWPASS_SIGMA = 0.1
+# Bilinear weights for 8-bit frames are integers summing to this
+FIXED_POINT_ONE = 256
+
+
+def _luminance_crop(data: np.ndarray, size: int) -> np.ndarray:
+    """Central ``size`` x ``size`` (at most) luminance crop as float32."""
+    height, width = data.shape[:2]
+    h, w = min(size, height), min(size, width)
+    y0, x0 = (height - h) // 2, (width - w) // 2
+    crop = data[y0 : y0 + h, x0 : x0 + w]
+    if crop.ndim == 3:
+        return crop[..., :3].mean(axis=-1, dtype=np.float32)
+    return crop.astype(np.float32)
+
+
+def _peak_offset(values: np.ndarray) -> float:
+    """Sub-sample position of a peak from (left, centre, right) by a parabola."""
+    left, centre, right = values
+    denom = left - 2 * centre + right
+    return 0.0 if denom == 0 else float(0.5 * (left - right) / denom)
+
+
+class PhaseCorrelator:
+    """Estimates the translation of images relative to a fixed reference."""
+
+    def __init__(self, reference: np.ndarray, window: int = CAMERA_STACK_ALIGN_WINDOW):
+        self.window = window
+        crop = _luminance_crop(reference, window)
+        self._taper = np.outer(np.hanning(crop.shape[0]), np.hanning(crop.shape[1]))
+        self._taper = self._taper.astype(np.float32)
+        self._reference = np.conj(np.fft.rfft2(self._prepare(crop)))
+
+        # Whitening flattens the spectrum, so noise-only high frequencies would
+        # swamp the peak; roll them off instead.
+        fy = np.fft.fftfreq(crop.shape[0])[:, None]
+        fx = np.fft.rfftfreq(crop.shape[1])[None, :]
+        self._lowpass = np.exp(-(fx**2 + fy**2) / (2 * LOWPASS_SIGMA**2))
+
+    def _prepare(self, crop: np.ndarray) -> np.ndarray:
+        return (crop - crop.mean()) * self._taper
+
+    def shift(self, image: np.ndarray) -> tuple[float, float]:
+        """``(dy, dx)`` such that ``image[y + dy, x + dx]`` matches the reference."""
+        spectrum = np.fft.rfft2(self._prepare(_luminance_crop(image, self.window)))
+        cross = spectrum * self._reference
+        cross *= self._lowpass / (np.abs(cross) + 1e-9)
+        surface = np.fft.irfft2(cross, s=self._taper.shape)
+
+        rows, cols = surface.shape
+        py, px = np.unravel_index(int(np.argmax(surface)), surface.shape)
+        dy = py + _peak_offset(surface[[(py - 1) % rows, py, (py + 1) % rows], px])
+        dx = px + _peak_offset(surface[py, [(px - 1) % cols, px, (px + 1) % cols]])
+
+        # Wrap to the signed range.
+        if dy > rows / 2:
+            dy -= rows
+        if dx > cols / 2:
+            dx -= cols
+        return float(dy), float(dx)
+
+
+class FrameStacker:
+    """Running float32 sum of same-shaped frames.
+
+    ``add`` costs one pass over the frame without alignment. With ``align``,
+    shifts are estimated on a small crop and applied with bilinear weights;
+    8-bit frames are interpolated in 8.8 fixed point, which is markedly faster
+    than float. ``integer_shifts`` rounds shifts to whole pixels, and
+    ``shift_step=2`` keeps Bayer mosaics in phase.
+    """
+
+    def __init__(
+        self,
+        shape: tuple[int, ...],
+        dtype=np.uint8,
+        align: bool = False,
+        integer_shifts: bool = False,
+        shift_step: int = 1,
+    ):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.align = align
+        self.integer_shifts = integer_shifts or shift_step > 1
+        self.shift_step = shift_step
+
+        self._sum = np.zeros(self.shape, dtype=np.float32)
+        self._count = None
+        self._unit = 1
+        self._correlator: PhaseCorrelator | None = None
+        if align:
+            self._count = np.zeros(self.shape[:2], dtype=np.float32)
+        if align and not self.integer_shifts:
+            # uint8 x 8-bit weights fits uint16 exactly.
+            fixed = self.dtype == np.uint8
+            self._unit = FIXED_POINT_ONE if fixed else 1
+            work = np.uint16 if fixed else np.float32
+            self._acc = np.empty(self.shape, dtype=work)
+            self._term = np.empty(self.shape, dtype=work)
+
+        self.frames = 0
+        self.shifts: list[tuple[float, float]] = []
+
+    def add(self, data: np.ndarray) -> tuple[float, float]:
+        """Accumulate ``data``; returns the shift applied to it."""
+        if data.shape != self.shape:
+            raise ValueError(f"Frame shape {data.shape} does not match {self.shape}")
+
+        self.frames += 1
+        if not self.align:
+            np.add(self._sum, data, out=self._sum, casting="unsafe")
+            return (0.0, 0.0)
+
+        if self._correlator is None:
+            self._correlator = PhaseCorrelator(data)
+            shift = (0.0, 0.0)
+        else:
+            shift = self._correlator.shift(data)
+            if self.integer_shifts:
+                step = self.shift_step
+                shift = tuple(float(round(v / step) * step) for v in shift)
+
+        self.shifts.append(shift)
+        self._add_shifted(data, *shift)
+        return shift
+
+    def _weights(self, fy: float, fx: float) -> list[tuple[int, int, object]]:
+        """Bilinear taps ``(row offset, col offset, weight)`` in work units."""
+        taps = [
+            (oy, ox, wy * wx)
+            for oy, wy in ((0, 1.0 - fy), (1, fy))
+            for ox, wx in ((0, 1.0 - fx), (1, fx))
+        ]
+        if self._unit == 1:
+            return [(oy, ox, np.float32(w)) for oy, ox, w in taps if w > 1e-3]
+
+        weights = [round(w * self._unit) for _, _, w in taps]
+        # Make the rounded weights sum to exactly one.
+        largest = max(range(len(taps)), key=weights.__getitem__)
+        weights[largest] += self._unit - sum(weights)
+        return [
+            (oy, ox, np.uint16(w))
+            for (oy, ox, _), w in zip(taps, weights)
+            if w
+        ]
+
+    def _add_shifted(self, data: np.ndarray, dy: float, dx: float) -> None:
+        # out[y, x] += data[y + dy, x + dx], bilinear in the fractional part.
+        height, width = self.shape[:2]
+        iy, ix = int(np.floor(dy)), int(np.floor(dx))
+        taps = self._weights(dy - iy, dx - ix)
+
+        # Output rows/cols whose every source sample lies inside the frame.
+        reach_y = max(oy for oy, _, _ in taps)
+        reach_x = max(ox for _, ox, _ in taps)
+        y0, y1 = max(0, -iy), min(height, height - iy - reach_y)
+        x0, x1 = max(0, -ix), min(width, width - ix - reach_x)
+        if y1 <= y0 or x1 <= x0:
+            return
+
+        def source(oy, ox):
+            return data[y0 + iy + oy : y1 + iy + oy, x0 + ix + ox : x1 + ix + ox]
+
+        out = self._sum[y0:y1, x0:x1]
+        count = self._count[y0:y1, x0:x1]
+        if len(taps) == 1:
+            np.add(out, source(*taps[0][:2]), out=out, casting="unsafe")
+            count += 1
+            return
+
+        acc = self._acc[y0:y1, x0:x1]
+        term = self._term[y0:y1, x0:x1]
+        (oy, ox, weight), *rest = taps
+        np.multiply(source(oy, ox), weight, out=acc, casting="unsafe")
+        for oy, ox, weight in rest:
+            np.multiply(source(oy, ox), weight, out=term, casting="unsafe")
+            np.add(acc, term, out=acc)
+        np.add(out, acc, out=out, casting="unsafe")
+        # Fixed-point sums carry the weight scale; the count does too.
+        count += self._unit
+
+    def sum(self) -> np.ndarray:
+        """The running sum (a view); aligned sums are weighted by ``count``."""
+        return self._sum
+
+    def mean(self) -> np.ndarray:
+        """Float32 mean of the frames added so far (a new array)."""
+        if self._count is None:
+            return self._sum / max(1, self.frames)
+
+        count = np.maximum(self._count, 1)
+        if self._sum.ndim == 3:
+            count = count[..., None]
+        return self._sum / count
+
+    def to_frame(self, template: Frame) -> Frame:
+        """The mean as a frame in ``template``'s dtype, geometry and format."""
+        dtype = template.data.dtype
+        info = np.iinfo(dtype) if np.issubdtype(dtype, np.integer) else None
+        mean = self.mean()
+        if info is not None:
+            np.rint(mean, out=mean)
+            np.clip(mean, info.min, info.max, out=mean)
+
+        return Frame(
+            data=mean.astype(dtype),
+            seq=template.seq,
+            timestamp=template.timestamp,
+            slot=0,
+            geometry=template.geometry,
+            bayer=template.bayer,
+            bit_depth=template.bit_depth,
+        )
+
+
+def stack_stream(
+    stream: FrameRingBuffer,
+    count: int,
+    align: bool = False,
+    timeout_s: float = CAMERA_STACK_TIMEOUT_SEC,
+) -> Frame:
+    """Stack the next ``count`` frames committed to ``stream``.
+
+    Frames are taken as they arrive and released straight after being added;
+    if stacking falls behind the sensor, intermediate frames are skipped.
+    """
+    stacker: FrameStacker | None = None
+    template: Frame | None = None
+    seq = -1
+
+    while stacker is None or stacker.frames < count:
+        frame = stream.wait_latest(seq, timeout_s)
+        if frame is None:
+            raise TimeoutError(f"No camera frame within {timeout_s:.1f} s while stacking")
+
+        try:
+            seq = frame.seq
+            if stacker is None:
+                stacker = FrameStacker(
+                    frame.data.shape,
+                    frame.data.dtype,
+                    align=align,
+                    shift_step=2 if frame.bayer else 1,
+                )
+            stacker.add(frame.data)
+            template = frame
+        finally:
+            frame.release()
+
+    return stacker.to_frame(template)
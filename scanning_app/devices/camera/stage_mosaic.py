@@ -0,0 +1,463 @@
+"""Stage-tiled camera mosaics stored as a multi-resolution tile pyramid.
+
+Frames captured at different stage positions are pasted into level 0 of a
+``TilePyramid`` at their place in view coordinates (full-resolution sensor
+pixels of a frame taken at the stage origin). Each coarser level halves the
+resolution; a level's tiles are rebuilt from their four children whenever a
+paste touches them, so any zoom level can be drawn from a handful of tiles.
+
+Tiles are RGBA: alpha marks which pixels have been imaged. Only the most
+recently used tiles stay in memory; the rest are spilled to a temporary
+directory and read back on demand, so memory stays bounded for gigapixel
+mosaics.
+"""
+
+import math
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from loguru import logger
+
+from config import (
+    CAMERA_PIXEL_SIZE_UM,
+    MOSAIC_TILE_CACHE_MB,
+    MOSAIC_TILE_SIZE,
+)
+from .demosaic import develop
+from .frame_buffer import Frame, FrameGeometry
+
+# (level, tile column, tile row)
+TileKey = tuple[int, int, int]
+
+
+class TilePyramid:
+    """Mosaic image split into square RGBA tiles at power-of-two levels.
+
+    ``pixel_size`` is the size of a level-0 pixel in view units (the binning
+    of the frames pasted into it); ``sensor_height`` is the camera's
+    full-resolution sensor height, which anchors view to stage coordinates.
+    Public methods are thread-safe, so one thread can paste while the GUI
+    draws.
+    """
+
+    def __init__(
+        self,
+        tile_size: int = MOSAIC_TILE_SIZE,
+        pixel_size: int = 1,
+        sensor_height: int | None = None,
+        cache_bytes: int = MOSAIC_TILE_CACHE_MB * 2**20,
+    ):
+        if tile_size < 2 or tile_size & (tile_size - 1):
+            raise ValueError("Tile size must be a power of two")
+
+        self.tile_size = tile_size
+        self.pixel_size = max(1, int(pixel_size))
+        self.sensor_height = sensor_height
+        self.max_cached = max(16, cache_bytes // (tile_size * tile_size * 4))
+
+        self._lock = threading.RLock()
+        self._cache: OrderedDict[TileKey, np.ndarray] = OrderedDict()
+        self._keys: set[TileKey] = set()
+        self._spilled: set[TileKey] = set()
+        self._versions: dict[TileKey, int] = {}
+        self._spill_dir: Path | None = None
+        # Level-0 pixel bounds (x0, y0, x1, y1), end exclusive
+        self._bounds: tuple[int, int, int, int] | None = None
+        self._top = 0
+
+        self.tiles_spilled = 0
+        self.tiles_loaded = 0
+
+    # -- geometry ------------------------------------------------------------
+
+    @property
+    def top_level(self) -> int:
+        """Coarsest level; at most 2 x 2 of its tiles cover the mosaic."""
+        return self._top
+
+    def tile_span(self, level: int) -> float:
+        """Side of a tile at ``level`` in view units."""
+        return self.tile_size * (1 << level) * self.pixel_size
+
+    def bounds(self) -> tuple[float, float, float, float] | None:
+        """Imaged area as ``(x, y, width, height)`` in view units."""
+        with self._lock:
+            if self._bounds is None:
+                return None
+            x0, y0, x1, y1 = self._bounds
+            s = self.pixel_size
+            return (x0 * s, y0 * s, (x1 - x0) * s, (y1 - y0) * s)
+
+    def level_for(self, view_units_per_screen_pixel: float) -> int:
+        """Finest level that still has at most one pixel per screen pixel."""
+        ratio = view_units_per_screen_pixel / self.pixel_size
+        level = int(math.floor(math.log2(ratio))) if ratio > 1 else 0
+        return min(max(level, 0), self._top)
+
+    def visible_tiles(
+        self, level: int, x0: float, y0: float, x1: float, y1: float
+    ) -> list[tuple[TileKey, tuple[float, float, float, float]]]:
+        """Existing tiles at ``level`` that intersect a view rectangle.
+
+        Returns ``(key, (x, y, width, height))`` pairs in view units.
+        """
+        span = self.tile_span(level)
+        cols = range(math.floor(x0 / span), math.floor(x1 / span) + 1)
+        rows = range(math.floor(y0 / span), math.floor(y1 / span) + 1)
+        with self._lock:
+            return [
+                ((level, tx, ty), (tx * span, ty * span, span, span))
+                for ty in rows
+                for tx in cols
+                if (level, tx, ty) in self._keys
+            ]
+
+    def version(self, key: TileKey) -> int:
+        """Counter bumped each time the tile changes."""
+        return self._versions.get(key, 0)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    # -- tiles ---------------------------------------------------------------
+
+    def tile(self, key: TileKey) -> np.ndarray | None:
+        """The (T, T, 4) tile, or None if nothing was imaged there."""
+        with self._lock:
+            if key not in self._keys:
+                return None
+            return self._load(key)
+
+    def _load(self, key: TileKey) -> np.ndarray:
+        tile = self._cache.get(key)
+        if tile is not None:
+            self._cache.move_to_end(key)
+            return tile
+
+        if key in self._spilled:
+            size = self.tile_size
+            tile = np.fromfile(self._spill_path(key), dtype=np.uint8)
+            tile = tile.reshape(size, size, 4)
+            self.tiles_loaded += 1
+        else:
+            tile = np.zeros((self.tile_size, self.tile_size, 4), dtype=np.uint8)
+            self._keys.add(key)
+
+        self._cache[key] = tile
+        self._evict()
+        return tile
+
+    def _evict(self) -> None:
+        while len(self._cache) > self.max_cached:
+            key, tile = self._cache.popitem(last=False)
+            tile.tofile(self._spill_path(key))
+            self._spilled.add(key)
+            self.tiles_spilled += 1
+
+    def _spill_path(self, key: TileKey) -> Path:
+        if self._spill_dir is None:
+            self._spill_dir = Path(tempfile.mkdtemp(prefix="mosaic-tiles-"))
+            logger.debug(f"Mosaic tiles spill to {self._spill_dir}")
+        level, tx, ty = key
+        return self._spill_dir / f"{level}_{tx}_{ty}.rgba"
+
+    def _touch(self, key: TileKey) -> None:
+        self._versions[key] = self._versions.get(key, 0) + 1
+
+    def close(self) -> None:
+        """Drop all tiles and delete spilled ones from disk."""
+        with self._lock:
+            self._cache.clear()
+            self._keys.clear()
+            self._spilled.clear()
+            if self._spill_dir is not None:
+                shutil.rmtree(self._spill_dir, ignore_errors=True)
+                self._spill_dir = None
+
+    # -- writing -------------------------------------------------------------
+
+    def paste(self, pixels: np.ndarray, x: float, y: float, feather: int = 0) -> None:
+        """Paste a uint8 mono/RGB/RGBX image with its top-left at view (x, y).
+
+        With ``feather`` > 0, pixels already imaged are cross-faded into the
+        new image over that many pixels from its edges instead of being
+        overwritten, which hides seams in overlapping tiles.
+        """
+        size = self.tile_size
+        s = self.pixel_size
+        height, width = pixels.shape[:2]
+        px, py = int(round(x / s)), int(round(y / s))
+
+        rgb = pixels[..., :3] if pixels.ndim == 3 else pixels[..., None]
+        weights = _feather_weights(height, width, feather) if feather > 0 else None
+
+        with self._lock:
+            touched = set()
+            for ty in range(py // size, (py + height - 1) // size + 1):
+                for tx in range(px // size, (px + width - 1) // size + 1):
+                    key = (0, tx, ty)
+                    tile = self._load(key)
+                    # Overlap in level-0 pixels, then in tile and image coordinates
+                    ox0, oy0 = max(px, tx * size), max(py, ty * size)
+                    ox1 = min(px + width, (tx + 1) * size)
+                    oy1 = min(py + height, (ty + 1) * size)
+                    dst = tile[oy0 - ty * size : oy1 - ty * size, ox0 - tx * size : ox1 - tx * size]
+                    src = rgb[oy0 - py : oy1 - py, ox0 - px : ox1 - px]
+                    if weights is None:
+                        dst[..., :3] = src
+                    else:
+                        w = weights[oy0 - py : oy1 - py, ox0 - px : ox1 - px]
+                        _blend(dst, src, w)
+                    dst[..., 3] = 255
+                    self._touch(key)
+                    touched.add((tx, ty))
+
+            bounds = (px, py, px + width, py + height)
+            if self._bounds is not None:
+                b = self._bounds
+                bounds = (
+                    min(b[0], bounds[0]),
+                    min(b[1], bounds[1]),
+                    max(b[2], bounds[2]),
+                    max(b[3], bounds[3]),
+                )
+            self._bounds = bounds
+            self._rebuild_levels(touched)
+
+    def _rebuild_levels(self, touched: set[tuple[int, int]]) -> None:
+        # The first level whose tiles are as large as the mosaic: at most
+        # 2 x 2 of them cover it, wherever it lies.
+        x0, y0, x1, y1 = self._bounds
+        extent = max(x1 - x0, y1 - y0)
+        top = max(0, math.ceil(math.log2(max(extent, 1) / self.tile_size)))
+
+        previous_top, self._top = self._top, top
+        for level in range(1, top + 1):
+            touched = {(tx >> 1, ty >> 1) for tx, ty in touched}
+            if level > previous_top:
+                # Newly added levels start from every tile of the one below.
+                touched |= {
+                    (tx >> 1, ty >> 1)
+                    for (lv, tx, ty) in self._keys
+                    if lv == level - 1
+                }
+            for tx, ty in touched:
+                self._rebuild_tile((level, tx, ty))
+
+    def _rebuild_tile(self, key: TileKey) -> None:
+        level, tx, ty = key
+        half = self.tile_size // 2
+        tile = self._load(key)
+        for dy in (0, 1):
+            for dx in (0, 1):
+                child_key = (level - 1, 2 * tx + dx, 2 * ty + dy)
+                quadrant = tile[dy * half : (dy + 1) * half, dx * half : (dx + 1) * half]
+                if child_key in self._keys:
+                    _downsample_into(quadrant, self._load(child_key))
+                else:
+                    quadrant[...] = 0
+        self._touch(key)
+
+    # -- reading -------------------------------------------------------------
+
+    def render(self, max_size: int) -> tuple[np.ndarray, FrameGeometry] | None:
+        """The whole mosaic at the finest level whose longer side fits
+        ``max_size``, as an RGBA array and the geometry placing it in view
+        coordinates."""
+        with self._lock:
+            if self._bounds is None:
+                return None
+
+            x0, y0, x1, y1 = self._bounds
+            level = 0
+            while level < self._top and max(x1 - x0, y1 - y0) >> level > max_size:
+                level += 1
+
+            lx0, ly0 = x0 >> level, y0 >> level
+            lx1, ly1 = -((-x1) >> level), -((-y1) >> level)
+            out = np.zeros((ly1 - ly0, lx1 - lx0, 4), dtype=np.uint8)
+
+            size = self.tile_size
+            for ty in range(ly0 // size, (ly1 - 1) // size + 1):
+                for tx in range(lx0 // size, (lx1 - 1) // size + 1):
+                    if (level, tx, ty) not in self._keys:
+                        continue
+                    tile = self._load((level, tx, ty))
+                    ox0, oy0 = max(lx0, tx * size), max(ly0, ty * size)
+                    ox1 = min(lx1, (tx + 1) * size)
+                    oy1 = min(ly1, (ty + 1) * size)
+                    out[oy0 - ly0 : oy1 - ly0, ox0 - lx0 : ox1 - lx0] = tile[
+                        oy0 - ty * size : oy1 - ty * size, ox0 - tx * size : ox1 - tx * size
+                    ]
+
+            scale = self.pixel_size << level
+            geometry = FrameGeometry(
+                binning=scale,
+                origin_x=lx0 * scale,
+                origin_y=ly0 * scale,
+                sensor_height=self.sensor_height,
+            )
+            return out, geometry
+
+
+def _feather_weights(height: int, width: int, feather: int) -> np.ndarray:
+    """Weight of a new image: 0 at its edges, rising to 1 ``feather`` px in."""
+    ramp_y = np.minimum(np.arange(height), np.arange(height)[::-1]) + 1
+    ramp_x = np.minimum(np.arange(width), np.arange(width)[::-1]) + 1
+    ramp_y = np.minimum(ramp_y / feather, 1).astype(np.float32)
+    ramp_x = np.minimum(ramp_x / feather, 1).astype(np.float32)
+    return np.minimum.outer(ramp_y, ramp_x)
+
+
+def _blend(dst: np.ndarray, src: np.ndarray, weights: np.ndarray) -> None:
+    # Unimaged pixels take the new image as is; imaged ones are cross-faded.
+    imaged = dst[..., 3:4] == 255
+    w = np.where(imaged, weights[..., None], np.float32(1))
+    old = dst[..., :3].astype(np.float32)
+    dst[..., :3] = old + (src - old) * w + 0.5
+
+
+def _downsample_into(dst: np.ndarray, child: np.ndarray) -> None:
+    """2x2 alpha-weighted mean of ``child`` into ``dst`` (half its size)."""
+    quads = (child[0::2, 0::2], child[1::2, 0::2], child[0::2, 1::2], child[1::2, 1::2])
+    if child[..., 3].min() == 255:
+        # Fully imaged: a plain mean, which fits uint16.
+        acc = quads[0].astype(np.uint16)
+        for quad in quads[1:]:
+            acc += quad
+        np.right_shift(acc, 2, out=acc)
+        dst[...] = acc
+        return
+
+    alpha = np.zeros(dst.shape[:2], dtype=np.uint32)
+    rgb = np.zeros(dst.shape[:2] + (3,), dtype=np.uint32)
+    for quad in quads:
+        a = quad[..., 3].astype(np.uint32)
+        alpha += a
+        rgb += quad[..., :3] * a[..., None]
+    np.floor_divide(rgb, np.maximum(alpha, 1)[..., None], out=rgb)
+    dst[..., :3] = rgb
+    dst[..., 3] = alpha // 4
+
+
+@dataclass
+class MosaicRequest:
+    """A mosaic acquisition: either ``columns`` x ``rows`` fields starting
+    at the stage origin, or enough fields to cover ``area`` (view units)."""
+
+    columns: int = 1
+    rows: int = 1
+    overlap: float = 0.0
+    blend: bool = False
+    area: tuple[float, float, float, float] | None = None
+
+
+def plan_fields(
+    request: MosaicRequest,
+    field: tuple[float, float, float, float],
+) -> list[tuple[float, float]]:
+    """Top-left view positions of each field, in serpentine order.
+
+    ``field`` is the view rectangle of a frame taken at the stage origin.
+    """
+    fx, fy, fw, fh = field
+    step_x = max(1.0, fw * (1 - request.overlap))
+    step_y = max(1.0, fh * (1 - request.overlap))
+
+    if request.area is None:
+        x0, y0 = fx, fy
+        columns, rows = max(1, request.columns), max(1, request.rows)
+    else:
+        x0, y0, w, h = request.area
+        columns = max(1, math.ceil(max(0.0, w - fw) / step_x) + 1)
+        rows = max(1, math.ceil(max(0.0, h - fh) / step_y) + 1)
+
+    fields = []
+    for row in range(rows):
+        cols = range(columns) if row % 2 == 0 else reversed(range(columns))
+        fields.extend((x0 + col * step_x, y0 + row * step_y) for col in cols)
+    return fields
+
+
+def stage_position(
+    view_offset: tuple[float, float], pixel_size_um: float = CAMERA_PIXEL_SIZE_UM
+) -> tuple[float, float]:
+    """Stage position that shifts the field by ``view_offset`` view units.
+
+    View y grows downwards while stage y grows upwards.
+    """
+    dx, dy = view_offset
+    return dx * pixel_size_um, -dy * pixel_size_um
+
+
+def acquire_mosaic(
+    request: MosaicRequest,
+    capture: Callable[[], Frame],
+    motors,
+    raw_display: str,
+    on_started: Callable[[TilePyramid], None],
+    on_progress: Callable[[int, int], None],
+    cancelled: Callable[[], bool],
+) -> TilePyramid:
+    """Move the stage over the planned fields and paste a frame at each.
+
+    The first frame is taken at the stage origin, where single frames are
+    placed, to measure the field; it is used as a tile when the plan starts
+    there. The stage returns to where it was afterwards, if the controller
+    reports its position.
+    """
+    start = motors.get_position()
+    frame = None
+    done = 0
+    fields = []
+    try:
+        motors.move_to(*stage_position((0.0, 0.0)))
+        frame = capture()
+        pixels, geometry = develop(frame, raw_display)
+        field = geometry.sensor_rect(pixels.shape)
+        fields = plan_fields(request, field)
+        feather = 0
+        if request.blend and request.overlap > 0:
+            feather = max(
+                1, int(min(field[2], field[3]) * request.overlap / geometry.binning)
+            )
+
+        pyramid = TilePyramid(
+            pixel_size=geometry.binning, sensor_height=geometry.sensor_height
+        )
+        on_started(pyramid)
+
+        for x, y in fields:
+            if cancelled():
+                break
+
+            offset = (x - field[0], y - field[1])
+            if frame is None or offset != (0.0, 0.0):
+                if frame is not None:
+                    frame.release()
+                motors.move_to(*stage_position(offset))
+                frame = capture()
+                pixels, _ = develop(frame, raw_display)
+
+            pyramid.paste(pixels, x, y, feather)
+            frame.release()
+            frame = None
+            done += 1
+            on_progress(done, len(fields))
+    finally:
+        if frame is not None:
+            frame.release()
+        if start is not None:
+            motors.move_to(*start)
+
+    logger.info(
+        f"Mosaic of {done}/{len(fields)} fields: {len(pyramid)} tiles, "
+        f"{pyramid.top_level + 1} levels"
+    )
+    return pyramid
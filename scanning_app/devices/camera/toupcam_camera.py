@@ -1,16 +1,55 @@
-import ctypes
+import threading
+
 import numpy as np
 from PyQt6.QtGui import QImage
 from loguru import logger
 
 import devices.camera.toupcam as toupcam
-from .base_camera import BaseCamera
-
-def _dummy_event_cb(n_event, ctx):
-    pass
+from config import (
+    CAMERA_STREAM_BUFFER_SLOTS,
+    TOUPCAM_PIXEL_FORMAT_BITS,
+    TOUPCAM_RAW_BITS,
+    TOUPCAM_STILL_TIMEOUT_SEC,
+)
+from .base_camera import BaseCamera, SensorRoi
+from .demosaic import BILINEAR, develop, pattern_from_fourcc
+from .frame_buffer import (
+    Frame,
+    FrameGeometry,
+    FramePool,
+    FrameRingBuffer,
+    buffer_pointer,
+)
+
+# Frames are pulled as 32-bit R,G,B,X so rows are naturally 4-byte aligned and
+# the buffer can be shown as-is (QImage RGBX8888 / NumPy view of RGB).
+BYTES_PER_PIXEL = TOUPCAM_PIXEL_FORMAT_BITS // 8
+BYTEORDER_RGB = 0
+# TOUPCAM_OPTION_BINNING flag for n*n averaging (bit depth unchanged)
+BINNING_AVERAGE = 0x80
+# Snap resolution index meaning "the current preview resolution"
+SNAP_PREVIEW_RESOLUTION = 0xFFFFFFFF
+
+
+def _even(value: int) -> int:
+    return int(value) // 2 * 2
+
+
+def _event_cb(n_event, ctx):
+    # Runs on the SDK's own thread.
+    ctx._on_event(n_event)
+
+
+def enumerate_devices():
+    return [
+        (f"Toupcam: {cam.displayname}", {"model": cam})
+        for cam in toupcam.Toupcam.EnumV2()
+    ]
 
 class ToupcamCamera(BaseCamera):
-    def __init__(self, model):
+    def __init__(self, model, sdk=toupcam):
+        # ``sdk`` is the toupcam module; tests pass ``fake_toupcam`` instead.
+        self._sdk = sdk
         self._model = model
         self._hcam = None
         self._connected = False
@@ -19,6 +58,22 @@ class ToupcamCamera(BaseCamera):
         self._height = 0
 
         self._last_frame: QImage | None = None
+        self._stream: FrameRingBuffer | None = None
+        self._pool: FramePool | None = None
+        # Set by the SDK thread on TOUPCAM_EVENT_STILLIMAGE
+        self._still_ready = threading.Event()
+        self._still_lock = threading.Lock()
+
+        self._binning = 1
+        self._sensor_roi: SensorRoi | None = None
+        self._sensor_size = (0, 0)
+        self._resolution_scale = 1
+
+        # Raw mode: 2-D sensor data (Bayer mosaic or mono) instead of RGB
+        self._raw = False
+        self._bayer: str | None = None
+        self._raw_dtype = np.uint8
+        self._raw_bit_depth = 8
 
         self._exposure_us = 10_000
         self._gain = 100
@@ -26,11 +81,13 @@ class ToupcamCamera(BaseCamera):
     def connect(self) -> None:
         logger.info(f"Opening Toupcam: {self._model.displayname}")
 
-        self._hcam = toupcam.Toupcam.Open(self._model.id)
+        self._hcam = self._sdk.Toupcam.Open(self._model.id)
         if not self._hcam:
             raise RuntimeError("Failed to open Toupcam")
 
         self._width, self._height = self._hcam.get_Size()
+        self._sensor_size = self._hcam.get_Resolution(0)
+        self._hcam.put_Option(self._sdk.TOUPCAM_OPTION_BYTEORDER, BYTEORDER_RGB)
 
         # ✅ Enable auto exposure like ToupView
         self._hcam.put_AutoExpoEnable(1)
@@ -42,7 +99,9 @@ class ToupcamCamera(BaseCamera):
         self._hcam.put_ExpoTime(self._exposure_us)
         self._hcam.put_ExpoAGain(self._gain)
 
-        self._hcam.StartPullModeWithCallback(_dummy_event_cb, None)
+        self._hcam.StartPullModeWithCallback(_event_cb, self)
+        if self._binning != 1 or self._sensor_roi is not None or self._raw:
+            self._reconfigure()
 
         self._connected = True
         logger.info(
@@ -53,41 +112,289 @@ class ToupcamCamera(BaseCamera):
 
 
     def disconnect(self) -> None:
+        self.stop_stream()
         if self._hcam:
             self._hcam.Close()
 
         self._hcam = None
         self._connected = False
         self._last_frame = None
+        self._pool = None
 
         logger.info("Toupcam disconnected")
 
     def is_connected(self) -> bool:
         return self._connected
 
-    def capture(self) -> QImage:
+    def _on_event(self, n_event: int) -> None:
+        sdk = self._sdk
+        if n_event == sdk.TOUPCAM_EVENT_IMAGE:
+            if self._stream is not None:
+                self._pull_stream_frame(self._stream)
+        elif n_event == sdk.TOUPCAM_EVENT_STILLIMAGE:
+            self._still_ready.set()
+        elif n_event == sdk.TOUPCAM_EVENT_DISCONNECTED:
+            logger.warning("Toupcam reported disconnect")
+        elif n_event == sdk.TOUPCAM_EVENT_ERROR:
+            logger.warning("Toupcam reported a generic error")
+
+    def _pull_stream_frame(self, stream: FrameRingBuffer) -> None:
+        acquired = stream.acquire_write()
+        if acquired is None:
+            # Every slot is leased; the SDK keeps only the newest frame anyway.
+            return
+
+        index, slot = acquired
+        hcam = self._hcam
+        if hcam is None:
+            return
+        try:
+            # The bits argument is ignored in raw mode.
+            hcam.PullImageV2(buffer_pointer(slot), TOUPCAM_PIXEL_FORMAT_BITS, None)
+        except self._sdk.HRESULTException as exc:
+            logger.warning(f"Toupcam live frame pull failed: {exc}")
+            return
+
+        stream.commit(index)
+
+    def start_stream(self) -> FrameRingBuffer:
         if not self._connected or not self._hcam:
             raise RuntimeError("Camera not connected")
 
-        buf = ctypes.create_string_buffer(
-            self._width * self._height * 3
+        self._width, self._height = self._hcam.get_FinalSize()
+        self._stream = FrameRingBuffer(
+            CAMERA_STREAM_BUFFER_SLOTS,
+            self._frame_shape(),
+            self._frame_dtype(),
+            geometry=self.frame_geometry(),
+            bayer=self._frame_bayer(),
+            bit_depth=self._frame_bit_depth(),
         )
+        return self._stream
+
+    def stop_stream(self) -> None:
+        self._stream = None
+
+    def is_streaming(self) -> bool:
+        return self._stream is not None
+
+    def _frame_shape(self) -> tuple[int, ...]:
+        if self._raw:
+            return (self._height, self._width)
+        return (self._height, self._width, BYTES_PER_PIXEL)
+
+    def _frame_dtype(self):
+        return self._raw_dtype if self._raw else np.uint8
+
+    def _frame_bayer(self) -> str | None:
+        return self._bayer if self._raw else None
+
+    def _frame_bit_depth(self) -> int:
+        return self._raw_bit_depth if self._raw else 8
+
+    def _frame_pool(self) -> FramePool:
+        shape = self._frame_shape()
+        dtype = np.dtype(self._frame_dtype())
+        geometry = self.frame_geometry()
+        bayer = self._frame_bayer()
+        if (
+            self._pool is None
+            or self._pool.shape != shape
+            or self._pool.dtype != dtype
+            or self._pool.geometry != geometry
+            or self._pool.bayer != bayer
+        ):
+            self._pool = FramePool(
+                shape,
+                dtype,
+                geometry=geometry,
+                bayer=bayer,
+                bit_depth=self._frame_bit_depth(),
+            )
+        return self._pool
 
-        self._hcam.PullImageV2(buf, 24, None)
+    # Each of these restarts the camera, so unchanged values are skipped.
 
-        arr = np.frombuffer(buf, dtype=np.uint8).reshape(
-            (self._height, self._width, 3)
+    def set_binning(self, value: int) -> None:
+        value = max(1, int(value))
+        if value == self._binning:
+            return
+        self._binning = value
+        if self._hcam:
+            self._reconfigure()
+
+    def set_sensor_roi(self, roi: SensorRoi | None) -> None:
+        roi = None if roi is None else tuple(int(v) for v in roi)
+        if roi == self._sensor_roi:
+            return
+        self._sensor_roi = roi
+        if self._hcam:
+            self._reconfigure()
+
+    def set_raw_mode(self, enabled: bool) -> None:
+        if bool(enabled) == self._raw:
+            return
+        self._raw = bool(enabled)
+        if self._hcam:
+            self._reconfigure()
+
+    def frame_geometry(self) -> FrameGeometry:
+        sensor_w, sensor_h = self._sensor_size
+        x = y = 0
+        if self._sensor_roi is not None and self._hcam:
+            x, y, _, _ = self._hcam.get_Roi()
+            x, y = x * self._resolution_scale, y * self._resolution_scale
+        return FrameGeometry(self._binning, x, y, sensor_w, sensor_h)
+
+    def _resolution_for_binning(self, binning: int) -> tuple[int, int]:
+        """Pick the preview resolution that bins on the sensor.
+
+        Returns ``(eSize index, scale)`` for the largest scale that divides
+        ``binning``; whatever is left is done with TOUPCAM_OPTION_BINNING.
+        """
+        sensor_w = self._sensor_size[0]
+        best = (0, 1)
+        for index in range(self._hcam.ResolutionNumber()):
+            width, _ = self._hcam.get_Resolution(index)
+            scale = sensor_w // width if width else 0
+            if scale and scale * width == sensor_w and binning % scale == 0:
+                best = max(best, (index, scale), key=lambda item: item[1])
+        return best
+
+    def _reconfigure(self) -> None:
+        # Frame size and format change, so the camera is stopped while
+        # reconfiguring: no callback may pull into a buffer sized for the old
+        # settings. TOUPCAM_OPTION_RAW can only change while stopped anyway.
+        self.stop_stream()
+        hcam = self._hcam
+        hcam.Stop()
+
+        index, scale = self._resolution_for_binning(self._binning)
+        hcam.put_eSize(index)
+
+        option = self._binning // scale
+        hcam.put_Option(
+            self._sdk.TOUPCAM_OPTION_BINNING,
+            1 if option == 1 else BINNING_AVERAGE | option,
         )
 
-        qimg = QImage(
-            arr.data,
-            self._width,
-            self._height,
-            self._width * 3,
-            QImage.Format.Format_RGB888,
-        ).convertToFormat(QImage.Format.Format_RGB32)
+        if self._sensor_roi is None:
+            hcam.put_Roi(0, 0, 0, 0)
+        else:
+            x, y, w, h = (_even(v / scale) for v in self._sensor_roi)
+            hcam.put_Roi(x, y, max(2, w), max(2, h))
+
+        self._resolution_scale = scale
+        self._apply_raw_option(hcam)
+        hcam.StartPullModeWithCallback(_event_cb, self)
+        self._width, self._height = hcam.get_FinalSize()
+
+        pixel_format = (
+            f"raw {self._bayer or 'mono'} {self._raw_bit_depth}-bit"
+            if self._raw
+            else "RGBX"
+        )
+        logger.info(
+            f"Toupcam geometry: binning {self._binning}x "
+            f"(eSize {index}, option {option}), ROI {self._sensor_roi}, "
+            f"frame {self._width}x{self._height} {pixel_format}"
+        )
+
+    def _apply_raw_option(self, hcam) -> None:
+        hcam.put_Option(self._sdk.TOUPCAM_OPTION_RAW, 1 if self._raw else 0)
+        if not self._raw:
+            return
+
+        wide = TOUPCAM_RAW_BITS > 8 and hcam.MaxBitDepth() > 8
+        hcam.put_Option(self._sdk.TOUPCAM_OPTION_BITDEPTH, 1 if wide else 0)
+
+        fourcc, bits = hcam.get_RawFormat()
+        self._bayer = pattern_from_fourcc(fourcc)
+        self._raw_dtype = np.uint16 if wide else np.uint8
+        self._raw_bit_depth = bits if wide else 8
+
+    def _still_timeout_s(self) -> float:
+        return TOUPCAM_STILL_TIMEOUT_SEC + 2 * self._hcam.get_ExpoTime() / 1e6
+
+    def _snap_into(self, buffer: np.ndarray) -> None:
+        """Snap a still and pull it into ``buffer`` once the SDK signals it.
+
+        The still is exposed after the call, so it reflects every setting
+        applied before it; there is no fixed wait. Raises ``TimeoutError`` if
+        the camera does not deliver within the exposure-dependent timeout.
+        """
+        hcam = self._hcam
+        with self._still_lock:
+            self._still_ready.clear()
+            hcam.Snap(SNAP_PREVIEW_RESOLUTION)
+
+            timeout_s = self._still_timeout_s()
+            if not self._still_ready.wait(timeout_s):
+                raise TimeoutError(
+                    f"Toupcam still image not ready after {timeout_s:.1f} s"
+                )
+
+            # Peek at the size first so a mismatch can never overrun the buffer.
+            info = self._sdk.ToupcamFrameInfoV2()
+            hcam.PullStillImageV2(None, TOUPCAM_PIXEL_FORMAT_BITS, info)
+            if (info.height, info.width) != buffer.shape[:2]:
+                raise RuntimeError(
+                    f"Toupcam still is {info.width}x{info.height}, "
+                    f"expected {buffer.shape[1]}x{buffer.shape[0]}"
+                )
+            hcam.PullStillImageV2(
+                buffer_pointer(buffer), TOUPCAM_PIXEL_FORMAT_BITS, None
+            )
+
+    def capture_frame(self) -> Frame:
+        """Snap a still into a pooled buffer without copying.
+
+        The returned frame's ``data`` is an (H, W, 4) R,G,B,X array, or the
+        (H, W) sensor data in raw mode, owned by the pool; call
+        ``frame.release()`` once it is no longer needed.
+        """
+        if not self._connected or not self._hcam:
+            raise RuntimeError("Camera not connected")
+
+        frame = self._frame_pool().acquire()
+        try:
+            self._snap_into(frame.data)
+        except Exception:
+            frame.release()
+            raise
+        return frame
+
+    def capture(self) -> QImage:
+        if not self._connected or not self._hcam:
+            raise RuntimeError("Camera not connected")
+
+        if self._raw:
+            frame = self.capture_frame()
+            try:
+                pixels, _ = develop(frame, BILINEAR)
+            finally:
+                frame.release()
+            height, width = pixels.shape[:2]
+            channels = 1 if pixels.ndim == 2 else 3
+            image_format = (
+                QImage.Format.Format_Grayscale8
+                if channels == 1
+                else QImage.Format.Format_RGB888
+            )
+            return QImage(
+                pixels.data, width, height, width * channels, image_format
+            ).copy()
+
+        # Pull straight into the QImage's own pixel memory.
+        image = QImage(self._width, self._height, QImage.Format.Format_RGBX8888)
+        ptr = image.bits()
+        ptr.setsize(image.sizeInBytes())
+        pixels = np.frombuffer(ptr, dtype=np.uint8).reshape(
+            self._height, self._width, BYTES_PER_PIXEL
+        )
 
-        return qimg.copy()
+        self._snap_into(pixels)
+        return image
 
     def set_exposure(self, value: int) -> None:
         self._exposure_us = int(value)
@@ -110,13 +417,13 @@ class ToupcamCamera(BaseCamera):
         if enabled:
             # Auto white balance, continuous every 200 ms
             self._hcam.put_Option(
-                toupcam.TOUPCAM_OPTION_AWB_CONTINUOUS,
+                self._sdk.TOUPCAM_OPTION_AWB_CONTINUOUS,
                 200
             )
         else:
             # Disable auto white balance
             self._hcam.put_Option(
-                toupcam.TOUPCAM_OPTION_AWB_CONTINUOUS,
+                self._sdk.TOUPCAM_OPTION_AWB_CONTINUOUS,
                 0
             )
 
@@ -0,0 +1,273 @@
+import threading
+from collections import deque
+
+from loguru import logger
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from devices.camera.autofocus import autofocus, settled_frame
+from devices.camera.stage_mosaic import acquire_mosaic
+
+CAPTURE = "capture"
+START_LIVE = "start_live"
+STOP_LIVE = "stop_live"
+MOSAIC = "mosaic"
+AUTOFOCUS = "autofocus"
+RELEASE = "release"
+
+# Setting key -> camera setter, in the order they are pushed
+_SETTERS = (
+    ("auto_exposure", "set_auto_exposure"),
+    ("auto_white_balance", "set_auto_white_balance"),
+    ("exposure_us", "set_exposure"),
+    ("gain", "set_gain"),
+    ("gamma", "set_gamma"),
+    ("contrast", "set_contrast"),
+    ("binning", "set_binning"),
+    ("sensor_roi", "set_sensor_roi"),
+    ("raw_mode", "set_raw_mode"),
+)
+# Ignored by the camera while auto exposure is on
+_MANUAL_EXPOSURE_KEYS = ("exposure_us", "gain")
+
+
+class CameraWorker(QObject):
+    """Runs every camera call on one thread, so the GUI never waits on it.
+
+    Results are emitted as Qt signals, so slots run on the GUI thread.
+
+    Commands are queued and executed in order. A capture requested while
+    another is still queued replaces it (the newest settings win), and a live
+    view start/stop replaces any queued start/stop. Settings are diffed against
+    what was last applied, so only changed values reach the driver.
+    """
+
+    frame_captured = pyqtSignal(object)
+    capture_failed = pyqtSignal(str)
+    live_started = pyqtSignal(object)
+    live_failed = pyqtSignal(str)
+    camera_released = pyqtSignal(object)
+    mosaic_started = pyqtSignal(object)
+    mosaic_progress = pyqtSignal(int, int)
+    mosaic_finished = pyqtSignal(object)
+    mosaic_failed = pyqtSignal(str)
+    autofocus_finished = pyqtSignal(object)
+    autofocus_failed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._camera = None
+        # Settings last pushed to ``_applied_to``; only the worker thread
+        # touches either.
+        self._applied: dict = {}
+        self._applied_to = None
+        self._queue: deque[tuple[str, object]] = deque()
+        self._cond = threading.Condition()
+        self._quit = False
+        self._thread: threading.Thread | None = None
+        self._mosaic_cancel = threading.Event()
+
+        self.captures_requested = 0
+        self.captures_coalesced = 0
+        self.settings_pushed = 0
+
+    def set_camera(self, camera) -> None:
+        with self._cond:
+            self._camera = camera
+
+    def request_capture(self, settings: dict) -> bool:
+        """Queue a capture; returns False if it merged into a queued one."""
+        with self._cond:
+            self.captures_requested += 1
+            if self._replace(CAPTURE, (CAPTURE,), settings):
+                self.captures_coalesced += 1
+                return False
+            self._put(CAPTURE, settings)
+            return True
+
+    def start_live(self, settings: dict) -> None:
+        with self._cond:
+            if not self._replace(START_LIVE, (START_LIVE, STOP_LIVE), settings):
+                self._put(START_LIVE, settings)
+
+    def stop_live(self) -> None:
+        with self._cond:
+            if not self._replace(STOP_LIVE, (START_LIVE, STOP_LIVE), None):
+                self._put(STOP_LIVE, None)
+
+    def acquire_mosaic(self, settings: dict, request, motors, raw_display: str) -> None:
+        """Queue a stage mosaic (see ``stage_mosaic.acquire_mosaic``)."""
+        with self._cond:
+            self._mosaic_cancel.clear()
+            self._put(MOSAIC, (settings, request, motors, raw_display))
+
+    def cancel_mosaic(self) -> None:
+        """Stop the running mosaic after its current field."""
+        with self._cond:
+            self._mosaic_cancel.set()
+            self._queue = deque(item for item in self._queue if item[0] != MOSAIC)
+
+    def autofocus(self, settings: dict, motors, options: dict) -> None:
+        """Queue an autofocus run on live frames (see ``autofocus.autofocus``)."""
+        with self._cond:
+            self._put(AUTOFOCUS, (settings, motors, options))
+
+    def release(self, camera) -> None:
+        """Detach ``camera``; ``camera_released`` fires once it is idle.
+
+        Queued captures, live starts, mosaics and autofocus runs for it are
+        dropped, and a running mosaic stops after its current field.
+        """
+        with self._cond:
+            self._mosaic_cancel.set()
+            self._queue = deque(
+                item
+                for item in self._queue
+                if item[0] not in (CAPTURE, START_LIVE, MOSAIC, AUTOFOCUS)
+            )
+            self._put(RELEASE, camera)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="camera-worker", daemon=True
+            )
+            self._thread.start()
+
+    def shutdown(self, timeout_s: float = 2.0) -> None:
+        """Drop queued commands and wait for the one in flight to finish."""
+        with self._cond:
+            self._quit = True
+            self._queue.clear()
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout_s)
+            self._thread = None
+
+    def _put(self, kind: str, payload) -> None:
+        self._queue.append((kind, payload))
+        self._cond.notify()
+
+    def _replace(self, kind: str, replaces: tuple[str, ...], payload) -> bool:
+        for i, (queued, _) in enumerate(self._queue):
+            if queued in replaces:
+                self._queue[i] = (kind, payload)
+                return True
+        return False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._quit:
+                    self._cond.wait()
+                if self._quit:
+                    return
+                kind, payload = self._queue.popleft()
+                camera = self._camera
+
+            self._execute(kind, payload, camera)
+
+    def _execute(self, kind: str, payload, camera) -> None:
+        if kind == RELEASE:
+            payload.stop_stream()
+            with self._cond:
+                if self._camera is payload:
+                    self._camera = None
+            if self._applied_to is payload:
+                self._applied_to = None
+            self.camera_released.emit(payload)
+            return
+
+        if camera is None:
+            if kind == CAPTURE:
+                self.capture_failed.emit("Camera not connected")
+            elif kind == START_LIVE:
+                self.live_failed.emit("Camera not connected")
+            elif kind == MOSAIC:
+                self.mosaic_failed.emit("Camera not connected")
+            elif kind == AUTOFOCUS:
+                self.autofocus_failed.emit("Camera not connected")
+            return
+
+        try:
+            if kind == STOP_LIVE:
+                camera.stop_stream()
+            elif kind == START_LIVE:
+                self._push_settings(camera, payload)
+                self.live_started.emit(camera.start_stream())
+            elif kind == MOSAIC:
+                self._acquire_mosaic(camera, *payload)
+            elif kind == AUTOFOCUS:
+                self._autofocus(camera, *payload)
+            else:
+                camera.stop_stream()
+                self._push_settings(camera, payload)
+                self.frame_captured.emit(self._capture(camera, payload))
+        except Exception as exc:
+            logger.opt(exception=exc).debug(f"Camera {kind} failed")
+            if kind == CAPTURE:
+                self.capture_failed.emit(str(exc))
+            elif kind == START_LIVE:
+                self.live_failed.emit(str(exc))
+            elif kind == MOSAIC:
+                self.mosaic_failed.emit(str(exc))
+            elif kind == AUTOFOCUS:
+                self.autofocus_failed.emit(str(exc))
+            else:
+                logger.warning(f"Camera {kind} failed: {exc}")
+
+    def _acquire_mosaic(self, camera, settings, request, motors, raw_display) -> None:
+        camera.stop_stream()
+        self._push_settings(camera, settings)
+        pyramid = acquire_mosaic(
+            request,
+            capture=lambda: self._capture(camera, settings),
+            motors=motors,
+            raw_display=raw_display,
+            on_started=self.mosaic_started.emit,
+            on_progress=self.mosaic_progress.emit,
+            cancelled=self._mosaic_cancel.is_set,
+        )
+        self.mosaic_finished.emit(pyramid)
+
+    def _autofocus(self, camera, settings, motors, options) -> None:
+        camera.stop_stream()
+        self._push_settings(camera, settings)
+        stream = camera.start_stream()
+        try:
+            result = autofocus(lambda: settled_frame(stream), motors, **options)
+        finally:
+            camera.stop_stream()
+        self.autofocus_finished.emit(result)
+
+    @staticmethod
+    def _capture(camera, settings: dict):
+        count = settings.get("stack_frames", 1)
+        if count > 1:
+            return camera.capture_stacked(count, settings.get("stack_align", False))
+        return camera.capture_frame()
+
+    def _push_settings(self, camera, settings: dict) -> None:
+        if camera is not self._applied_to:
+            self._applied = {}
+            self._applied_to = camera
+        auto_exposure = settings.get("auto_exposure", False)
+        if self._applied.get("auto_exposure", auto_exposure) != auto_exposure:
+            # The camera has moved exposure and gain on its own: send the
+            # manual values again when auto exposure is switched off.
+            for key in _MANUAL_EXPOSURE_KEYS:
+                self._applied.pop(key, None)
+        for key, setter in _SETTERS:
+            if key not in settings:
+                continue
+            if auto_exposure and key in _MANUAL_EXPOSURE_KEYS:
+                continue
+
+            value = settings[key]
+            if key in self._applied and self._applied[key] == value:
+                continue
+
+            # Forget the old value first: if the setter fails, it is retried.
+            self._applied.pop(key, None)
+            getattr(camera, setter)(value)
+            self._applied[key] = value
+            self.settings_pushed += 1
@@ -1,62 +1,89 @@
-from config import DEBUG
-import devices.camera.toupcam as toupcam
+from devices.registry import (
+    CAMERA,
+    MOTORS,
+    SPECTROMETER,
+    DevicePlugin,
+    DeviceRegistry,
+)
+
+BUILTIN_PLUGINS = (
+    DevicePlugin(
+        name="Dummy Camera",
+        kind=CAMERA,
+        target="devices.camera.dummy_camera:DummyCamera",
+        debug_only=True,
+    ),
+    DevicePlugin(
+        name="Toupcam",
+        kind=CAMERA,
+        target="devices.camera.toupcam_camera:ToupcamCamera",
+        enumerator="devices.camera.toupcam_camera:enumerate_devices",
+    ),
+    DevicePlugin(
+        name="Simulated Toupcam",
+        kind=CAMERA,
+        target="devices.camera.toupcam_camera:ToupcamCamera",
+        enumerator="devices.camera.fake_toupcam:enumerate_devices",
+        debug_only=True,
+    ),
+    DevicePlugin(
+        name="Slow Dummy Camera",
+        kind=CAMERA,
+        target="devices.camera.slow_dummy_camera:SlowDummyCamera",
+        enumerator="devices.camera.slow_dummy_camera:enumerate_devices",
+        debug_only=True,
+    ),
+    DevicePlugin(
+        name="Dummy Spectrometer",
+        kind=SPECTROMETER,
+        target="devices.spectrometer.dummy_spectrometer:DummySpectrometer",
+        debug_only=True,
+    ),
+    DevicePlugin(
+        name="Virtual Sample Spectrometer",
+        kind=SPECTROMETER,
+        target=(
+            "devices.spectrometer.virtual_sample_spectrometer:"
+            "VirtualSampleSpectrometer"
+        ),
+        debug_only=True,
+    ),
+    DevicePlugin(
+        name="Dummy Motor Controller",
+        kind=MOTORS,
+        target="devices.motors.dummy_motor_controller:DummyMotorController",
+        debug_only=True,
+    ),
+)
 
 
 class DeviceFactory:
-    def __init__(self):
-        self._toupcam_models: dict[str, toupcam.ToupcamModel] = {}
+    def __init__(self, registry: DeviceRegistry | None = None):
+        self.registry = registry or DeviceRegistry(BUILTIN_PLUGINS)
 
-    def available_cameras(self) -> list[str]:
-        devices = []
-
-        if DEBUG:
-            devices.append("Dummy Camera")
-
-        self._toupcam_models.clear()
+    def plugins(self, kind: str) -> list[DevicePlugin]:
+        return self.registry.plugins(kind)
 
-        try:
-            for cam in toupcam.Toupcam.EnumV2():
-                ui_name = f"Toupcam: {cam.displayname}"
-                devices.append(ui_name)
-                self._toupcam_models[ui_name] = cam
-        except Exception:
-            pass
-
-        return devices
-
-    def create_camera(self, name: str):
-        if name == "Dummy Camera" and DEBUG:
-            from devices.camera.dummy_camera import DummyCamera
-            return DummyCamera()
+    def enumerate_plugin(self, plugin: DevicePlugin, max_age_s: float) -> list[str]:
+        return self.registry.enumerate_plugin(plugin, max_age_s)
 
-        if name in self._toupcam_models:
-            from devices.camera.toupcam_camera import ToupcamCamera
-            return ToupcamCamera(self._toupcam_models[name])
+    def create(self, kind: str, name: str):
+        return self.registry.create(kind, name)
 
-        raise ValueError(f"Unknown camera: {name}")
+    def available_cameras(self) -> list[str]:
+        return self.registry.enumerate(CAMERA)
 
     def available_spectrometers(self) -> list[str]:
-        devices: list[str] = []
-        if DEBUG:
-            devices.append("Dummy Spectrometer")
-        return devices
+        return self.registry.enumerate(SPECTROMETER)
 
     def available_motors(self) -> list[str]:
-        devices: list[str] = []
-        if DEBUG:
-            devices.append("Dummy Motor Controller")
-        return devices
+        return self.registry.enumerate(MOTORS)
 
-    def create_spectrometer(self, name: str):
-        if name == "Dummy Spectrometer" and DEBUG:
-            from devices.spectrometer.dummy_spectrometer import DummySpectrometer
+    def create_camera(self, name: str):
+        return self.registry.create(CAMERA, name)
 
-            return DummySpectrometer()
-        raise ValueError(f"Unknown spectrometer: {name}")
+    def create_spectrometer(self, name: str):
+        return self.registry.create(SPECTROMETER, name)
 
     def create_motors(self, name: str):
-        if name == "Dummy Motor Controller" and DEBUG:
-            from devices.motors.dummy_motor_controller import DummyMotorController
-
-            return DummyMotorController()
-        raise ValueError(f"Unknown motor controller: {name}")
+        return self.registry.create(MOTORS, name)
@@ -17,3 +17,17 @@ class BaseMotorController(ABC):
     @abstractmethod
     def move_to(self, x: float, y: float) -> None:
         ...
+
+    # Optional position readback; None if the controller cannot report it
+    def get_position(self) -> tuple[float, float] | None:
+        return None
+
+    # Optional focus (Z) axis
+    def has_focus_axis(self) -> bool:
+        return False
+
+    def move_z(self, z: float) -> None:
+        raise NotImplementedError(f"{type(self).__name__} has no focus axis")
+
+    def get_z(self) -> float:
+        raise NotImplementedError(f"{type(self).__name__} has no focus axis")
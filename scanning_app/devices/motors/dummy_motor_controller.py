@@ -5,9 +5,11 @@ from .base_motor_controller import BaseMotorController
 
 
 class DummyMotorController(BaseMotorController):
-    def __init__(self):
+    def __init__(self, settle_time_s: float = MOTOR_SETTLE_TIME_SEC):
         self._connected = False
         self.position = (0.0, 0.0)
+        self.z = 0.0
+        self.settle_time_s = settle_time_s
 
     def connect(self) -> None:
         self._connected = True
@@ -23,6 +25,23 @@ class DummyMotorController(BaseMotorController):
     def move_to(self, x: float, y: float) -> None:
         if not self._connected:
             raise RuntimeError("Motor controller not connected")
-        time.sleep(MOTOR_SETTLE_TIME_SEC)
+        if self.settle_time_s > 0:
+            time.sleep(self.settle_time_s)
         self.position = (x, y)
         # logger.debug(f"Dummy motor reached ({x:.3f}, {y:.3f})")
+
+    def get_position(self) -> tuple[float, float]:
+        return self.position
+
+    def has_focus_axis(self) -> bool:
+        return True
+
+    def move_z(self, z: float) -> None:
+        if not self._connected:
+            raise RuntimeError("Motor controller not connected")
+        if self.settle_time_s > 0:
+            time.sleep(self.settle_time_s)
+        self.z = z
+
+    def get_z(self) -> float:
+        return self.z
@@ -0,0 +1,74 @@
+"""Spatial lookup of scan points on the nodes of a ``ScanGrid``.
+
+The index is an array holding one point id per grid node (so masked, sparse
+and adaptive scans work as well as full rasters): the point at a node is one
+lookup, and a nearest-point query only visits the cells of a window grown
+around the query position.
+"""
+
+import math
+
+import numpy as np
+
+from .scan_grid import ScanGrid
+
+
+class GridPointIndex:
+    """Points on the nodes of ``grid``; ``ids`` holds, per node, the id of
+    its point or -1. The array is used as is, not copied."""
+
+    def __init__(self, grid: ScanGrid, ids: np.ndarray):
+        self.grid = grid
+        self.ids = ids
+
+    def at(self, row: int, col: int) -> int | None:
+        point = int(self.ids[row, col])
+        return None if point < 0 else point
+
+    def nearest(self, x, y, max_distance=math.inf) -> int | None:
+        """Id of the point closest to ``(x, y)``, or None if there is none
+        within ``max_distance``."""
+        row, col = self._node(x, y)
+        rows, cols = self.grid.shape
+        # Grow the window until it holds a point; the nearest point is then
+        # no farther than that one, so one more window settles it.
+        reach = 0
+        while True:
+            ids, xs, ys = self._window(
+                max(row - reach, 0),
+                min(row + reach, rows - 1),
+                max(col - reach, 0),
+                min(col + reach, cols - 1),
+            )
+            if len(ids):
+                break
+            if reach >= max(rows, cols):
+                return None
+            reach = max(1, 2 * reach)
+
+        bound = math.sqrt(float(np.min((xs - x) ** 2 + (ys - y) ** 2)))
+        if bound > max_distance:
+            return None
+        r0, c0 = self._node(x - bound, y - bound)
+        r1, c1 = self._node(x + bound, y + bound)
+        ids, xs, ys = self._window(r0, r1, c0, c1)
+        return int(ids[np.argmin((xs - x) ** 2 + (ys - y) ** 2)])
+
+    def _node(self, x, y) -> tuple[int, int]:
+        # Nearest node, clipped to the grid
+        grid = self.grid
+        rows, cols = grid.shape
+        col = math.floor((x - grid.x0) / grid.step_x + 0.5)
+        row = math.floor((y - grid.y0) / grid.step_y + 0.5)
+        return min(max(row, 0), rows - 1), min(max(col, 0), cols - 1)
+
+    def _window(self, r0, r1, c0, c1) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Ids and coordinates of the points at nodes ``r0..r1``, ``c0..c1``
+        (inclusive, already clipped)."""
+        block = self.ids[r0 : r1 + 1, c0 : c1 + 1]
+        rows, cols = np.nonzero(block >= 0)
+        return (
+            block[rows, cols],
+            self.grid.x(cols + c0),
+            self.grid.y(rows + r0),
+        )
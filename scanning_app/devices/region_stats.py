@@ -0,0 +1,224 @@
+"""Spectral statistics of map regions: pixel count, mean, standard deviation
+and minimum/maximum spectrum of the measured pixels in a rectangle or mask.
+
+Rectangles are answered from summed-area tables of the cube, of its squares
+and of its measured-pixel mask, so the mean and standard deviation take four
+lookups per channel whatever the rectangle's size. The tables hold two
+float64 copies of the cube and cost as much as many direct reductions, so
+they are built on a cube's second rectangle query: the first is reduced
+directly, and a map that changes between queries (a live scan) never builds
+them. Maps whose tables would exceed ``REGION_STATS_TABLE_BUDGET_MB`` are
+always reduced directly. Minimum and maximum have no prefix-sum form; they
+come from per-tile minimum and maximum spectra for the tiles inside the
+rectangle and from the cube for the strips along its edges, so their cost
+grows with the rectangle's perimeter rather than its area.
+
+Masks (lassos) and direct rectangle queries gather the measured pixels a few
+rows at a time and reduce them together, so no copy larger than
+``_CHUNK_BYTES`` is made.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from config import REGION_STATS_TABLE_BUDGET_MB
+
+# Side, in pixels, of the tiles holding precomputed minimum/maximum spectra
+_TILE = 8
+# Largest block of spectra gathered at once by a direct reduction
+_CHUNK_BYTES = 32 * 2**20
+
+
+@dataclass
+class SpectralStats:
+    """Statistics over ``count`` spectra, per channel (population std)."""
+
+    raman_shifts: np.ndarray
+    count: int
+    mean: np.ndarray
+    std: np.ndarray
+    minimum: np.ndarray
+    maximum: np.ndarray
+
+
+class RegionStats:
+    """Regions of a ``(ny, nx, channels)`` cube; unmeasured pixels hold NaN
+    spectra and are left out of every statistic."""
+
+    def __init__(
+        self,
+        raman_shifts,
+        cube: np.ndarray,
+        table_budget_mb: float = REGION_STATS_TABLE_BUDGET_MB,
+    ):
+        self.raman_shifts = np.asarray(raman_shifts, dtype=float)
+        self.cube = cube
+        self.measured = np.isfinite(cube[..., 0])
+        self._offset = None
+        self._tables = None
+        self._rect_queries = 0
+        rows, cols, channels = cube.shape
+        # Sums and squares of each channel, float64
+        table_bytes = 2 * (rows + 1) * (cols + 1) * channels * 8
+        self.uses_tables = table_bytes <= table_budget_mb * 2**20
+
+    @property
+    def offset(self) -> np.ndarray:
+        """Mean spectrum of the cube. Statistics are accumulated relative to
+        it, so the variance is not the difference of two large sums."""
+        if self._offset is None:
+            total = self.cube.sum(
+                axis=(0, 1), dtype=np.float64, where=self.measured[..., None]
+            )
+            count = max(int(self.measured.sum()), 1)
+            self._offset = (total / count).astype(np.float32)
+        return self._offset
+
+    def rect(self, row0: int, row1: int, col0: int, col1: int) -> SpectralStats | None:
+        """Statistics of rows ``row0 .. row1 - 1`` and columns
+        ``col0 .. col1 - 1``, or None if no pixel there was measured."""
+        rows, cols = self.measured.shape
+        row0, row1 = max(row0, 0), min(row1, rows)
+        col0, col1 = max(col0, 0), min(col1, cols)
+        if row1 <= row0 or col1 <= col0:
+            return None
+
+        self._rect_queries += 1
+        if self._tables is None:
+            if self._rect_queries == 1 or not self.uses_tables:
+                return self._direct(row0, row1, col0, col1)
+            self._tables = self._build_tables()
+        counts, sums, squares, tile_min, tile_max = self._tables
+
+        def box(table):
+            # Sum over the rectangle from its four corners
+            a, b, c, d = (
+                table[corner]
+                for corner in ((row1, col1), (row0, col1), (row1, col0), (row0, col0))
+            )
+            return a - b - c + d
+
+        count = int(box(counts))
+        if not count:
+            return None
+        mean = box(sums) / count
+        variance = np.maximum(box(squares) / count - mean**2, 0.0)
+
+        # Whole tiles inside the rectangle, then the pixels around them
+        tiles_y, tiles_x = tile_min.shape[:2]
+        tile_row0, tile_row1 = -(-row0 // _TILE), min(row1 // _TILE, tiles_y)
+        tile_col0, tile_col1 = -(-col0 // _TILE), min(col1 // _TILE, tiles_x)
+        if tile_row1 > tile_row0 and tile_col1 > tile_col0:
+            tiles = (slice(tile_row0, tile_row1), slice(tile_col0, tile_col1))
+            inner_rows = (tile_row0 * _TILE, tile_row1 * _TILE)
+            inner_cols = (tile_col0 * _TILE, tile_col1 * _TILE)
+            minimum = _reduce(np.fmin, tile_min[tiles])
+            maximum = _reduce(np.fmax, tile_max[tiles])
+            strips = [
+                (row0, inner_rows[0], col0, col1),
+                (inner_rows[1], row1, col0, col1),
+                (*inner_rows, col0, inner_cols[0]),
+                (*inner_rows, inner_cols[1], col1),
+            ]
+        else:
+            minimum = maximum = None
+            strips = [(row0, row1, col0, col1)]
+
+        for top, bottom, left, right in strips:
+            if bottom > top and right > left:
+                block = self.cube[top:bottom, left:right]
+                minimum = _combine(np.fmin, minimum, _reduce(np.fmin, block))
+                maximum = _combine(np.fmax, maximum, _reduce(np.fmax, block))
+
+        return SpectralStats(
+            self.raman_shifts,
+            count,
+            self.offset + mean,
+            np.sqrt(variance),
+            minimum,
+            maximum,
+        )
+
+    def masked(self, mask: np.ndarray) -> SpectralStats | None:
+        """Statistics of the measured pixels where ``mask`` is set, or None
+        if there are none."""
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        if not len(rows):
+            return None
+        return self._direct(rows[0], rows[-1] + 1, cols[0], cols[-1] + 1, mask)
+
+    def _direct(self, row0, row1, col0, col1, mask=None) -> SpectralStats | None:
+        """Direct statistics of the measured pixels of a block, and of those
+        where ``mask`` (full size) is set, gathered a few rows at a time."""
+        channels = self.cube.shape[2]
+        step = max(1, _CHUNK_BYTES // ((col1 - col0) * channels * 4))
+        count = 0
+        total = np.zeros(channels)
+        squares = np.zeros(channels)
+        minimum = maximum = None
+        for top in range(row0, row1, step):
+            block = (slice(top, min(top + step, row1)), slice(col0, col1))
+            selected = self.measured[block]
+            if mask is not None:
+                selected = selected & mask[block]
+            spectra = self.cube[block][selected]
+            if not len(spectra):
+                continue
+
+            centred = spectra - self.offset
+            count += len(spectra)
+            total += centred.sum(axis=0, dtype=np.float64)
+            squares += np.einsum("ij,ij->j", centred, centred, dtype=np.float64)
+            minimum = _combine(np.fmin, minimum, spectra.min(axis=0))
+            maximum = _combine(np.fmax, maximum, spectra.max(axis=0))
+
+        if not count:
+            return None
+        mean = total / count
+        variance = np.maximum(squares / count - mean**2, 0.0)
+        return SpectralStats(
+            self.raman_shifts,
+            count,
+            self.offset + mean,
+            np.sqrt(variance),
+            minimum,
+            maximum,
+        )
+
+    def _build_tables(self):
+        rows, cols, channels = self.cube.shape
+        sums = np.zeros((rows + 1, cols + 1, channels))
+        inner = sums[1:, 1:]
+        np.subtract(self.cube, self.offset, out=inner)
+        inner[~self.measured] = 0.0
+        squares = np.zeros_like(sums)
+        np.square(inner, out=squares[1:, 1:])
+        for table in (inner, squares[1:, 1:]):
+            np.cumsum(table, axis=0, out=table)
+            np.cumsum(table, axis=1, out=table)
+
+        counts = np.zeros((rows + 1, cols + 1), dtype=np.int64)
+        counts[1:, 1:] = self.measured.cumsum(axis=0).cumsum(axis=1)
+
+        # Rows of tiles first, from a view of the cube; pixels beyond the
+        # last whole tile are read from the cube itself.
+        tiles_y, tiles_x = rows // _TILE, cols // _TILE
+        band = self.cube[: tiles_y * _TILE].reshape(tiles_y, _TILE, cols, channels)
+        extremes = []
+        for ufunc in (np.fmin, np.fmax):
+            by_row = ufunc.reduce(band, axis=1)[:, : tiles_x * _TILE]
+            extremes.append(
+                ufunc.reduce(by_row.reshape(tiles_y, tiles_x, _TILE, channels), axis=2)
+            )
+        return (counts, sums, squares, *extremes)
+
+
+def _reduce(ufunc, block: np.ndarray) -> np.ndarray:
+    """``ufunc`` (NaN-ignoring ``fmin``/``fmax``) over a block's pixels."""
+    return ufunc.reduce(ufunc.reduce(block, axis=0), axis=0)
+
+
+def _combine(ufunc, current, values):
+    return values if current is None else ufunc(current, values)
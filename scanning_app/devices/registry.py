@@ -0,0 +1,145 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from importlib import import_module, metadata
+
+from loguru import logger
+
+from config import DEBUG, DEVICE_ENUM_CACHE_SEC
+
+ENTRY_POINT_GROUP = "scanning_app.devices"
+
+CAMERA = "camera"
+SPECTROMETER = "spectrometer"
+MOTORS = "motors"
+
+_KIND_LABELS = {
+    CAMERA: "camera",
+    SPECTROMETER: "spectrometer",
+    MOTORS: "motor controller",
+}
+
+
+def _resolve(target: str):
+    module_name, _, attr = target.partition(":")
+    return getattr(import_module(module_name), attr)
+
+
+@dataclass(frozen=True)
+class DevicePlugin:
+    name: str
+    kind: str
+    target: str
+    enumerator: str | None = None
+    debug_only: bool = False
+
+    def load(self):
+        return _resolve(self.target)
+
+    def enumerate(self) -> list[tuple[str, dict]]:
+        if self.enumerator is None:
+            return [(self.name, {})]
+        return list(_resolve(self.enumerator)())
+
+
+@dataclass(frozen=True)
+class DeviceEntry:
+    name: str
+    plugin: DevicePlugin
+    kwargs: dict = field(default_factory=dict)
+
+
+class DeviceRegistry:
+    def __init__(self, plugins=(), debug: bool = DEBUG, load_entry_points=True):
+        self._debug = debug
+        self._plugins: dict[tuple[str, str], DevicePlugin] = {}
+        self._entries: dict[str, dict[str, DeviceEntry]] = {}
+        self._enumerated_at: dict[tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+        for plugin in plugins:
+            self.register(plugin)
+
+        if load_entry_points:
+            self._load_entry_points()
+
+    def register(self, plugin: DevicePlugin) -> None:
+        if plugin.debug_only and not self._debug:
+            return
+        self._plugins[(plugin.kind, plugin.name)] = plugin
+
+    def _load_entry_points(self) -> None:
+        for entry_point in metadata.entry_points(group=ENTRY_POINT_GROUP):
+            try:
+                loaded = entry_point.load()
+            except Exception:
+                logger.exception(f"Failed to load device plugin {entry_point.name}")
+                continue
+
+            plugins = [loaded] if isinstance(loaded, DevicePlugin) else list(loaded)
+            for plugin in plugins:
+                self.register(plugin)
+
+    def plugins(self, kind: str) -> list[DevicePlugin]:
+        return [p for (k, _), p in self._plugins.items() if k == kind]
+
+    def enumerate_plugin(
+        self, plugin: DevicePlugin, max_age_s: float = DEVICE_ENUM_CACHE_SEC
+    ) -> list[str]:
+        key = (plugin.kind, plugin.name)
+
+        with self._lock:
+            enumerated_at = self._enumerated_at.get(key)
+            age = time.monotonic() - enumerated_at if enumerated_at else None
+            if age is not None and age < max_age_s:
+                return self._names_for(plugin)
+
+        found = plugin.enumerate()
+
+        with self._lock:
+            entries = {
+                name: entry
+                for name, entry in self._entries.get(plugin.kind, {}).items()
+                if entry.plugin != plugin
+            }
+            for name, kwargs in found:
+                entries[name] = DeviceEntry(name, plugin, kwargs)
+
+            self._entries[plugin.kind] = entries
+            self._enumerated_at[key] = time.monotonic()
+            return self._names_for(plugin)
+
+    def enumerate(
+        self, kind: str, max_age_s: float = DEVICE_ENUM_CACHE_SEC
+    ) -> list[str]:
+        names: list[str] = []
+
+        for plugin in self.plugins(kind):
+            try:
+                names.extend(self.enumerate_plugin(plugin, max_age_s))
+            except Exception as exc:
+                logger.warning(f"Enumeration failed for {plugin.name}: {exc}")
+
+        return names
+
+    def _names_for(self, plugin: DevicePlugin) -> list[str]:
+        return [
+            name
+            for name, entry in self._entries.get(plugin.kind, {}).items()
+            if entry.plugin == plugin
+        ]
+
+    def entry(self, kind: str, name: str) -> DeviceEntry:
+        entry = self._entries.get(kind, {}).get(name)
+        if entry is not None:
+            return entry
+
+        plugin = self._plugins.get((kind, name))
+        if plugin is not None and plugin.enumerator is None:
+            return DeviceEntry(name, plugin)
+
+        raise ValueError(f"Unknown {_KIND_LABELS.get(kind, kind)}: {name}")
+
+    def create(self, kind: str, name: str):
+        entry = self.entry(kind, name)
+        return entry.plugin.load()(**entry.kwargs)
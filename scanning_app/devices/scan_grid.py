@@ -0,0 +1,112 @@
+"""Geometry of a raster scan, without materialising its points."""
+
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+# Minimum step, as enforced by the scan parameters
+MIN_STEP = 0.1
+# Slack, in steps, when counting nodes, so that a side that is a whole
+# number of steps does not gain a node from float rounding
+_COUNT_TOLERANCE = 1e-9
+
+
+def _count(length: float, step: float) -> int:
+    return max(0, math.ceil(length / step - _COUNT_TOLERANCE))
+
+
+@dataclass(frozen=True)
+class ScanGrid:
+    """Nodes ``(x0 + col * step_x, y0 + row * step_y)`` for ``row < ny`` and
+    ``col < nx``, scanned row by row in increasing x.
+
+    Arrays are indexed ``[row, col]``, as the heatmap and scan masks are.
+    """
+
+    x0: float
+    y0: float
+    step_x: float
+    step_y: float
+    nx: int
+    ny: int
+
+    @classmethod
+    def from_roi(cls, x, y, width, height, step_x, step_y) -> "ScanGrid":
+        """Nodes from the ROI's lower corner, up to but excluding its far
+        edges (as ``np.arange`` would, without its float off-by-ones)."""
+        step_x = max(MIN_STEP, float(step_x))
+        step_y = max(MIN_STEP, float(step_y))
+        return cls(
+            x0=float(x),
+            y0=float(y),
+            step_x=step_x,
+            step_y=step_y,
+            nx=_count(float(width), step_x),
+            ny=_count(float(height), step_y),
+        )
+
+    @classmethod
+    def from_rect(cls, rect, step_x, step_y) -> "ScanGrid":
+        return cls.from_roi(
+            rect.left(), rect.top(), rect.width(), rect.height(), step_x, step_y
+        )
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.ny, self.nx
+
+    def __len__(self) -> int:
+        return self.nx * self.ny
+
+    @property
+    def xs(self) -> np.ndarray:
+        return self.x0 + self.step_x * np.arange(self.nx)
+
+    @property
+    def ys(self) -> np.ndarray:
+        return self.y0 + self.step_y * np.arange(self.ny)
+
+    def x(self, col: int) -> float:
+        return self.x0 + self.step_x * col
+
+    def y(self, row: int) -> float:
+        return self.y0 + self.step_y * row
+
+    def index(self, x: float, y: float) -> tuple[int, int] | None:
+        """``(row, col)`` of the node nearest ``(x, y)``, or None if that is
+        more than half a step outside the grid."""
+        col = round((x - self.x0) / self.step_x)
+        row = round((y - self.y0) / self.step_y)
+        if 0 <= col < self.nx and 0 <= row < self.ny:
+            return row, col
+        return None
+
+    def indices(self, xs, ys) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Vectorised ``index``: rows, columns and a mask of the coordinates
+        that fall on the grid (rows and columns are clipped elsewhere)."""
+        cols = np.rint((np.asarray(xs, float) - self.x0) / self.step_x).astype(int)
+        rows = np.rint((np.asarray(ys, float) - self.y0) / self.step_y).astype(int)
+        inside = (cols >= 0) & (cols < self.nx) & (rows >= 0) & (rows < self.ny)
+        return (
+            np.clip(rows, 0, max(self.ny - 1, 0)),
+            np.clip(cols, 0, max(self.nx - 1, 0)),
+            inside,
+        )
+
+    @property
+    def extent(self) -> tuple[float, float, float, float]:
+        """``(left, right, bottom, top)`` of the node cells, for ``imshow``."""
+        return (
+            self.x0 - self.step_x / 2,
+            self.x(self.nx - 1) + self.step_x / 2,
+            self.y0 - self.step_y / 2,
+            self.y(self.ny - 1) + self.step_y / 2,
+        )
+
+    def __iter__(self):
+        """``(row, col, x, y)`` of every node in scan order."""
+        for row in range(self.ny):
+            y = self.y(row)
+            for col in range(self.nx):
+                yield row, col, self.x(col), y
@@ -0,0 +1,139 @@
+"""Masks restricting a raster scan to part of its bounding rectangle.
+
+A mask comes from a polygon drawn on the camera view, from thresholding the
+camera image, or from both (a node must then pass both). It is evaluated at
+the scan's grid nodes, in stage coordinates, and only nodes inside it are
+acquired.
+"""
+
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from .camera.frame_buffer import FrameGeometry
+
+BRIGHT = "bright"
+DARK = "dark"
+
+
+def polygon_mask(xs, ys, polygon) -> np.ndarray:
+    """Grid nodes ``(ys[i], xs[j])`` inside a closed polygon (even-odd rule),
+    as a ``(len(ys), len(xs))`` boolean array."""
+    px, py = np.meshgrid(np.asarray(xs, float), np.asarray(ys, float))
+    inside = np.zeros(px.shape, dtype=bool)
+    vertices = np.asarray(polygon, dtype=float)
+    for (x0, y0), (x1, y1) in zip(vertices, np.roll(vertices, -1, axis=0)):
+        crosses = (y0 > py) != (y1 > py)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+        inside ^= crosses & (px < x_cross)
+    return inside
+
+
+def otsu_threshold(values: np.ndarray) -> float:
+    """Threshold maximising the between-class variance of ``values``."""
+    values = np.asarray(values, dtype=float).ravel()
+    lo, hi = float(values.min()), float(values.max())
+    if hi <= lo:
+        return lo
+
+    counts, edges = np.histogram(values, bins=256, range=(lo, hi))
+    centers = (edges[:-1] + edges[1:]) / 2
+    weight = np.cumsum(counts).astype(float)
+    total = weight[-1]
+    mean = np.cumsum(counts * centers)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mean[-1] * weight - mean * total) ** 2 / (
+            weight * (total - weight)
+        )
+    return float(edges[int(np.nanargmax(between[:-1])) + 1])
+
+
+def threshold_image(pixels: np.ndarray, polarity: str = BRIGHT) -> np.ndarray:
+    """Object mask of a uint8 camera image by Otsu's threshold on luminance.
+
+    Four-channel pixels with zero alpha (unimaged mosaic areas) are never
+    objects.
+    """
+    valid = None
+    if pixels.ndim == 3:
+        if pixels.shape[2] == 4:
+            valid = pixels[..., 3] > 0
+        luma = pixels[..., :3].mean(axis=-1, dtype=np.float32)
+    else:
+        luma = pixels.astype(np.float32)
+
+    sample = luma if valid is None else luma[valid]
+    if sample.size == 0:
+        return np.zeros(luma.shape, dtype=bool)
+
+    threshold = otsu_threshold(sample)
+    mask = luma > threshold if polarity == BRIGHT else luma <= threshold
+    return mask if valid is None else mask & valid
+
+
+@dataclass
+class ScanMask:
+    """Where to scan inside the ROI's bounding rectangle.
+
+    ``polygon`` is in stage coordinates. ``image`` is a boolean mask over the
+    pixels of a camera image placed on the sensor by ``geometry``; stage y
+    is ``sensor_height`` minus view y, as for the rectangular ROI.
+    """
+
+    polygon: np.ndarray | None = None
+    image: np.ndarray | None = None
+    geometry: FrameGeometry | None = None
+    sensor_height: float = 0.0
+
+    @property
+    def source(self) -> str:
+        parts = []
+        if self.polygon is not None:
+            parts.append("polygon")
+        if self.image is not None:
+            parts.append("threshold")
+        return "+".join(parts)
+
+    def grid(self, xs, ys) -> np.ndarray:
+        """Boolean ``(len(ys), len(xs))`` mask of the nodes to acquire."""
+        mask = np.ones((len(ys), len(xs)), dtype=bool)
+        if self.polygon is not None:
+            mask &= polygon_mask(xs, ys, self.polygon)
+        if self.image is not None:
+            mask &= self._image_nodes(xs, ys)
+        return mask
+
+    def _image_nodes(self, xs, ys) -> np.ndarray:
+        g = self.geometry or FrameGeometry()
+        height, width = self.image.shape
+        cols = np.floor((np.asarray(xs, float) - g.origin_x) / g.binning).astype(int)
+        view_y = self.sensor_height - np.asarray(ys, float)
+        rows = np.floor((view_y - g.origin_y) / g.binning).astype(int)
+
+        col_ok = (cols >= 0) & (cols < width)
+        row_ok = (rows >= 0) & (rows < height)
+        nodes = self.image[
+            np.ix_(np.clip(rows, 0, height - 1), np.clip(cols, 0, width - 1))
+        ]
+        return nodes & row_ok[:, None] & col_ok[None, :]
+
+
+@dataclass
+class MaskReport:
+    source: str
+    # Nodes of the bounding rectangle, and those inside the mask
+    grid_points: int
+    mask_points: int
+    points: int
+    elapsed_s: float
+
+    @property
+    def saved_s(self) -> float:
+        """Time the skipped nodes would have taken at the measured rate."""
+        if not self.points:
+            return 0.0
+        return self.elapsed_s / self.points * (self.grid_points - self.mask_points)
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "saved_s": self.saved_s}
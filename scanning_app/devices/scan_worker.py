@@ -5,6 +5,8 @@ import numpy as np
 from loguru import logger
 from PyQt6.QtCore import QThread, pyqtSignal
 
+from devices.scan_grid import ScanGrid
+
 
 @dataclass
 class ScanPoint:
@@ -12,12 +14,18 @@ class ScanPoint:
     y: float
     raman_shifts: np.ndarray | None
     intensities: np.ndarray | None
+    z: float | None = None
+    integration_time_ms: float | None = None
+    # Adaptive dwell: total integration and number of exposures summed
+    dwell_ms: float | None = None
+    accumulations: int | None = None
 
 
 class ScanWorker(QThread):
     progress_updated = pyqtSignal(int)
     eta_updated = pyqtSignal(str)
     point_acquired = pyqtSignal(object)
+    slice_started = pyqtSignal(int, float)
     finished = pyqtSignal(list)
 
     def __init__(self, roi_rect, scan_params, motor_controller, spectrometer):
@@ -27,6 +35,15 @@ class ScanWorker(QThread):
         self.motor_controller = motor_controller
         self.spectrometer = spectrometer
         self._is_stopped = False
+        # Set for Z-stack scans once the first spectrum fixes the channels
+        self.volume = None
+        # Set by survey scans (devices.survey_scan.SurveyReport)
+        self.survey_report = None
+        # Set by masked scans: nodes acquired (bool grid) and a MaskReport
+        self.mask_grid = None
+        self.mask_report = None
+        # Set by sparse scans: the nodes drawn for acquisition (bool grid)
+        self.sparse_nodes = None
 
     def stop(self):
         logger.info("ScanWorker stop requested")
@@ -34,81 +51,300 @@ class ScanWorker(QThread):
 
     def run(self):
         try:
-            x_start = self.roi_rect.left()
-            x_end = self.roi_rect.right()
-            y_start = self.roi_rect.top()
-            y_end = self.roi_rect.bottom()
+            grid = self.scan_grid()
+            z_points = self.z_points()
+
+            # Masked scans visit only the nodes inside the mask.
+            scan_mask = self.scan_params.get("mask")
+            mask = None if scan_mask is None else scan_mask.grid(grid.xs, grid.ys)
+            self.mask_grid = mask
 
-            step_x = max(0.1, float(self.scan_params["step_size_x"]))
-            step_y = max(0.1, float(self.scan_params["step_size_y"]))
+            # Sparse scans visit a fraction of those; the rest is
+            # reconstructed afterwards.
+            nodes = mask
+            if self.scan_params.get("sparse"):
+                from devices.sparse_scan import sample_nodes
 
-            x_points = np.arange(x_start, x_end, step_x)
-            y_points = np.arange(y_start, y_end, step_y)
+                nodes = sample_nodes(
+                    grid.shape,
+                    float(self.scan_params["sparse_fraction"]),
+                    self.scan_params["sparse_pattern"],
+                    within=mask,
+                )
+                self.sparse_nodes = nodes
 
-            total_points = len(x_points) * len(y_points)
+            planes = max(1, len(z_points))
+            grid_points = len(grid) * planes
+            total_points = grid_points if nodes is None else int(nodes.sum()) * planes
             if total_points == 0:
                 logger.warning("No scan points generated")
                 self.finished.emit([])
                 return
 
-            results: list[ScanPoint] = []
             start_time = time.time()
+            if self.scan_params.get("survey"):
+                results = self._run_survey(grid, mask)
+                self._report_mask(scan_mask, grid_points, len(results), start_time)
+                self.finished.emit(results)
+                return
+
+            results: list[ScanPoint] = []
             processed = 0
 
-            for y in y_points:
+            # A Z-stack keeps only the slice being acquired in memory; each
+            # finished slice goes to the volume's chunk store.
+            for zi, z in enumerate(z_points or [None]):
                 if self._is_stopped:
                     break
+                if z is not None:
+                    self._finish_slice()
+                    results = []
+                    buffer = None
+                    self.motor_controller.move_z(z)
+                    self.slice_started.emit(zi, z)
 
-                for x in x_points:
+                for yi, xi, x, y in grid:
                     if self._is_stopped:
                         break
 
-                    self.motor_controller.move_to(x, y)
-                    raman_shifts, intensities = self.spectrometer.acquire_spectrum()
+                    if nodes is None or nodes[yi, xi]:
+                        self.motor_controller.move_to(x, y)
+                        raman_shifts, intensities, acquisition = self._acquire()
 
-                    point = ScanPoint(
-                        x=float(x),
-                        y=float(y),
-                        raman_shifts=raman_shifts,
-                        intensities=intensities,
-                    )
+                        if z is not None:
+                            if buffer is None:
+                                buffer = self._slice_buffer(
+                                    zi, grid, z_points, raman_shifts
+                                )
+                            buffer[yi, xi] = intensities
+                            intensities = buffer[yi, xi]
 
-                    results.append(point)
-                    self.point_acquired.emit(point)
+                        point = ScanPoint(
+                            x=float(x),
+                            y=float(y),
+                            raman_shifts=raman_shifts,
+                            intensities=intensities,
+                            z=None if z is None else float(z),
+                            **acquisition,
+                        )
 
-                    processed += 1
-                    elapsed = time.time() - start_time
-                    remaining = total_points - processed
-                    eta_sec = (elapsed / processed) * remaining if processed else 0
+                        results.append(point)
+                        self.point_acquired.emit(point)
 
-                    hours, rem = divmod(int(eta_sec), 3600)
-                    minutes, seconds = divmod(rem, 60)
+                        processed += 1
 
-                    self.eta_updated.emit(f"{hours:02}:{minutes:02}:{seconds:02}")
-                    self.progress_updated.emit(int(processed / total_points * 100))
+                    if xi == grid.nx - 1:
+                        self._report_progress(processed, total_points, start_time)
 
+            self._finish_slice()
+            self._report_mask(scan_mask, grid_points, processed, start_time)
             logger.info(
-                "Scan %s. Collected %d points",
+                "Scan {}. Collected {} points",
                 "stopped early" if self._is_stopped else "completed",
-                len(results),
+                processed,
             )
+            # For a Z-stack these are the points of the last slice.
             self.finished.emit(results)
 
         except Exception:
             logger.exception("Unhandled exception in ScanWorker")
             self.finished.emit([])
 
-    def generate_planned_points(self):
-        x_start = self.roi_rect.left()
-        x_end = self.roi_rect.right()
-        y_start = self.roi_rect.top()
-        y_end = self.roi_rect.bottom()
+    def _acquire(self):
+        """Spectrum at the current position and its ``ScanPoint`` acquisition
+        fields: one exposure, or accumulated to a target SNR in the scan's
+        Raman band (adaptive dwell, in counts per second)."""
+        if not self.scan_params.get("adaptive_dwell"):
+            raman_shifts, intensities = self.spectrometer.acquire_spectrum()
+            integration_ms = getattr(self.spectrometer, "integration_time_ms", None)
+            return raman_shifts, intensities, {"integration_time_ms": integration_ms}
+
+        from devices.adaptive_dwell import acquire_to_snr
+
+        params = self.scan_params
+        result = acquire_to_snr(
+            self.spectrometer,
+            params["raman_min"],
+            params["raman_max"],
+            float(params["dwell_target_snr"]),
+            float(params["dwell_exposure_ms"]),
+            float(params["dwell_max_ms"]),
+        )
+        return (
+            result.raman_shifts,
+            result.intensities,
+            {
+                "integration_time_ms": result.exposure_ms,
+                "dwell_ms": result.dwell_ms,
+                "accumulations": result.accumulations,
+            },
+        )
+
+    def _report_mask(self, scan_mask, grid_points, processed, start_time):
+        if scan_mask is None:
+            return
+        from devices.scan_mask import MaskReport
+
+        planes = grid_points // self.mask_grid.size
+        self.mask_report = MaskReport(
+            source=scan_mask.source,
+            grid_points=grid_points,
+            mask_points=int(self.mask_grid.sum()) * planes,
+            points=processed,
+            elapsed_s=time.time() - start_time,
+        )
+        logger.info(
+            "Masked scan: {} of {} nodes, about {} s saved",
+            processed,
+            grid_points,
+            f"{self.mask_report.saved_s:.1f}",
+        )
+
+    def _run_survey(self, grid: ScanGrid, mask=None) -> list[ScanPoint]:
+        """Survey every point at a short integration time, then measure the
+        points with signal again at the spectrometer's own integration time.
+
+        Returns one point per grid cell, the detail spectrum where there is
+        one; ``survey_report`` gets the timing. Spectra are stored as
+        ``counts_per_second`` of the spectrometer's ``dark_level``, if any.
+        """
+        from devices.survey_scan import (
+            SurveyReport,
+            band_metric,
+            counts_per_second,
+            select_points,
+        )
+
+        params = self.scan_params
+        detail_ms = self.spectrometer.integration_time_ms
+        survey_ms = min(float(params["survey_integration_ms"]), detail_ms)
+        metric = params["survey_metric"]
+        dark_level = getattr(self.spectrometer, "dark_level", 0.0)
+
+        acquired: dict[tuple[int, int], ScanPoint] = {}
+        values = np.full(grid.shape, np.nan)
+        surveyed = values.size if mask is None else int(mask.sum())
+        # The detail pass is at most as long as the survey until it is planned.
+        total = 2 * surveyed
+        start_time = time.time()
+
+        def acquire(xi, yi, integration_ms):
+            x, y = grid.x(xi), grid.y(yi)
+            self.motor_controller.move_to(x, y)
+            raman_shifts, intensities = self.spectrometer.acquire_spectrum()
+            point = ScanPoint(
+                x=float(x),
+                y=float(y),
+                raman_shifts=raman_shifts,
+                intensities=counts_per_second(intensities, integration_ms, dark_level),
+                integration_time_ms=integration_ms,
+            )
+            acquired[yi, xi] = point
+            self.point_acquired.emit(point)
+            self._report_progress(len(acquired) + detail_done, total, start_time)
+            return point
+
+        detail_done = 0
+        selected = []
+        try:
+            self.spectrometer.integration_time_ms = survey_ms
+            for yi, xi, _, _ in grid:
+                if self._is_stopped:
+                    break
+                if mask is not None and not mask[yi, xi]:
+                    continue
+                point = acquire(xi, yi, survey_ms)
+                values[yi, xi] = band_metric(
+                    point.raman_shifts,
+                    point.intensities,
+                    params["raman_min"],
+                    params["raman_max"],
+                    metric,
+                )
+            survey_s = time.time() - start_time
+
+            if not self._is_stopped:
+                selection = select_points(
+                    values,
+                    metric,
+                    float(params["survey_threshold"]),
+                    int(params["survey_dilation"]),
+                )
+                if mask is not None:
+                    selection &= mask
+                selected = list(zip(*np.nonzero(selection)))
+                total = surveyed + len(selected)
+                logger.info(
+                    "Survey of {} points: {} above threshold",
+                    surveyed,
+                    len(selected),
+                )
+
+            self.spectrometer.integration_time_ms = detail_ms
+            detail_start = time.time()
+            for yi, xi in selected:
+                if self._is_stopped:
+                    break
+                detail_done += 1
+                acquire(xi, yi, detail_ms)
+            detail_s = time.time() - detail_start
+        finally:
+            self.spectrometer.integration_time_ms = detail_ms
+
+        self.survey_report = SurveyReport(
+            points=surveyed,
+            detail_points=detail_done,
+            survey_integration_ms=survey_ms,
+            detail_integration_ms=detail_ms,
+            survey_s=survey_s,
+            detail_s=detail_s,
+        )
+        logger.info(
+            "Survey scan {}: {} s, about {} s less than a uniform scan",
+            "stopped early" if self._is_stopped else "completed",
+            f"{self.survey_report.elapsed_s:.1f}",
+            f"{self.survey_report.saved_s:.1f}",
+        )
+        return [acquired[key] for key in sorted(acquired)]
+
+    def _report_progress(self, processed, total_points, start_time):
+        elapsed = time.time() - start_time
+        remaining = total_points - processed
+        eta_sec = (elapsed / processed) * remaining if processed else 0
+
+        hours, rem = divmod(int(eta_sec), 3600)
+        minutes, seconds = divmod(rem, 60)
+
+        self.eta_updated.emit(f"{hours:02}:{minutes:02}:{seconds:02}")
+        self.progress_updated.emit(int(processed / total_points * 100))
+
+    def z_points(self) -> list[float]:
+        """Focus positions of a Z-stack scan, or [] for a single plane."""
+        if not self.scan_params.get("z_stack"):
+            return []
+
+        z_start = float(self.scan_params["z_start"])
+        z_stop = float(self.scan_params["z_stop"])
+        step_z = max(0.1, float(self.scan_params["step_size_z"]))
+        count = int(np.floor(abs(z_stop - z_start) / step_z + 1e-9)) + 1
+        direction = 1.0 if z_stop >= z_start else -1.0
+        return [z_start + direction * step_z * i for i in range(count)]
+
+    def _slice_buffer(self, k, grid, z_points, raman_shifts):
+        if self.volume is None:
+            from controllers.scan_volume import ScanVolume
+
+            self.volume = ScanVolume.create(grid.xs, grid.ys, z_points, raman_shifts)
+        return self.volume.begin_slice(k)
 
-        step_x = max(0.1, float(self.scan_params["step_size_x"]))
-        step_y = max(0.1, float(self.scan_params["step_size_y"]))
+    def _finish_slice(self):
+        if self.volume is not None:
+            self.volume.finish_slice()
 
-        return [
-            ScanPoint(x, y, None, None)
-            for y in np.arange(y_start, y_end, step_y)
-            for x in np.arange(x_start, x_end, step_x)
-        ]
+    def scan_grid(self) -> ScanGrid:
+        """Nodes of the raster over the ROI."""
+        return ScanGrid.from_rect(
+            self.roi_rect,
+            self.scan_params["step_size_x"],
+            self.scan_params["step_size_y"],
+        )
@@ -0,0 +1,191 @@
+"""Sparse scanning: acquire a fraction of the grid, reconstruct the rest.
+
+The acquired nodes are drawn at random or on a jittered grid (one node at a
+random place in each cell of a lattice with the target density, a cheap
+blue-noise pattern without the clusters and holes of uniform sampling).
+
+Band maps are reconstructed by inpainting the missing nodes, several maps at
+once: ``biharmonic`` fills them with the smoothest surface through the
+acquired values (conjugate gradients on the squared Laplacian), ``tv``
+refines that by total-variation flow, which keeps edges between phases
+sharp. ``low_rank`` completes the spectral cube instead: the acquired spectra
+are reduced to their leading principal components, the component score maps
+are inpainted, and any band map or spectrum is then read from the product.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+RANDOM = "random"
+BLUE_NOISE = "blue_noise"
+PATTERNS = (BLUE_NOISE, RANDOM)
+
+BIHARMONIC = "biharmonic"
+TV = "tv"
+LOW_RANK = "low_rank"
+METHODS = (BIHARMONIC, TV, LOW_RANK)
+
+_CG_TOLERANCE = 1e-6
+_CG_MAX_ITERATIONS = 2000
+# Total-variation flow on maps scaled to [0, 1]: smoothing of |grad u| and
+# iterations; the step is the explicit scheme's stability limit.
+_TV_EPSILON = 0.05
+_TV_ITERATIONS = 200
+
+
+def sample_nodes(
+    shape: tuple[int, int],
+    fraction: float,
+    pattern: str = BLUE_NOISE,
+    rng: np.random.Generator | None = None,
+    within: np.ndarray | None = None,
+) -> np.ndarray:
+    """Boolean grid of ``shape`` with ``fraction`` of the candidate nodes
+    (all of them, or those set in ``within``) selected; at least one."""
+    if pattern not in PATTERNS:
+        raise ValueError(f"Unknown sampling pattern: {pattern!r}")
+    rng = rng or np.random.default_rng()
+    candidates = np.ones(shape, dtype=bool) if within is None else within
+    count = max(1, int(round(fraction * candidates.sum())))
+
+    nodes = np.zeros(shape, dtype=bool)
+    if pattern == BLUE_NOISE:
+        spacing = 1.0 / np.sqrt(max(fraction, 1e-6))
+        cell_y, cell_x = np.meshgrid(
+            np.arange(0, shape[0], spacing),
+            np.arange(0, shape[1], spacing),
+            indexing="ij",
+        )
+        rows = np.floor(cell_y + rng.random(cell_y.shape) * spacing).astype(int)
+        cols = np.floor(cell_x + rng.random(cell_x.shape) * spacing).astype(int)
+        inside = (rows < shape[0]) & (cols < shape[1])
+        nodes[rows[inside], cols[inside]] = True
+        nodes &= candidates
+
+    # Random sampling, and topping up or thinning the jittered grid (cells
+    # cut by the grid edge or the mask) to the exact count.
+    chosen = np.flatnonzero(nodes)
+    if len(chosen) > count:
+        nodes.flat[rng.choice(chosen, len(chosen) - count, replace=False)] = False
+    elif len(chosen) < count:
+        free = np.flatnonzero(candidates & ~nodes)
+        count = min(count - len(chosen), len(free))
+        nodes.flat[rng.choice(free, count, replace=False)] = True
+    return nodes
+
+
+def _laplacian(u: np.ndarray) -> np.ndarray:
+    # Five-point Laplacian of (ny, nx, k) maps, reflecting at the edges; as a
+    # matrix it is symmetric, so its square is the biharmonic energy's.
+    p = np.pad(u, ((1, 1), (1, 1), (0, 0)), mode="edge")
+    return p[:-2, 1:-1] + p[2:, 1:-1] + p[1:-1, :-2] + p[1:-1, 2:] - 4 * u
+
+
+def _biharmonic(u: np.ndarray, free: np.ndarray) -> np.ndarray:
+    """Minimise the squared Laplacian of ``u`` over the ``free`` nodes,
+    keeping the others, by conjugate gradients for all maps at once."""
+    free = free[..., None]
+
+    def operator(v):
+        return _laplacian(_laplacian(v)) * free
+
+    residual = -operator(u)
+    direction = residual.copy()
+    rs = np.einsum("ijk,ijk->k", residual, residual)
+    stop = _CG_TOLERANCE**2 * np.maximum(rs, 1e-300)
+    for _ in range(_CG_MAX_ITERATIONS):
+        if np.all(rs <= stop):
+            break
+        product = operator(direction)
+        curvature = np.einsum("ijk,ijk->k", direction, product)
+        alpha = np.divide(rs, curvature, out=np.zeros_like(rs), where=curvature > 0)
+        u = u + alpha * direction
+        residual -= alpha * product
+        rs_next = np.einsum("ijk,ijk->k", residual, residual)
+        beta = np.divide(rs_next, rs, out=np.zeros_like(rs), where=rs > 0)
+        direction = residual + beta * direction
+        rs = rs_next
+    return u
+
+
+def _total_variation(u: np.ndarray, free: np.ndarray) -> np.ndarray:
+    free = free[..., None]
+    tau = _TV_EPSILON / 4
+    for _ in range(_TV_ITERATIONS):
+        gx = np.diff(u, axis=1, append=u[:, -1:])
+        gy = np.diff(u, axis=0, append=u[-1:])
+        norm = np.sqrt(gx**2 + gy**2 + _TV_EPSILON**2)
+        gx /= norm
+        gy /= norm
+        div = gx - np.pad(gx[:, :-1], ((0, 0), (1, 0), (0, 0)))
+        div += gy - np.pad(gy[:-1], ((1, 0), (0, 0), (0, 0)))
+        u += tau * div * free
+    return u
+
+
+def inpaint(maps: np.ndarray, known: np.ndarray, method: str = BIHARMONIC):
+    """Fill the nodes of ``maps`` (``(ny, nx)`` or ``(ny, nx, k)``) not set
+    in ``known``; known nodes keep their values."""
+    if method not in (BIHARMONIC, TV):
+        raise ValueError(f"Unknown inpainting method: {method!r}")
+    single = maps.ndim == 2
+    u = np.array(maps[..., None] if single else maps, dtype=np.float64)
+    if not known.any():
+        return u[..., 0] if single else u
+
+    # Scaled to [0, 1] per map, so tolerances and the TV step are absolute.
+    lo = u[known].min(axis=0)
+    span = np.maximum(u[known].max(axis=0) - lo, 1e-12)
+    u = (u - lo) / span
+    u[~known] = u[known].mean(axis=0)
+
+    u = _biharmonic(u, ~known)
+    if method == TV:
+        u = _total_variation(u, ~known)
+    u = u * span + lo
+    return u[..., 0] if single else u
+
+
+@dataclass
+class LowRankCube:
+    """Spectral cube ``mean + scores @ components`` on the scan grid."""
+
+    raman_shifts: np.ndarray
+    mean: np.ndarray
+    # (rank, channels) principal spectra and (ny, nx, rank) score maps
+    components: np.ndarray
+    scores: np.ndarray
+
+    def band_map(self, raman_min: float, raman_max: float) -> np.ndarray:
+        band = (self.raman_shifts >= raman_min) & (self.raman_shifts <= raman_max)
+        return self.scores @ self.components[:, band].sum(axis=1) + float(
+            self.mean[band].sum()
+        )
+
+    def spectrum(self, row: int, col: int) -> np.ndarray:
+        return self.mean + self.scores[row, col] @ self.components
+
+
+def complete_cube(
+    raman_shifts: np.ndarray,
+    spectra: np.ndarray,
+    known: np.ndarray,
+    rank: int,
+    method: str = BIHARMONIC,
+) -> LowRankCube:
+    """Low-rank cube from the spectra of the ``known`` nodes, given in
+    row-major node order, with the score maps inpainted by ``method``."""
+    spectra = np.asarray(spectra, dtype=np.float64)
+    mean = spectra.mean(axis=0)
+    _, _, vt = np.linalg.svd(spectra - mean, full_matrices=False)
+    components = vt[: max(1, min(rank, len(vt)))]
+
+    scores = np.zeros(known.shape + (len(components),))
+    scores[known] = (spectra - mean) @ components.T
+    return LowRankCube(
+        raman_shifts=np.asarray(raman_shifts, dtype=float),
+        mean=mean,
+        components=components,
+        scores=inpaint(scores, known, method),
+    )
@@ -0,0 +1,198 @@
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+from config import (
+    CAMERA_IMAGE_HEIGHT,
+    CAMERA_IMAGE_WIDTH,
+    SPECTRUM_NOISE_FLOOR,
+    VIRTUAL_SAMPLE_COMPONENTS,
+    VIRTUAL_SAMPLE_NUM_DOMAINS,
+    VIRTUAL_SAMPLE_PIXEL_SIZE_UM,
+    VIRTUAL_SAMPLE_SEED,
+)
+
+DEFAULT_SAMPLE_IMAGE = Path(__file__).resolve().parents[1] / "camera" / "cow.jpg"
+_DOMAIN_ROWS_PER_CHUNK = 64
+
+
+class VirtualSample:
+    """Phase map of a sample with one basis spectrum per component.
+
+    ``phase_map`` holds per-pixel component abundances with shape (H, W, K).
+    Stage coordinates map to pixels with ``pixel_size_um`` and a lower-left
+    origin, matching the camera ROI and heatmap conventions.
+    """
+
+    def __init__(
+        self,
+        raman_shifts: np.ndarray,
+        phase_map: np.ndarray,
+        components=VIRTUAL_SAMPLE_COMPONENTS,
+        pixel_size_um: float = VIRTUAL_SAMPLE_PIXEL_SIZE_UM,
+        origin_um: tuple[float, float] = (0.0, 0.0),
+    ):
+        if phase_map.ndim != 3 or phase_map.shape[2] != len(components):
+            raise ValueError(
+                f"Phase map shape {phase_map.shape} does not match "
+                f"{len(components)} components"
+            )
+
+        self.raman_shifts = np.asarray(raman_shifts, dtype=float)
+        self.phase_map = np.ascontiguousarray(phase_map, dtype=np.float32)
+        self.pixel_size_um = float(pixel_size_um)
+        self.origin_um = (float(origin_um[0]), float(origin_um[1]))
+        self.basis = self._build_basis(self.raman_shifts, components)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.phase_map.shape[:2]
+
+    @property
+    def num_components(self) -> int:
+        return self.phase_map.shape[2]
+
+    @staticmethod
+    def _build_basis(raman_shifts: np.ndarray, components) -> np.ndarray:
+        peaks = np.array(
+            [peak for comp in components for peak in comp], dtype=float
+        ).reshape(-1, 3)
+        owner = np.repeat(
+            np.arange(len(components)), [len(comp) for comp in components]
+        )
+
+        centers, amplitudes, widths = peaks[:, 0:1], peaks[:, 1:2], peaks[:, 2:3]
+        profiles = amplitudes * np.exp(
+            -((raman_shifts[None, :] - centers) ** 2) / (2 * widths**2)
+        )
+
+        basis = np.zeros((len(components), len(raman_shifts)))
+        np.add.at(basis, owner, profiles)
+        return basis.astype(np.float32)
+
+    def pixel_indices(self, xs, ys) -> tuple[np.ndarray, np.ndarray]:
+        height, width = self.shape
+        cols = np.floor((np.asarray(xs) - self.origin_um[0]) / self.pixel_size_um)
+        rows = (height - 1) - np.floor(
+            (np.asarray(ys) - self.origin_um[1]) / self.pixel_size_um
+        )
+        cols = np.clip(cols, 0, width - 1).astype(np.intp)
+        rows = np.clip(rows, 0, height - 1).astype(np.intp)
+        return rows, cols
+
+    def abundances_at(self, xs, ys) -> np.ndarray:
+        rows, cols = self.pixel_indices(xs, ys)
+        return self.phase_map[rows, cols]
+
+    def spectra_at(self, xs, ys) -> np.ndarray:
+        return self.abundances_at(xs, ys) @ self.basis
+
+    def spectrum_at(self, x: float, y: float) -> np.ndarray:
+        height, width = self.shape
+        col = int((x - self.origin_um[0]) // self.pixel_size_um)
+        row = height - 1 - int((y - self.origin_um[1]) // self.pixel_size_um)
+        row = min(max(row, 0), height - 1)
+        col = min(max(col, 0), width - 1)
+        return self.phase_map[row, col] @ self.basis
+
+    def add_noise(
+        self, spectra: np.ndarray, rng: np.random.Generator, gain: float = 1.0
+    ) -> np.ndarray:
+        noisy = spectra * np.float32(gain)
+        noisy += np.float32(SPECTRUM_NOISE_FLOOR)
+        sigma = np.abs(noisy)
+        sigma *= np.float32(1e-3)
+        sigma += np.float32(0.03**2)
+        np.sqrt(sigma, out=sigma)
+        sigma *= rng.standard_normal(spectra.shape, dtype=np.float32)
+        noisy += sigma
+        return np.maximum(noisy, 0, out=noisy)
+
+    @classmethod
+    def from_image(
+        cls,
+        raman_shifts: np.ndarray,
+        image_path: str | Path,
+        components=VIRTUAL_SAMPLE_COMPONENTS,
+        **kwargs,
+    ) -> "VirtualSample":
+        from PyQt6.QtGui import QImage
+
+        image = QImage(str(image_path))
+        if image.isNull():
+            raise RuntimeError(f"Failed to load sample image: {image_path}")
+
+        image = image.convertToFormat(QImage.Format.Format_Grayscale8)
+        ptr = image.constBits()
+        ptr.setsize(image.height() * image.bytesPerLine())
+        grey = np.frombuffer(ptr, dtype=np.uint8).reshape(
+            image.height(), image.bytesPerLine()
+        )[:, : image.width()]
+
+        return cls(
+            raman_shifts,
+            cls.phase_map_from_grey(grey, len(components)),
+            components,
+            **kwargs,
+        )
+
+    @staticmethod
+    def phase_map_from_grey(grey: np.ndarray, num_components: int) -> np.ndarray:
+        levels = grey.astype(np.float32) / 255.0
+        centers = np.linspace(0.0, 1.0, num_components, dtype=np.float32)
+        sigma = np.float32(0.5 / max(num_components - 1, 1))
+
+        weights = np.exp(-((levels[..., None] - centers) ** 2) / (2 * sigma**2))
+        weights /= weights.sum(axis=2, keepdims=True)
+        return weights
+
+    @classmethod
+    def procedural(
+        cls,
+        raman_shifts: np.ndarray,
+        shape: tuple[int, int] = (CAMERA_IMAGE_HEIGHT, CAMERA_IMAGE_WIDTH),
+        num_domains: int = VIRTUAL_SAMPLE_NUM_DOMAINS,
+        components=VIRTUAL_SAMPLE_COMPONENTS,
+        seed: int = VIRTUAL_SAMPLE_SEED,
+        **kwargs,
+    ) -> "VirtualSample":
+        rng = np.random.default_rng(seed)
+        height, width = shape
+
+        seeds = rng.uniform((0, 0), (height, width), size=(num_domains, 2))
+        seeds = seeds.astype(np.float32)
+        seed_component = rng.integers(0, len(components), size=num_domains)
+
+        cols = np.arange(width, dtype=np.float32)
+        labels = np.empty(shape, dtype=np.intp)
+        for r0 in range(0, height, _DOMAIN_ROWS_PER_CHUNK):
+            rows = np.arange(r0, min(r0 + _DOMAIN_ROWS_PER_CHUNK, height))
+            dist = (rows[:, None, None] - seeds[:, 0]) ** 2 + (
+                cols[None, :, None] - seeds[:, 1]
+            ) ** 2
+            labels[rows] = np.argmin(dist, axis=2)
+
+        yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+        thickness = np.full(shape, 0.6, dtype=np.float32)
+        for fy, fx, phase in rng.uniform((0, 0, 0), (6, 6, 2 * np.pi), size=(3, 3)):
+            thickness += 0.15 * np.sin(
+                2 * np.pi * (fy * yy / height + fx * xx / width) + phase
+            )
+
+        domain_component = seed_component[labels]
+        phase_map = (domain_component[..., None] == np.arange(len(components))) * (
+            np.clip(thickness, 0.1, None)[..., None]
+        )
+
+        return cls(raman_shifts, phase_map, components, **kwargs)
+
+    @classmethod
+    def default(cls, raman_shifts: np.ndarray, image_path=None) -> "VirtualSample":
+        path = Path(image_path) if image_path is not None else DEFAULT_SAMPLE_IMAGE
+        if path.exists():
+            logger.info(f"Virtual sample phase map from image: {path}")
+            return cls.from_image(raman_shifts, path)
+
+        logger.warning(f"Sample image not found ({path}), using procedural domains")
+        return cls.procedural(raman_shifts)
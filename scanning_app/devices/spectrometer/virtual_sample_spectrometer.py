@@ -0,0 +1,115 @@
+import time
+
+import numpy as np
+from loguru import logger
+
+from config import (
+    SPECTRUM_AVERAGES_AMOUNT,
+    SPECTRUM_INTEGRATION_TIME_MS,
+    SPECTRUM_NOISE_FLOOR,
+    SPECTRUM_NUM_POINTS,
+    SPECTRUM_PUMP_WAVELENGTH,
+    SPECTRUM_WAVELENGTH_END,
+    SPECTRUM_WAVELENGTH_START,
+    VIRTUAL_SAMPLE_ACQUISITION_DELAY_SEC,
+    VIRTUAL_SAMPLE_DEPTH_UM,
+    VIRTUAL_SAMPLE_FOCUS_Z_UM,
+    VIRTUAL_SAMPLE_IMAGE_PATH,
+    VIRTUAL_SAMPLE_SATURATION_LEVEL,
+)
+from .base_spectrometer import BaseSpectrometer
+from .virtual_sample import VirtualSample
+
+
+class VirtualSampleSpectrometer(BaseSpectrometer):
+    def __init__(
+        self,
+        sample: VirtualSample | None = None,
+        acquisition_delay_s: float = VIRTUAL_SAMPLE_ACQUISITION_DELAY_SEC,
+        seed: int | None = None,
+    ):
+        self._connected = False
+        self.integration_time_ms = SPECTRUM_INTEGRATION_TIME_MS
+        self.averages = SPECTRUM_AVERAGES_AMOUNT
+        self.excitation_wavelength_nm = SPECTRUM_PUMP_WAVELENGTH
+        self.wavelengths = np.linspace(
+            SPECTRUM_WAVELENGTH_START,
+            SPECTRUM_WAVELENGTH_END,
+            SPECTRUM_NUM_POINTS,
+        )
+
+        if sample is None:
+            sample = VirtualSample.default(self.wavelengths, VIRTUAL_SAMPLE_IMAGE_PATH)
+        self.sample = sample
+        self.wavelengths = sample.raman_shifts
+
+        self.acquisition_delay_s = acquisition_delay_s
+        self._rng = np.random.default_rng(seed)
+        self._stage = None
+        self.saturation_level = VIRTUAL_SAMPLE_SATURATION_LEVEL
+        # Readout offset of every channel, whatever the integration time
+        self.dark_level = SPECTRUM_NOISE_FLOOR
+
+        logger.info(
+            "Virtual sample spectrometer initialized "
+            f"({sample.shape[1]}x{sample.shape[0]} px, "
+            f"{sample.num_components} components)"
+        )
+
+    def attach_stage(self, motor_controller) -> None:
+        self._stage = motor_controller
+
+    @property
+    def stage_position(self) -> tuple[float, float]:
+        if self._stage is None:
+            return 0.0, 0.0
+        return self._stage.position[:2]
+
+    def connect(self) -> None:
+        self._connected = True
+        logger.info("Virtual sample spectrometer connected")
+
+    def disconnect(self) -> None:
+        self._connected = False
+        logger.info("Virtual sample spectrometer disconnected")
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    def acquire_spectrum(self) -> tuple[np.ndarray, np.ndarray]:
+        if not self._connected:
+            raise RuntimeError("Spectrometer not connected")
+
+        if self.acquisition_delay_s > 0:
+            # The delay is for the default integration time.
+            time.sleep(
+                self.acquisition_delay_s
+                * self.integration_time_ms
+                / SPECTRUM_INTEGRATION_TIME_MS
+            )
+
+        x, y = self.stage_position
+        intensities = self.sample.add_noise(
+            self.sample.spectrum_at(x, y), self._rng, self._signal_gain
+        )
+        np.minimum(intensities, self.saturation_level, out=intensities)
+        return self.wavelengths, intensities
+
+    def acquire_spectra(self, xs, ys) -> tuple[np.ndarray, np.ndarray]:
+        if not self._connected:
+            raise RuntimeError("Spectrometer not connected")
+
+        intensities = self.sample.add_noise(
+            self.sample.spectra_at(xs, ys), self._rng, self._signal_gain
+        )
+        np.minimum(intensities, self.saturation_level, out=intensities)
+        return self.wavelengths, intensities
+
+    @property
+    def _signal_gain(self) -> float:
+        gain = self.integration_time_ms / SPECTRUM_INTEGRATION_TIME_MS
+        if self._stage is not None and self._stage.has_focus_axis():
+            defocus = self._stage.get_z() - VIRTUAL_SAMPLE_FOCUS_Z_UM
+            defocus /= VIRTUAL_SAMPLE_DEPTH_UM
+            gain *= float(np.exp(-0.5 * defocus**2))
+        return gain
@@ -0,0 +1,140 @@
+"""Survey-then-detail scanning.
+
+A survey pass measures every grid point at a short integration time. Each
+survey spectrum is reduced to one number over the Raman band of interest,
+the map of those numbers is thresholded and the selection grown by a few
+grid cells, and only the selected points are measured again at the full
+integration time. Points outside the selection keep their survey spectrum.
+Both are stored as counts per second, less the detector's readout offset, so
+that survey and detail points share one intensity scale.
+"""
+
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+SNR = "snr"
+INTENSITY = "intensity"
+METRICS = (SNR, INTENSITY)
+
+# Scales a median absolute deviation to a Gaussian standard deviation
+_MAD_TO_SIGMA = 1.4826
+
+
+def counts_per_second(
+    intensities: np.ndarray, integration_ms: float, dark_level: float = 0.0
+) -> np.ndarray:
+    """A spectrum exposed for ``integration_ms`` as a rate. ``dark_level``,
+    the readout offset that does not grow with exposure, is taken off first."""
+    return (np.asarray(intensities) - dark_level) * (1000.0 / integration_ms)
+
+
+def band_metric(
+    raman_shifts: np.ndarray,
+    intensities: np.ndarray,
+    raman_min: float,
+    raman_max: float,
+    metric: str = SNR,
+) -> float:
+    """Signal of one spectrum over ``[raman_min, raman_max]``.
+
+    ``intensity`` is the integrated band intensity, as in the heatmap.
+    ``snr`` is the band signal above the spectrum's median baseline, divided
+    by the noise of that sum estimated from point-to-point differences.
+    """
+    band = (raman_shifts >= raman_min) & (raman_shifts <= raman_max)
+    if metric == INTENSITY:
+        return float(intensities[band].sum())
+    if metric != SNR:
+        raise ValueError(f"Unknown survey metric: {metric!r}")
+
+    count = int(band.sum())
+    if count == 0:
+        return 0.0
+    baseline = float(np.median(intensities))
+    # Differences cancel the smooth signal; each carries twice the variance.
+    noise = _MAD_TO_SIGMA * float(np.median(np.abs(np.diff(intensities))))
+    noise /= np.sqrt(2)
+    signal = float(intensities[band].sum()) - baseline * count
+    return signal / max(noise * np.sqrt(count), 1e-12)
+
+
+def dilate(mask: np.ndarray, radius: int) -> np.ndarray:
+    """Grow a 2-D boolean mask by ``radius`` cells in every direction
+    (square neighbourhood)."""
+    grown = mask.copy()
+    height, width = mask.shape
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            src = mask[
+                max(0, -dy) : height - max(0, dy), max(0, -dx) : width - max(0, dx)
+            ]
+            grown[
+                max(0, dy) : height - max(0, -dy), max(0, dx) : width - max(0, -dx)
+            ] |= src
+    return grown
+
+
+def select_points(
+    values: np.ndarray, metric: str, threshold: float, dilation: int = 0
+) -> np.ndarray:
+    """Grid cells worth a detail measurement, from a survey map.
+
+    For ``snr`` the threshold is in SNR units. Band intensities have no
+    absolute scale, so for ``intensity`` it counts robust standard
+    deviations above the map's median. Unmeasured (NaN) cells are never
+    selected themselves, but dilation can reach them.
+    """
+    finite = np.isfinite(values)
+    if not finite.any():
+        return np.zeros(values.shape, dtype=bool)
+
+    if metric == INTENSITY:
+        measured = values[finite]
+        median = float(np.median(measured))
+        spread = _MAD_TO_SIGMA * float(np.median(np.abs(measured - median)))
+        cutoff = median + threshold * spread
+    else:
+        cutoff = threshold
+
+    selected = np.zeros(values.shape, dtype=bool)
+    selected[finite] = values[finite] > cutoff
+    return dilate(selected, dilation) if dilation > 0 else selected
+
+
+@dataclass
+class SurveyReport:
+    points: int
+    detail_points: int
+    survey_integration_ms: float
+    detail_integration_ms: float
+    survey_s: float
+    detail_s: float
+
+    @property
+    def elapsed_s(self) -> float:
+        return self.survey_s + self.detail_s
+
+    @property
+    def uniform_s(self) -> float:
+        """Estimated time of one pass over every point at full integration.
+
+        Uses the measured time per detail point, which includes stage moves;
+        without detail points, the survey time per point plus the extra
+        integration time.
+        """
+        if self.detail_points:
+            return self.detail_s / self.detail_points * self.points
+        extra_ms = self.detail_integration_ms - self.survey_integration_ms
+        return self.survey_s + self.points * extra_ms / 1000.0
+
+    @property
+    def saved_s(self) -> float:
+        return self.uniform_s - self.elapsed_s
+
+    def as_dict(self) -> dict:
+        return {
+            **asdict(self),
+            "uniform_estimate_s": self.uniform_s,
+            "saved_s": self.saved_s,
+        }
@@ -0,0 +1,9 @@
+FORMAT_VERSION = 3
+LEGACY_FORMAT_VERSION = 1
+
+HEATMAP_GRID_NAME = "heatmap_grid.npy"
+# Masked scans: boolean grid of the acquired nodes
+SCAN_MASK_NAME = "scan_mask.npy"
+
+# Z-stack scans: one .npy member per z slice (see controllers.scan_volume)
+VOLUME_DIR = "volume"
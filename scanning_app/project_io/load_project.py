@@ -1,3 +1,4 @@
+import io
 import json
 import zipfile
 from pathlib import Path
@@ -6,6 +7,8 @@ import numpy as np
 import pandas as pd
 
 from controllers.scan_result import ScanResult
+from controllers.scan_volume import ScanVolume
+from project_io.format import HEATMAP_GRID_NAME, LEGACY_FORMAT_VERSION
 
 
 class Raman2DScanReader:
@@ -16,27 +19,12 @@ class Raman2DScanReader:
             info = json.loads(zf.read("info.json"))
             spectra_df = pd.read_csv(zf.open("spectra.csv"))
 
-            heatmap_csv = next(
-                name
-                for name in zf.namelist()
-                if name.startswith("heatmap_") and name.endswith(".csv")
-            )
-
-            heatmap_df = pd.read_csv(zf.open(heatmap_csv))
-
             heatmap_bounds = (
                 info["heatmap"]["left_bound_cm1"],
                 info["heatmap"]["right_bound_cm1"],
             )
 
-            width = heatmap_df["x_index"].max() + 1
-            height = heatmap_df["y_index"].max() + 1
-
-            heatmap_grid = np.full((height, width), np.nan)
-            for _, row in heatmap_df.iterrows():
-                heatmap_grid[int(row.y_index), int(row.x_index)] = (
-                    row.integrated_intensity
-                )
+            heatmap_grid = self._read_heatmap_grid(zf, info)
 
             heatmap_png_name = f"heatmap_{heatmap_bounds[0]}_{heatmap_bounds[1]}.png"
             heatmap_png = (
@@ -54,6 +42,16 @@ class Raman2DScanReader:
                 zf.read("camera_raw.png") if "camera_raw.png" in zf.namelist() else None
             )
 
+            scan_mask = (
+                np.load(io.BytesIO(zf.read(info["scan_mask"])), allow_pickle=False)
+                if "scan_mask" in info
+                else None
+            )
+
+        volume = (
+            ScanVolume.from_archive(path, info["volume"]) if "volume" in info else None
+        )
+
         return ScanResult(
             scan_meta=info["scan"],
             spectrometer_meta=info["spectrometer"],
@@ -63,4 +61,30 @@ class Raman2DScanReader:
             heatmap_png=heatmap_png,
             camera_overview_png=camera_overview_png,
             camera_raw_png=camera_raw_png,
+            volume=volume,
+            scan_mask=scan_mask,
+        )
+
+    @staticmethod
+    def _read_heatmap_grid(zf: zipfile.ZipFile, info: dict) -> np.ndarray:
+        version = info.get("format_version", LEGACY_FORMAT_VERSION)
+        grid_name = info["heatmap"].get("grid", HEATMAP_GRID_NAME)
+
+        if version > LEGACY_FORMAT_VERSION and grid_name in zf.namelist():
+            return np.load(io.BytesIO(zf.read(grid_name)), allow_pickle=False)
+
+        heatmap_csv = next(
+            name
+            for name in zf.namelist()
+            if name.startswith("heatmap_") and name.endswith(".csv")
+        )
+        heatmap_df = pd.read_csv(zf.open(heatmap_csv))
+
+        x_index = heatmap_df["x_index"].to_numpy(int)
+        y_index = heatmap_df["y_index"].to_numpy(int)
+
+        heatmap_grid = np.full((y_index.max() + 1, x_index.max() + 1), np.nan)
+        heatmap_grid[y_index, x_index] = heatmap_df["integrated_intensity"].to_numpy(
+            float
         )
+        return heatmap_grid
@@ -1,5 +1,6 @@
 import io
 import json
+import os
 import zipfile
 from datetime import datetime
 from pathlib import Path
@@ -7,6 +8,13 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 
+from project_io.format import (
+    FORMAT_VERSION,
+    HEATMAP_GRID_NAME,
+    SCAN_MASK_NAME,
+    VOLUME_DIR,
+)
+
 
 class Raman2DScanWriter:
     def write(
@@ -20,6 +28,9 @@ class Raman2DScanWriter:
         heatmap_png: bytes | None = None,
         camera_png: bytes | None = None,
         camera_raw_png: bytes | None = None,
+        write_heatmap_csv: bool = True,
+        volume=None,
+        scan_mask: np.ndarray | None = None,
     ) -> None:
         path = Path(path)
         if path.suffix != ".raman2dscan":
@@ -28,39 +39,62 @@ class Raman2DScanWriter:
         left, right = heatmap_bounds
 
         info = {
+            "format_version": FORMAT_VERSION,
             "created_at": datetime.now().isoformat(timespec="seconds"),
             "scan": scan_meta,
             "spectrometer": spectrometer_meta,
             "heatmap": {
                 "left_bound_cm1": float(left),
                 "right_bound_cm1": float(right),
+                "grid": HEATMAP_GRID_NAME,
             },
         }
 
-        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
-            zf.writestr("info.json", json.dumps(info, indent=2))
-            zf.writestr(
-                "spectra.csv",
-                self._dataframe_to_csv_bytes(spectra_df),
-            )
-
-            heatmap_df = self._heatmap_to_dataframe(heatmap_grid)
-            zf.writestr(
-                f"heatmap_{left}_{right}.csv",
-                self._dataframe_to_csv_bytes(heatmap_df),
-            )
+        # Written next to the target and moved over it once complete, as a
+        # volume opened from the target still reads its slices from there.
+        partial = path.with_name(f".{path.name}.partial")
+        try:
+            with zipfile.ZipFile(partial, "w", zipfile.ZIP_DEFLATED) as zf:
+                if volume is not None:
+                    info["volume"] = volume.write_to_archive(zf, VOLUME_DIR)
+                if scan_mask is not None:
+                    buffer = io.BytesIO()
+                    np.save(
+                        buffer, np.asarray(scan_mask, dtype=bool), allow_pickle=False
+                    )
+                    zf.writestr(SCAN_MASK_NAME, buffer.getvalue())
+                    info["scan_mask"] = SCAN_MASK_NAME
 
-            if heatmap_png is not None:
+                zf.writestr("info.json", json.dumps(info, indent=2))
                 zf.writestr(
-                    f"heatmap_{left}_{right}.png",
-                    heatmap_png,
+                    "spectra.csv",
+                    self._dataframe_to_csv_bytes(spectra_df),
                 )
 
-            if camera_raw_png is not None:
-                zf.writestr("camera_raw.png", camera_raw_png)
+                zf.writestr(HEATMAP_GRID_NAME, self._array_to_npy_bytes(heatmap_grid))
+
+                if write_heatmap_csv:
+                    heatmap_df = self._heatmap_to_dataframe(heatmap_grid)
+                    zf.writestr(
+                        f"heatmap_{left}_{right}.csv",
+                        self._dataframe_to_csv_bytes(heatmap_df),
+                    )
+
+                if heatmap_png is not None:
+                    zf.writestr(
+                        f"heatmap_{left}_{right}.png",
+                        heatmap_png,
+                    )
 
-            if camera_png is not None:
-                zf.writestr("camera_overview.png", camera_png)
+                if camera_raw_png is not None:
+                    zf.writestr("camera_raw.png", camera_raw_png)
+
+                if camera_png is not None:
+                    zf.writestr("camera_overview.png", camera_png)
+            os.replace(partial, path)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
 
     @staticmethod
     def _dataframe_to_csv_bytes(df: pd.DataFrame) -> bytes:
@@ -68,15 +102,20 @@ class Raman2DScanWriter:
         df.to_csv(buffer, index=False)
         return buffer.getvalue().encode("utf-8")
 
+    @staticmethod
+    def _array_to_npy_bytes(array: np.ndarray) -> bytes:
+        buffer = io.BytesIO()
+        np.save(buffer, np.asarray(array, dtype=float), allow_pickle=False)
+        return buffer.getvalue()
+
     @staticmethod
     def _heatmap_to_dataframe(grid: np.ndarray) -> pd.DataFrame:
-        height, width = grid.shape
+        grid = np.asarray(grid, dtype=float)
+        y_index, x_index = np.indices(grid.shape)
         return pd.DataFrame(
             {
-                "x_index": x,
-                "y_index": y,
-                "integrated_intensity": float(grid[y, x]),
+                "x_index": x_index.ravel(),
+                "y_index": y_index.ravel(),
+                "integrated_intensity": grid.ravel(),
             }
-            for y in range(height)
-            for x in range(width)
         )
@@ -1,20 +1,40 @@
+import time
 from typing import Optional
 
 import numpy as np
 import pyqtgraph as pg
-from loguru import logger
 from PyQt6 import QtCore, QtGui, QtWidgets
-from PyQt6.QtCore import QBuffer, QIODevice, QRectF, pyqtSignal
-
+from PyQt6.QtCore import QBuffer, QIODevice, QRectF, QTimer, pyqtSignal
+
+from config import (
+    CAMERA_RAW_DISPLAY,
+    LIVE_VIEW_MAX_FPS,
+    LIVE_VIEW_STATS_INTERVAL_MS,
+    MOSAIC_EXPORT_MAX_SIZE,
+)
 from devices.camera.base_camera import BaseCamera
+from devices.camera.demosaic import develop
+from devices.camera.frame_buffer import Frame, FrameGeometry, FrameRingBuffer
+from devices.camera.stage_mosaic import TilePyramid
+from devices.scan_mask import ScanMask, threshold_image
 
 MIN_ROI_SIZE = 5
+ROI_RECTANGLE = "rectangle"
+ROI_LASSO = "lasso"
+# Screen distance between recorded lasso vertices
+LASSO_SPACING_PX = 8
 DEFAULT_IMAGE_WIDTH = 1280
 DEFAULT_IMAGE_HEIGHT = 1024
+# Mosaic tiles are drawn under the current frame
+MOSAIC_Z_VALUE = -10
+# Delay before redrawing mosaic tiles after the view moves, so a pan or zoom
+# gesture only triggers one update per burst of range changes
+MOSAIC_REFRESH_DELAY_MS = 15
 
 
 class CameraViewWidget(QtWidgets.QWidget):
     roi_changed = pyqtSignal(QRectF)
+    live_stats_changed = pyqtSignal(float, float)
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -23,10 +43,40 @@ class CameraViewWidget(QtWidgets.QWidget):
         self.roi = None
         self.drag_start = None
         self._temp_roi = None
+        self.roi_shape = ROI_RECTANGLE
+        self._lasso_path: list[tuple[float, float]] = []
+        self._lasso_scene_pos = None
+        self._temp_path = None
 
         self.default_width = DEFAULT_IMAGE_WIDTH
         self.default_height = DEFAULT_IMAGE_HEIGHT
 
+        self._stream: FrameRingBuffer | None = None
+        self._frame: Frame | None = None
+        self._image_owner: QtGui.QImage | None = None
+        self._pixels: np.ndarray | None = None
+        self._geometry = FrameGeometry()
+        self._shown_rect = None
+        # How raw (Bayer / high bit depth) frames are converted for display
+        self.raw_display = CAMERA_RAW_DISPLAY
+        self._frames_displayed = 0
+        self._stats_mark = (0.0, 0, 0)
+
+        self._live_timer = QTimer(self)
+        self._live_timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+        self._live_timer.timeout.connect(self._show_latest_frame)
+
+        self._stats_timer = QTimer(self)
+        self._stats_timer.timeout.connect(self._update_live_stats)
+
+        self._mosaic: TilePyramid | None = None
+        # Tile key -> (image item, tile version shown)
+        self._tile_items: dict[tuple, tuple[pg.ImageItem, int]] = {}
+        self._mosaic_timer = QTimer(self)
+        self._mosaic_timer.setSingleShot(True)
+        self._mosaic_timer.setInterval(MOSAIC_REFRESH_DELAY_MS)
+        self._mosaic_timer.timeout.connect(self._update_mosaic_tiles)
+
         self._setup_ui()
         self._setup_crosshair()
         self._show_no_image()
@@ -67,11 +117,21 @@ class CameraViewWidget(QtWidgets.QWidget):
         self.coord_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignRight)
         self.coord_label.setStyleSheet("font-weight: bold; color: #555;")
 
+        self.fps_label = QtWidgets.QLabel("")
+        self.fps_label.setStyleSheet("color: #555;")
+
+        status_row = QtWidgets.QHBoxLayout()
+        status_row.addWidget(self.fps_label)
+        status_row.addWidget(self.coord_label)
+
         layout.addWidget(self.plot)
-        layout.addWidget(self.coord_label)
+        layout.addLayout(status_row)
 
         self.plot.scene().installEventFilter(self)
         self.plot.scene().sigMouseMoved.connect(self._on_mouse_move)
+        self.plot.getViewBox().sigRangeChanged.connect(
+            lambda *_: self._schedule_mosaic_update()
+        )
 
     def _setup_crosshair(self):
         pen = pg.mkPen(
@@ -86,6 +146,9 @@ class CameraViewWidget(QtWidgets.QWidget):
 
     def _show_no_image(self):
         self.image_item.clear()
+        self._shown_rect = None
+        if self._mosaic is not None:
+            return
         self.text_item.show()
         self.border_item.show()
         self.plot.getViewBox().setRange(
@@ -105,6 +168,8 @@ class CameraViewWidget(QtWidgets.QWidget):
                 view_box = self.plot.getViewBox()
                 if view_box.sceneBoundingRect().contains(pos):
                     self.drag_start = view_box.mapSceneToView(pos)
+                    self._lasso_path = [(self.drag_start.x(), self.drag_start.y())]
+                    self._lasso_scene_pos = pos
                     return True
 
         if event.type() == QtCore.QEvent.Type.GraphicsSceneMouseRelease:
@@ -118,6 +183,9 @@ class CameraViewWidget(QtWidgets.QWidget):
                 if self._temp_roi:
                     self.plot.removeItem(self._temp_roi)
                     self._temp_roi = None
+                if self._temp_path:
+                    self.plot.removeItem(self._temp_path)
+                    self._temp_path = None
 
                 return True
 
@@ -137,9 +205,31 @@ class CameraViewWidget(QtWidgets.QWidget):
         self.h_line.setPos(y)
         self.coord_label.setText(f"X: {x:.1f}, Y: {y:.1f}")
 
-        if self.drag_start:
+        if self.drag_start and self.roi_shape == ROI_LASSO:
+            self._update_lasso(pos, mouse_point)
+        elif self.drag_start:
             self._update_temp_roi(mouse_point)
 
+    def set_roi_shape(self, shape: str):
+        """Draw rectangles (``ROI_RECTANGLE``) or freehand polygons
+        (``ROI_LASSO``) with the mouse."""
+        self.roi_shape = shape
+
+    def _update_lasso(self, scene_pos, view_point):
+        delta = scene_pos - self._lasso_scene_pos
+        if (delta.x() ** 2 + delta.y() ** 2) ** 0.5 < LASSO_SPACING_PX:
+            return
+        self._lasso_scene_pos = scene_pos
+        self._lasso_path.append((view_point.x(), view_point.y()))
+
+        xs, ys = zip(*self._lasso_path)
+        if self._temp_path is None:
+            self._temp_path = pg.PlotDataItem(
+                pen=pg.mkPen("y", width=1, style=QtCore.Qt.PenStyle.DashLine)
+            )
+            self.plot.addItem(self._temp_path)
+        self._temp_path.setData(list(xs) + [xs[0]], list(ys) + [ys[0]])
+
     def _update_temp_roi(self, current_point):
         x0 = self.drag_start.x()
         y0 = self.drag_start.y()
@@ -172,6 +262,14 @@ class CameraViewWidget(QtWidgets.QWidget):
             self._temp_roi.setSize([w, h])
 
     def _finalize_roi(self, current_point):
+        if self.roi_shape == ROI_LASSO:
+            self._lasso_path.append((current_point.x(), current_point.y()))
+            xs, ys = zip(*self._lasso_path)
+            w, h = max(xs) - min(xs), max(ys) - min(ys)
+            if len(self._lasso_path) >= 3 and w > MIN_ROI_SIZE and h > MIN_ROI_SIZE:
+                self.add_polygon_roi(self._lasso_path)
+            return
+
         x0 = self.drag_start.x()
         y0 = self.drag_start.y()
         x1 = current_point.x()
@@ -185,33 +283,193 @@ class CameraViewWidget(QtWidgets.QWidget):
         if w > MIN_ROI_SIZE and h > MIN_ROI_SIZE:
             self.add_roi(QRectF(x, y, w, h))
 
-    def set_image(self, qimage: QtGui.QImage):
+    def set_image(self, image, geometry: FrameGeometry | None = None):
+        """Show ``image`` without copying its pixels.
+
+        Accepts a ``Frame`` (the widget takes over its lease), a uint8 NumPy
+        array of shape (H, W), (H, W, 3) RGB or (H, W, 4) RGBX, a ``QImage``
+        or ``None``. The array handed to pyqtgraph is the one kept for PNG
+        export, so each image is held exactly once.
+
+        The image is placed in full-resolution sensor pixels using the
+        frame's ``geometry``, so view, ROI and stage coordinates do not change
+        with binning or a sensor ROI. Raw frames are developed with the
+        ``raw_display`` method; that is the only case where pixels are copied.
+        """
+        frame = image if isinstance(image, Frame) else None
+        owner = None
+        geometry = geometry or FrameGeometry()
+
+        if isinstance(image, QtGui.QImage):
+            owner, pixels = _qimage_pixels(image) if not image.isNull() else (None, None)
+        elif frame is not None and frame.is_raw:
+            pixels, geometry = develop(frame, self.raw_display)
+        elif frame is not None:
+            pixels, geometry = frame.data, frame.geometry
+        else:
+            pixels = image
 
-        self.image_item.clear()
-        if qimage is None or qimage.isNull():
+        previous = self._frame
+        self._frame = frame
+        self._image_owner = owner
+        self._pixels = pixels
+        self._geometry = geometry
+
+        if pixels is None:
+            self.image_item.clear()
             self._show_no_image()
+        else:
+            self._show_pixels(pixels)
+
+        if previous is not None and previous is not frame:
+            previous.release()
+
+    def _show_pixels(self, pixels: np.ndarray):
+        if pixels.ndim == 3 and pixels.shape[2] == 4:
+            _make_opaque(pixels)
+
+        # uint8 data with no levels/LUT is wrapped by pyqtgraph as a QImage
+        # directly (Grayscale8 / RGB888 / RGBA8888).
+        self.image_item.setImage(pixels, autoLevels=False, levels=None)
+
+        rect = QRectF(*self._geometry.sensor_rect(pixels.shape))
+        self.image_item.setRect(rect)
+        if rect != self._shown_rect:
+            self._shown_rect = rect
+            self._hide_no_image()
+            self.plot.getViewBox().setRange(rect, padding=0)
+            self.plot.getViewBox().invertY(True)
+
+    def start_live(self, stream: FrameRingBuffer, max_fps: float = LIVE_VIEW_MAX_FPS):
+        """Show the newest frame of ``stream`` at most ``max_fps`` times a second.
+
+        Frames that arrive between two refreshes are skipped; the displayed
+        frame stays leased so the producer cannot overwrite it while shown.
+        """
+        self.stop_live()
+
+        self._stream = stream
+        self._frames_displayed = 0
+        self._stats_mark = (time.perf_counter(), stream.frames_written, 0)
+
+        self._live_timer.start(max(1, int(round(1000 / max_fps))))
+        self._stats_timer.start(LIVE_VIEW_STATS_INTERVAL_MS)
+
+    def stop_live(self):
+        """Stop refreshing; the last live frame stays on screen, still leased."""
+        self._live_timer.stop()
+        self._stats_timer.stop()
+        self.fps_label.setText("")
+        self._stream = None
+
+    def is_live(self) -> bool:
+        return self._stream is not None
+
+    def _show_latest_frame(self):
+        stream = self._stream
+        if stream is None:
             return
 
-        if qimage.format() != QtGui.QImage.Format.Format_RGB32:
-            qimage = qimage.convertToFormat(QtGui.QImage.Format.Format_RGB32)
+        last_seq = self._frame.seq if self._frame and self._frame.owner is stream else -1
+        frame = stream.lease_latest(last_seq)
+        if frame is None:
+            return
 
-        self._display_qimage = qimage.copy()
+        self.set_image(frame)
+        self._frames_displayed += 1
 
-        width = qimage.width()
-        height = qimage.height()
+    def _update_live_stats(self):
+        stream = self._stream
+        if stream is None:
+            return
+
+        now = time.perf_counter()
+        then, written, displayed = self._stats_mark
+        elapsed = max(now - then, 1e-9)
+
+        delivered_fps = (stream.frames_written - written) / elapsed
+        displayed_fps = (self._frames_displayed - displayed) / elapsed
+        self._stats_mark = (now, stream.frames_written, self._frames_displayed)
+
+        self.fps_label.setText(
+            f"Live: {delivered_fps:.1f} fps delivered, {displayed_fps:.1f} fps shown"
+        )
+        self.live_stats_changed.emit(delivered_fps, displayed_fps)
 
-        ptr = qimage.constBits()
-        ptr.setsize(height * width * 4)
-        arr = np.frombuffer(ptr, dtype=np.uint8).reshape(height, width, 4)
-        rgb_arr = arr[..., :3].copy()
+    def set_mosaic(self, pyramid: TilePyramid | None):
+        """Show ``pyramid`` under the current frame, or remove the mosaic.
 
-        self.image_item.setImage(rgb_arr, autoLevels=False)
+        Only tiles in view are drawn, at the level whose resolution matches
+        the screen, so the cost of a redraw does not depend on mosaic size.
+        """
+        for item, _ in self._tile_items.values():
+            self.plot.removeItem(item)
+        self._tile_items.clear()
 
-        logger.debug("Image set in image_item, size %s", rgb_arr.shape)
+        previous, self._mosaic = self._mosaic, pyramid
+        if previous is not None and previous is not pyramid:
+            previous.close()
+
+        if pyramid is None:
+            if self._pixels is None:
+                self._show_no_image()
+            return
 
         self._hide_no_image()
-        self.plot.getViewBox().setRange(QRectF(0, 0, width, height), padding=0)
-        self.plot.getViewBox().invertY(True)
+        self.refresh_mosaic(fit=True)
+
+    def mosaic(self) -> TilePyramid | None:
+        return self._mosaic
+
+    def refresh_mosaic(self, fit: bool = False):
+        """Redraw tiles that changed; with ``fit``, zoom to the whole mosaic."""
+        if self._mosaic is None:
+            return
+
+        bounds = self._mosaic.bounds()
+        if fit and bounds is not None:
+            view_box = self.plot.getViewBox()
+            view_box.setRange(QRectF(*bounds), padding=0.02)
+            view_box.invertY(True)
+        self._update_mosaic_tiles()
+
+    def _schedule_mosaic_update(self):
+        if self._mosaic is not None:
+            self._mosaic_timer.start()
+
+    def _update_mosaic_tiles(self):
+        pyramid = self._mosaic
+        if pyramid is None:
+            return
+
+        view_box = self.plot.getViewBox()
+        (x0, x1), (y0, y1) = view_box.viewRange()
+        screen_width = max(1.0, view_box.width())
+        level = pyramid.level_for((x1 - x0) / screen_width)
+        wanted = dict(pyramid.visible_tiles(level, x0, y0, x1, y1))
+
+        for key in list(self._tile_items):
+            if key not in wanted:
+                item, _ = self._tile_items.pop(key)
+                self.plot.removeItem(item)
+
+        for key, rect in wanted.items():
+            version = pyramid.version(key)
+            item, shown = self._tile_items.get(key, (None, -1))
+            if shown == version:
+                continue
+
+            tile = pyramid.tile(key)
+            if tile is None:
+                continue
+            if item is None:
+                item = pg.ImageItem(axisOrder="row-major")
+                item.setZValue(MOSAIC_Z_VALUE)
+                self.plot.addItem(item)
+            # Tiles are RGBA; alpha leaves unimaged areas transparent.
+            item.setImage(tile, autoLevels=False, levels=None)
+            item.setRect(QRectF(*rect))
+            self._tile_items[key] = (item, version)
 
     def add_roi(self, rect: QRectF):
         self.clear_roi()
@@ -230,6 +488,72 @@ class CameraViewWidget(QtWidgets.QWidget):
         self.plot.addItem(self.roi)
         self.roi_changed.emit(rect)
 
+    def add_polygon_roi(self, points):
+        """Closed, editable polygon ROI through ``points`` (view coordinates)."""
+        self.clear_roi()
+
+        self.roi = pg.PolyLineROI(
+            [list(p) for p in points],
+            closed=True,
+            pen=pg.mkPen(color="r", width=2),
+        )
+        self.roi.sigRegionChanged.connect(self._on_roi_changed)
+
+        self.plot.addItem(self.roi)
+        self.roi_changed.emit(self._roi_view_rect())
+
+    def _polygon_view_points(self) -> list[tuple[float, float]] | None:
+        if not isinstance(self.roi, pg.PolyLineROI):
+            return None
+        points = []
+        for _, local in self.roi.getLocalHandlePositions():
+            point = self.roi.mapToParent(local)
+            points.append((float(point.x()), float(point.y())))
+        return points
+
+    def _roi_view_rect(self) -> QRectF:
+        """Bounding rectangle of the ROI in view coordinates."""
+        polygon = self._polygon_view_points()
+        if polygon is not None:
+            xs, ys = zip(*polygon)
+            return QRectF(min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+
+        pos = self.roi.pos()
+        size = self.roi.size()
+        return QRectF(float(pos.x()), float(pos.y()), float(size.x()), float(size.y()))
+
+    def get_roi_polygon(self) -> np.ndarray | None:
+        """Vertices of a lasso ROI in stage coordinates (as ``get_roi_rect``),
+        or None for a rectangle."""
+        polygon = self._polygon_view_points()
+        if polygon is None:
+            return None
+        vertices = np.asarray(polygon, dtype=float)
+        vertices[:, 1] = self._sensor_height() - vertices[:, 1]
+        return vertices
+
+    def scan_mask(self, threshold: str | None = None) -> ScanMask | None:
+        """Mask of the nodes to scan: inside a lasso ROI and, with
+        ``threshold`` (``scan_mask.BRIGHT`` / ``DARK``), on objects found by
+        thresholding the shown image or mosaic. None scans the whole ROI."""
+        polygon = self.get_roi_polygon()
+        image = geometry = None
+        if threshold is not None:
+            exported = self._export_image()
+            if exported is None:
+                raise RuntimeError("No camera image to threshold")
+            pixels, geometry = exported
+            image = threshold_image(pixels, threshold)
+
+        if polygon is None and image is None:
+            return None
+        return ScanMask(
+            polygon=polygon,
+            image=image,
+            geometry=geometry,
+            sensor_height=self._sensor_height(),
+        )
+
     def clear_roi(self):
         if self.roi:
             try:
@@ -242,43 +566,84 @@ class CameraViewWidget(QtWidgets.QWidget):
         if self.roi is None:
             return None
 
-        pos = self.roi.pos()
-        size = self.roi.size()
+        rect = self._roi_view_rect()
 
-        x = float(pos.x())
-        y = float(pos.y())
-        w = float(size.x())
-        h = float(size.y())
+        x = rect.x()
+        y = rect.y()
+        w = rect.width()
+        h = rect.height()
 
-        img_h = self.image_item.image.shape[0]
-        y_flipped = img_h - (y + h)
+        y_flipped = self._sensor_height() - (y + h)
 
         return QRectF(x, y_flipped, w, h)
 
+    def _sensor_height(self) -> float:
+        if self._geometry.sensor_height is not None:
+            return float(self._geometry.sensor_height)
+        if self._mosaic is not None and self._mosaic.sensor_height is not None:
+            return float(self._mosaic.sensor_height)
+        if self._shown_rect is not None:
+            return self._shown_rect.bottom()
+        return float(self.image_item.image.shape[0])
+
+    def sensor_roi(self) -> tuple[int, int, int, int] | None:
+        """Current ROI in full-resolution sensor pixels (top-left origin)."""
+        if self.roi is None:
+            return None
+
+        rect = self._roi_view_rect()
+        return (
+            int(round(rect.x())),
+            int(round(rect.y())),
+            int(round(rect.width())),
+            int(round(rect.height())),
+        )
+
+    def _export_image(self) -> tuple[np.ndarray, FrameGeometry] | None:
+        """Pixels to export and their geometry: the mosaic if one is shown
+        (downsampled to ``MOSAIC_EXPORT_MAX_SIZE``), else the current frame."""
+        if self._mosaic is not None:
+            rendered = self._mosaic.render(MOSAIC_EXPORT_MAX_SIZE)
+            if rendered is not None:
+                return rendered
+        if self._pixels is None:
+            return None
+        return self._pixels, self._geometry
+
+    def _roi_image_rect(
+        self, pixels: np.ndarray, geometry: FrameGeometry
+    ) -> QtCore.QRect | None:
+        """Current ROI in pixels of ``pixels``, clipped to it."""
+        roi = self.sensor_roi()
+        if roi is None:
+            return None
+
+        g = geometry
+        x, y, w, h = roi
+        height, width = pixels.shape[:2]
+        rect = QtCore.QRect(
+            int(round((x - g.origin_x) / g.binning)),
+            int(round((y - g.origin_y) / g.binning)),
+            max(1, int(round(w / g.binning))),
+            max(1, int(round(h / g.binning))),
+        )
+        return rect.intersected(QtCore.QRect(0, 0, width, height))
+
     def _on_roi_changed(self):
         if self.roi:
-            self.roi_changed.emit(self.roi.parentBounds())
+            self.roi_changed.emit(self._roi_view_rect())
 
     def export_raw_png(self) -> bytes:
-        if not hasattr(self, "_display_qimage") or self._display_qimage.isNull():
+        exported = self._export_image()
+        if exported is None:
             return b""
 
-        image = self._display_qimage
-
-        if self.roi is not None:
-            roi_rect = self.get_roi_rect()
-            if roi_rect is not None:
-                x = int(round(roi_rect.x()))
-                y = int(round(roi_rect.y()))
-                w = int(round(roi_rect.width()))
-                h = int(round(roi_rect.height()))
+        pixels, geometry = exported
+        image = _array_to_qimage(pixels)
 
-                x = max(0, min(x, image.width() - 1))
-                y = max(0, min(y, image.height() - 1))
-                w = min(w, image.width() - x)
-                h = min(h, image.height() - y)
-
-                image = image.copy(x, y, w, h)
+        roi_rect = self._roi_image_rect(pixels, geometry)
+        if roi_rect is not None and not roi_rect.isEmpty():
+            image = image.copy(roi_rect)
 
         buffer = QBuffer()
         buffer.open(QIODevice.OpenModeFlag.WriteOnly)
@@ -286,20 +651,38 @@ class CameraViewWidget(QtWidgets.QWidget):
         return bytes(buffer.data())
 
     def export_overview_png(self) -> bytes:
-        if not hasattr(self, "_display_qimage") or self._display_qimage.isNull():
+        exported = self._export_image()
+        if exported is None:
             return b""
 
-        image = self._display_qimage.copy()
+        pixels, geometry = exported
+        image = _array_to_qimage(pixels).convertToFormat(
+            QtGui.QImage.Format.Format_RGB32
+        )
         painter = QtGui.QPainter(image)
 
-        if self.roi is not None:
-            roi_rect = self.get_roi_rect()
-            if roi_rect is not None:
-                pen = QtGui.QPen(QtGui.QColor("red"))
-                pen.setWidth(3)
-                painter.setPen(pen)
-                painter.setBrush(QtCore.Qt.BrushStyle.NoBrush)
+        roi_rect = self._roi_image_rect(pixels, geometry)
+        if roi_rect is not None:
+            pen = QtGui.QPen(QtGui.QColor("red"))
+            pen.setWidth(3)
+            painter.setPen(pen)
+            painter.setBrush(QtCore.Qt.BrushStyle.NoBrush)
+            polygon = self._polygon_view_points()
+            if polygon is None:
                 painter.drawRect(roi_rect)
+            else:
+                g = geometry
+                painter.drawPolygon(
+                    QtGui.QPolygonF(
+                        [
+                            QtCore.QPointF(
+                                (x - g.origin_x) / g.binning,
+                                (y - g.origin_y) / g.binning,
+                            )
+                            for x, y in polygon
+                        ]
+                    )
+                )
 
         painter.end()
 
@@ -307,3 +690,72 @@ class CameraViewWidget(QtWidgets.QWidget):
         buffer.open(QIODevice.OpenModeFlag.WriteOnly)
         image.save(buffer, "PNG")
         return bytes(buffer.data())
+
+
+_QIMAGE_FORMATS = {
+    1: QtGui.QImage.Format.Format_Grayscale8,
+    3: QtGui.QImage.Format.Format_RGB888,
+    4: QtGui.QImage.Format.Format_RGBX8888,
+}
+
+
+# uint32 with only the fourth byte set, whatever the host byte order
+_ALPHA_MASK = np.array([0, 0, 0, 255], dtype=np.uint8).view(np.uint32)[0]
+
+
+def _make_opaque(pixels: np.ndarray) -> None:
+    """Set the padding byte of RGBX data to 255 in place.
+
+    pyqtgraph draws 4-channel data with alpha, so the padding must be opaque.
+    A sparse sample skips the pass when the driver already wrote 0xFF.
+    """
+    alpha = pixels[..., 3]
+    if alpha[:: max(1, alpha.shape[0] // 16), :: max(1, alpha.shape[1] // 16)].min() == 255:
+        return
+
+    if pixels.flags.c_contiguous and pixels.ctypes.data % 4 == 0:
+        words = pixels.view(np.uint32)
+        np.bitwise_or(words, _ALPHA_MASK, out=words)
+    else:
+        alpha[...] = 255
+
+
+def _qimage_pixels(image: QtGui.QImage):
+    """Return ``(image, pixels)``: an image in a displayable format and an
+    array view of its memory, valid while that image stays alive."""
+    if image.format() not in (
+        QtGui.QImage.Format.Format_Grayscale8,
+        QtGui.QImage.Format.Format_RGB888,
+        QtGui.QImage.Format.Format_RGBX8888,
+    ):
+        image = image.convertToFormat(QtGui.QImage.Format.Format_RGBX8888)
+
+    channels = image.depth() // 8
+    ptr = image.bits()
+    ptr.setsize(image.sizeInBytes())
+    rows = np.frombuffer(ptr, dtype=np.uint8).reshape(
+        image.height(), image.bytesPerLine()
+    )
+    pixels = rows[:, : image.width() * channels].reshape(
+        image.height(), image.width(), channels
+    )
+    return image, pixels[..., 0] if channels == 1 else pixels
+
+
+def _array_to_qimage(pixels: np.ndarray) -> QtGui.QImage:
+    """Wrap ``pixels`` in a QImage sharing its memory (valid while it lives).
+
+    Pixels that are not contiguous within a row are copied, and the image then
+    owns its memory.
+    """
+    channels = 1 if pixels.ndim == 2 else pixels.shape[2]
+    owned = pixels.strides[-1] != 1 or pixels.strides[1] != channels
+    if owned:
+        pixels = np.ascontiguousarray(pixels)
+
+    height, width = pixels.shape[:2]
+    image = QtGui.QImage(
+        pixels.ctypes.data, width, height, pixels.strides[0], _QIMAGE_FORMATS[channels]
+    )
+    # The contiguous copy is freed on return, so the image must not share it.
+    return image.copy() if owned else image
@@ -1,17 +1,41 @@
 import io
+import math
 
 import numpy as np
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.lines import Line2D
 from matplotlib.patches import Rectangle
 from matplotlib.figure import Figure
-from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtWidgets import QLabel, QVBoxLayout, QWidget
-
-from config import HEATMAP_CMAP, PLOT_DPI, RAMAN_MAX_LIMIT, RAMAN_MIN_LIMIT
+from matplotlib.widgets import LassoSelector, RectangleSelector
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from PyQt6.QtWidgets import QComboBox, QHBoxLayout, QLabel, QVBoxLayout, QWidget
+
+from config import (
+    HEATMAP_CMAP,
+    PLOT_DPI,
+    RAMAN_MAX_LIMIT,
+    RAMAN_MIN_LIMIT,
+    REGION_STATS_REFRESH_MS,
+    SPARSE_LOW_RANK,
+)
+from devices.point_index import GridPointIndex
+from devices.scan_mask import polygon_mask
+
+# Selection modes: a pixel's spectrum, or statistics of a region
+SELECT_POINT = "Point"
+SELECT_RECTANGLE = "Rectangle ROI"
+SELECT_LASSO = "Lasso ROI"
+SELECT_MODES = (SELECT_POINT, SELECT_RECTANGLE, SELECT_LASSO)
 
 
 class HeatmapPreviewWidget(QWidget):
     scan_point_selected = pyqtSignal(object)
+    # Point under the mouse, once per cell entered; None off the map
+    scan_point_hovered = pyqtSignal(object)
+    # devices.region_stats.SpectralStats of the selected region, or None
+    region_selected = pyqtSignal(object)
+    # Z-stack view: slice index, or -1 for the maximum projection
+    volume_view_selected = pyqtSignal(int)
 
     def __init__(self):
         super().__init__()
@@ -25,31 +49,82 @@ class HeatmapPreviewWidget(QWidget):
         self._fallback_label.setStyleSheet("color:#777;font-size:12px;")
         self._fallback_label.hide()
 
+        self._view_combo = QComboBox()
+        self._view_combo.hide()
+        self._view_combo.currentIndexChanged.connect(
+            lambda index: self.volume_view_selected.emit(index - 1)
+        )
+
+        self._select_combo = QComboBox()
+        self._select_combo.addItems(SELECT_MODES)
+        self._select_combo.setToolTip(
+            "Click a pixel for its spectrum, or drag a rectangle or lasso "
+            "for the mean, standard deviation and min/max spectrum"
+        )
+        self._select_combo.currentTextChanged.connect(self._on_select_mode)
+
         self._raman_min = RAMAN_MIN_LIMIT
         self._raman_max = RAMAN_MAX_LIMIT
 
-        self._xs = []
-        self._ys = []
+        # ScanGrid of the map, and a GridPointIndex of the source points
+        # shown at its nodes
+        self._grid = None
         self._z = None
         self._im = None
-        self._grid_points = None
+        self._index = None
+        # Copy of the points shown, and the list they were copied from: a
+        # running scan passes the same list with points appended
         self._source_points = []
+        self._points = None
+
+        # Sparse scans: inpainting method, nodes to fill (None for all), the
+        # low-rank cube once built, and the markers of acquired nodes
+        self._reconstruction = None
+        self._domain = None
+        self._cube = None
+        self._acquired_marks = None
 
         self._colorbar = None
         self._has_2d_heatmap = False
 
         self._selection_rect = None
         self._selected_point = None
+        # Region statistics: RegionStats of the shown points (built on first
+        # use), their spectra cube and how many source points it holds, the
+        # selector of the current mode, the selected region as a grid mask and
+        # its outline
+        self._regions = None
+        self._spectra = None
+        self._spectra_count = 0
+        self._selector = None
+        self._region = None
+        self._region_outline = None
+        # Refreshes the statistics of the region as a scan adds points
+        self._region_timer = QTimer(self)
+        self._region_timer.setSingleShot(True)
+        self._region_timer.setInterval(REGION_STATS_REFRESH_MS)
+        self._region_timer.timeout.connect(self._emit_region_stats)
+
+        # (row, col) under the mouse and the point shown for it, or None
+        self._hover_cell = None
+        self._hover_point = None
 
         self._init_ui()
         self._show_qt_message("No Scan Data")
 
         self.canvas.mpl_connect("button_press_event", self._on_click)
         self.canvas.mpl_connect("motion_notify_event", self._on_mouse_move)
+        self.canvas.mpl_connect("figure_leave_event", self._on_mouse_leave)
 
     def _init_ui(self):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(4, 4, 4, 4)
+        controls = QHBoxLayout()
+        controls.addWidget(self._view_combo, 1)
+        controls.addStretch()
+        controls.addWidget(QLabel("Select:"))
+        controls.addWidget(self._select_combo)
+        layout.addLayout(controls)
         layout.addWidget(self.canvas)
         layout.addWidget(self._fallback_label)
 
@@ -63,48 +138,51 @@ class HeatmapPreviewWidget(QWidget):
         self._fallback_label.hide()
         self.canvas.show()
 
-    def initialize_grid(self, points):
+    def initialize_grid(self, grid):
+        """Lay out an empty map of a ``devices.scan_grid.ScanGrid``."""
         self.fig.clear()
         self.ax = self.fig.add_subplot(111)
 
-        self._grid_points = None
+        self._grid = grid
+        self._index = None
         self._z = None
         self._im = None
         self._colorbar = None
         self._has_2d_heatmap = False
+        self._acquired_marks = None
+        self.set_reconstruction(None)
+        self._set_hover_cell(None)
+        self._clear_region()
+        self._points = None
+        self._reset_spectra()
+        self._make_selector()
 
         if self._selection_rect:
             self._selection_rect.set_visible(False)
 
-        if not points:
+        if grid is None or not len(grid):
             self._show_qt_message("No Scan Data")
             return
 
-        self._xs = sorted({p.x for p in points})
-        self._ys = sorted({p.y for p in points})
-
-        if len(self._xs) < 2 or len(self._ys) < 2:
+        if grid.nx < 2 or grid.ny < 2:
             self._show_qt_message("Line / sparse scan\n(no 2D heatmap)")
             return
 
-        self._z = np.full((len(self._ys), len(self._xs)), np.nan)
-        self._grid_points = [[None for _ in self._xs] for _ in self._ys]
+        self._z = np.full(grid.shape, np.nan)
+        self._index = GridPointIndex(grid, np.full(grid.shape, -1, dtype=np.intp))
 
         self._im = self.ax.imshow(
             self._z,
             cmap=HEATMAP_CMAP,
             origin="lower",
             aspect="auto",
-            extent=self._compute_extent(),
+            extent=grid.extent,
         )
 
-        dx = self._xs[1] - self._xs[0]
-        dy = self._ys[1] - self._ys[0]
-
         self._selection_rect = Rectangle(
             (0, 0),
-            dx,
-            dy,
+            grid.step_x,
+            grid.step_y,
             linewidth=2,
             edgecolor="red",
             facecolor="none",
@@ -113,6 +191,11 @@ class HeatmapPreviewWidget(QWidget):
         )
 
         self.ax.add_patch(self._selection_rect)
+        # Added as an artist, so it does not take part in autoscaling
+        self._region_outline = self.ax.add_artist(
+            Line2D([], [], color="red", lw=1.5, ls="--", zorder=5, visible=False)
+        )
+        self._make_selector()
 
         cmap = self._im.get_cmap().copy()
         cmap.set_bad(alpha=0.0)
@@ -132,26 +215,33 @@ class HeatmapPreviewWidget(QWidget):
         if not self._has_2d_heatmap or point is None:
             return
 
-        xs = np.asarray(self._xs)
-        ys = np.asarray(self._ys)
-
-        x_idx = int(np.argmin(np.abs(xs - point.x)))
-        y_idx = int(np.argmin(np.abs(ys - point.y)))
-
-        dx = xs[1] - xs[0]
-        dy = ys[1] - ys[0]
+        index = self._grid.index(point.x, point.y)
+        if index is None:
+            return
 
-        x0 = xs[x_idx] - dx / 2
-        y0 = ys[y_idx] - dy / 2
+        grid = self._grid
+        row, col = index
+        x0 = grid.x(col) - grid.step_x / 2
+        y0 = grid.y(row) - grid.step_y / 2
 
         self._selection_rect.set_xy((x0, y0))
-        self._selection_rect.set_width(dx)
-        self._selection_rect.set_height(dy)
+        self._selection_rect.set_width(grid.step_x)
+        self._selection_rect.set_height(grid.step_y)
         self._selection_rect.set_visible(True)
 
         self.canvas.draw_idle()
 
     def populate_from_points(self, points, raman_min, raman_max):
+        appended = points is self._points and len(points) > len(self._source_points)
+        changed = appended or (
+            points is not self._source_points and points is not self._points
+        )
+        if changed:
+            self._cube = None
+            self._regions = None
+            if not appended:
+                self._reset_spectra()
+            self._points = points
         self._source_points = list(points)
 
         if not self._has_2d_heatmap:
@@ -161,20 +251,21 @@ class HeatmapPreviewWidget(QWidget):
         self._raman_max = raman_max
 
         self._z[:] = np.nan
-        self._grid_points = [[None for _ in self._xs] for _ in self._ys]
+        self._index.ids.fill(-1)
 
-        xs = np.asarray(self._xs)
-        ys = np.asarray(self._ys)
-
-        for point in points:
-            x_idx = int(np.argmin(np.abs(xs - point.x)))
-            y_idx = int(np.argmin(np.abs(ys - point.y)))
+        for i, point in enumerate(self._source_points):
+            index = self._grid.index(point.x, point.y)
+            if index is None:
+                continue
 
             mask = (point.raman_shifts >= raman_min) & (point.raman_shifts <= raman_max)
 
             value = float(point.intensities[mask].sum())
-            self._z[y_idx, x_idx] = value
-            self._grid_points[y_idx][x_idx] = point
+            self._z[index] = value
+            self._index.ids[index] = i
+
+        if self._reconstruction is not None:
+            self._reconstruct()
 
         self._im.set_data(self._z)
 
@@ -184,6 +275,10 @@ class HeatmapPreviewWidget(QWidget):
 
         self._update_title()
         self.canvas.draw()
+        # A point may have been acquired, or reconstructed, under the mouse.
+        self._update_hover_point()
+        if changed and self._region is not None and not self._region_timer.isActive():
+            self._region_timer.start()
 
     def set_raman_range(self, rmin, rmax):
         self._raman_min = rmin
@@ -194,41 +289,287 @@ class HeatmapPreviewWidget(QWidget):
 
         self.populate_from_points(self._source_points, rmin, rmax)
 
+    def set_reconstruction(self, method, domain=None):
+        """Fill the nodes without a point by ``method`` (see
+        ``devices.sparse_scan``) within the boolean grid ``domain``, and mark
+        the acquired nodes; None shows measured nodes only."""
+        self._reconstruction = method
+        self._domain = domain
+        self._cube = None
+        if self._acquired_marks is not None:
+            self._acquired_marks.set_visible(method is not None)
+
+    def _reconstruct(self):
+        from devices.sparse_scan import BIHARMONIC, LOW_RANK, complete_cube, inpaint
+
+        known = np.isfinite(self._z)
+        if not known.any():
+            return
+
+        if self._reconstruction == LOW_RANK:
+            if self._cube is None:
+                points = [self._source_points[i] for i in self._index.ids[known]]
+                self._cube = complete_cube(
+                    points[0].raman_shifts,
+                    np.stack([p.intensities for p in points]),
+                    known,
+                    SPARSE_LOW_RANK,
+                    BIHARMONIC,
+                )
+            filled = self._cube.band_map(self._raman_min, self._raman_max)
+        else:
+            filled = inpaint(self._z, known, self._reconstruction)
+
+        self._z = np.where(known, self._z, filled)
+        if self._domain is not None:
+            self._z[~self._domain] = np.nan
+
+        rows, cols = np.nonzero(known)
+        offsets = np.column_stack([self._grid.x(cols), self._grid.y(rows)])
+        if self._acquired_marks is None:
+            # Keep the image extent as the view limits.
+            self.ax.set_autoscale_on(False)
+            self._acquired_marks = self.ax.scatter(
+                offsets[:, 0],
+                offsets[:, 1],
+                s=4,
+                c="white",
+                edgecolors="black",
+                linewidths=0.3,
+                zorder=4,
+            )
+        else:
+            self._acquired_marks.set_offsets(offsets)
+            self._acquired_marks.set_visible(True)
+
+    def _point_at(self, row, col):
+        i = self._index.at(row, col)
+        return None if i is None else self._source_points[i]
+
+    def _reconstructed_point(self, y_idx, x_idx):
+        """Spectrum of an unacquired node from the low-rank cube, if any."""
+        if self._cube is None:
+            return None
+        if self._domain is not None and not self._domain[y_idx, x_idx]:
+            return None
+        from devices.scan_worker import ScanPoint
+
+        return ScanPoint(
+            float(self._grid.x(x_idx)),
+            float(self._grid.y(y_idx)),
+            self._cube.raman_shifts,
+            self._cube.spectrum(y_idx, x_idx),
+        )
+
+    def set_volume_views(self, zs):
+        """Offer the slices at ``zs`` and their maximum projection; None
+        hides the choice."""
+        self._view_combo.blockSignals(True)
+        self._view_combo.clear()
+        if zs is not None:
+            self._view_combo.addItem("Max projection")
+            self._view_combo.addItems([f"Z = {z:.2f} µm" for z in zs])
+        self._view_combo.blockSignals(False)
+        self._view_combo.setVisible(zs is not None)
+
+    def select_volume_view(self, index: int):
+        """Show ``index`` as the current view without emitting a signal."""
+        self._view_combo.blockSignals(True)
+        self._view_combo.setCurrentIndex(index + 1)
+        self._view_combo.blockSignals(False)
+        if self._has_2d_heatmap:
+            self._update_title()
+            self.canvas.draw_idle()
+
+    def volume_view(self) -> int | None:
+        if not self._view_combo.count():
+            return None
+        return self._view_combo.currentIndex() - 1
+
+    def set_volume_views_enabled(self, enabled: bool):
+        self._view_combo.setEnabled(enabled)
+
     def _on_click(self, event):
-        if not self._has_2d_heatmap:
+        if not self._has_2d_heatmap or self._selector is not None:
             return
         if event.inaxes != self.ax or event.xdata is None or event.ydata is None:
             return
 
-        x_idx = int(np.argmin(np.abs(np.asarray(self._xs) - event.xdata)))
-        y_idx = int(np.argmin(np.abs(np.asarray(self._ys) - event.ydata)))
+        index = self._grid.index(event.xdata, event.ydata)
+        if index is None:
+            return
 
-        point = self._grid_points[y_idx][x_idx]
+        # The node's own point, else its reconstruction, else the nearest
+        # measured point (masked and sparse scans)
+        point = self._point_at(*index)
+        if point is None:
+            point = self._reconstructed_point(*index)
+        if point is None:
+            nearest = self._index.nearest(event.xdata, event.ydata)
+            point = None if nearest is None else self._source_points[nearest]
         if point:
             self.highlight_point(point)
             self.scan_point_selected.emit(point)
 
+    def _on_select_mode(self, mode):
+        self._clear_region()
+        self._make_selector()
+
+    def _make_selector(self):
+        if self._selector is not None:
+            self._selector.set_active(False)
+            self._selector.disconnect_events()
+            self._selector = None
+        if self._im is None:
+            return
+
+        mode = self._select_combo.currentText()
+        if mode == SELECT_RECTANGLE:
+            self._selector = RectangleSelector(
+                self.ax,
+                self._on_rectangle_selected,
+                useblit=True,
+                props={"edgecolor": "red", "fill": False, "linewidth": 1.5},
+            )
+        elif mode == SELECT_LASSO:
+            self._selector = LassoSelector(
+                self.ax,
+                self._on_lasso_selected,
+                useblit=True,
+                props={"color": "red", "linewidth": 1.5},
+            )
+
+    def _node_span(self, x0, x1, y0, y1) -> tuple[int, int, int, int]:
+        """Half-open ``(row0, row1, col0, col1)`` of the nodes inside
+        ``[x0, x1] x [y0, y1]``."""
+        grid = self._grid
+        col0 = max(math.ceil((x0 - grid.x0) / grid.step_x), 0)
+        col1 = min(math.floor((x1 - grid.x0) / grid.step_x) + 1, grid.nx)
+        row0 = max(math.ceil((y0 - grid.y0) / grid.step_y), 0)
+        row1 = min(math.floor((y1 - grid.y0) / grid.step_y) + 1, grid.ny)
+        return row0, max(row1, row0), col0, max(col1, col0)
+
+    def _on_rectangle_selected(self, press, release):
+        x0, x1 = sorted((press.xdata, release.xdata))
+        y0, y1 = sorted((press.ydata, release.ydata))
+        self._set_region(
+            self._node_span(x0, x1, y0, y1),
+            [x0, x1, x1, x0, x0],
+            [y0, y0, y1, y1, y0],
+        )
+
+    def _on_lasso_selected(self, vertices):
+        if len(vertices) < 3:
+            return
+        xs, ys = np.asarray(vertices, dtype=float).T
+        # Test only the nodes within the lasso's bounding box.
+        row0, row1, col0, col1 = self._node_span(xs.min(), xs.max(), ys.min(), ys.max())
+        mask = np.zeros(self._grid.shape, dtype=bool)
+        mask[row0:row1, col0:col1] = polygon_mask(
+            self._grid.xs[col0:col1], self._grid.ys[row0:row1], vertices
+        )
+        self._set_region(mask, np.append(xs, xs[0]), np.append(ys, ys[0]))
+
+    def _set_region(self, region, xs, ys):
+        """Select ``region``, rows and columns ``(row0, row1, col0, col1)``
+        (half-open) or a grid mask, outlined by ``xs``, ``ys``."""
+        self._region = region
+        self._region_outline.set_data(xs, ys)
+        self._region_outline.set_visible(True)
+        self.canvas.draw_idle()
+        self._region_timer.stop()
+        self._emit_region_stats()
+
+    def _clear_region(self):
+        if self._region is None:
+            return
+        self._region = None
+        self._region_timer.stop()
+        if self._region_outline is not None:
+            self._region_outline.set_visible(False)
+            self.canvas.draw_idle()
+        self.region_selected.emit(None)
+
+    def _emit_region_stats(self):
+        regions = self._region_stats()
+        stats = None
+        if regions is not None:
+            if isinstance(self._region, tuple):
+                stats = regions.rect(*self._region)
+            else:
+                stats = regions.masked(self._region)
+        self.region_selected.emit(stats)
+
+    def _region_stats(self):
+        """RegionStats over the spectra of the measured nodes. Only the nodes
+        of points appended since the last call are written into the cube."""
+        if self._regions is None and self._index is not None:
+            from devices.region_stats import RegionStats
+
+            if not self._source_points:
+                return None
+            fresh = self._index.ids >= self._spectra_count
+            points = [self._source_points[i] for i in self._index.ids[fresh]]
+            if self._spectra is None:
+                channels = len(self._source_points[0].intensities)
+                self._spectra = np.full(
+                    self._grid.shape + (channels,), np.nan, dtype=np.float32
+                )
+            if points:
+                self._spectra[fresh] = np.stack([p.intensities for p in points])
+            self._spectra_count = len(self._source_points)
+            self._regions = RegionStats(
+                self._source_points[0].raman_shifts, self._spectra
+            )
+        return self._regions
+
+    def _reset_spectra(self):
+        self._regions = None
+        self._spectra = None
+        self._spectra_count = 0
+
     def _on_mouse_move(self, event):
         if self._has_2d_heatmap and event.inaxes == self.ax:
             self.canvas.setCursor(Qt.CursorShape.PointingHandCursor)
+            cell = self._grid.index(event.xdata, event.ydata)
         else:
             self.canvas.setCursor(Qt.CursorShape.ArrowCursor)
+            cell = None
+        self._set_hover_cell(cell)
+
+    def _on_mouse_leave(self, event):
+        self._set_hover_cell(None)
+
+    def _set_hover_cell(self, cell):
+        # Moves within a cell change nothing; the lookup is by node, O(1)
+        if cell == self._hover_cell:
+            return
+        self._hover_cell = cell
+        self._update_hover_point()
+
+    def _update_hover_point(self):
+        cell = self._hover_cell
+        point = None
+        if cell is not None and self._index is not None:
+            point = self._point_at(*cell) or self._reconstructed_point(*cell)
+        if point is not self._hover_point:
+            self._hover_point = point
+            self.scan_point_hovered.emit(point)
 
     def _update_title(self):
-        self.ax.set_title(
+        title = (
             f"Integrated Intensity "
             f"[{self._raman_min:.0f}–{self._raman_max:.0f} cm⁻¹]"
         )
-
-    def _compute_extent(self):
-        dx = (self._xs[1] - self._xs[0]) / 2
-        dy = (self._ys[1] - self._ys[0]) / 2
-        return [
-            self._xs[0] - dx,
-            self._xs[-1] + dx,
-            self._ys[0] - dy,
-            self._ys[-1] + dy,
-        ]
+        if self._view_combo.count():
+            title += f"\n{self._view_combo.currentText()}"
+        if self._reconstruction is not None and self._z is not None:
+            title += (
+                f"\nReconstructed ({self._reconstruction}), "
+                f"{len(self._source_points)} of "
+                f"{np.isfinite(self._z).sum()} points acquired"
+            )
+        self.ax.set_title(title)
 
     def _remove_colorbar(self):
         if self._colorbar:
@@ -251,10 +592,17 @@ class HeatmapPreviewWidget(QWidget):
         self._remove_colorbar()
         self._source_points = []
         self._has_2d_heatmap = False
+        self.set_volume_views(None)
         self._show_qt_message("No Scan Data")
         self.canvas.draw_idle()
-        self._xs = []
-        self._ys = []
+        self._grid = None
         self._z = None
-        self._grid_points = None
-        self._im = None
\ No newline at end of file
+        self._index = None
+        self._im = None
+        self._acquired_marks = None
+        self.set_reconstruction(None)
+        self._set_hover_cell(None)
+        self._clear_region()
+        self._points = None
+        self._reset_spectra()
+        self._make_selector()
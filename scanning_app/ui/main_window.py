@@ -1,18 +1,23 @@
 from pathlib import Path
 
-import numpy as np
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtWidgets import (
     QFileDialog,
     QHBoxLayout,
+    QLabel,
     QMainWindow,
     QMessageBox,
     QSplitter,
     QWidget,
 )
 
+from loguru import logger
+
 from config import (
     DEFAULT_SPLITTER_SIZES,
+    DEVICE_CONNECT_TIMEOUT_SEC,
+    DEVICE_ENUM_CACHE_SEC,
+    DEVICE_ENUM_TIMEOUT_SEC,
     WINDOW_HEIGHT,
     WINDOW_TITLE,
     WINDOW_WIDTH,
@@ -21,12 +26,15 @@ from config import (
 )
 
 from controllers.app_controller import AppController
+from controllers.device_tasks import DeviceTaskRunner
+from devices.camera.stage_mosaic import MosaicRequest
+from devices.camera_worker import CameraWorker
+from devices.registry import CAMERA, MOTORS, SPECTROMETER
+from devices.scan_grid import ScanGrid
 from devices.scan_worker import ScanPoint
 from ui.app_state import AppState, ScanMode
 from .camera_view_widget import CameraViewWidget
-from .heatmap_preview_widget import HeatmapPreviewWidget
 from .sidebar import SidebarWidget
-from .spectra_preview_widget import SpectraPreviewWidget
 
 
 class MainWindow(QMainWindow):
@@ -37,15 +45,21 @@ class MainWindow(QMainWindow):
         self.setGeometry(WINDOW_X, WINDOW_Y, WINDOW_WIDTH, WINDOW_HEIGHT)
 
         self.controller = AppController()
+        self.device_tasks = DeviceTaskRunner(parent=self)
+        self.camera_worker = CameraWorker(parent=self)
         self.state = AppState()
 
+        self._captures_pending = 0
+        self._mosaic_running = False
         self._live_mode = True
         self._last_live_point = None
         self._live_scan_points = []
+        self._scan_worker = None
 
         self._init_ui()
         self._connect_signals()
         self._populate_device_lists()
+        self.camera_worker.start()
 
     def _init_ui(self):
         central = QWidget()
@@ -58,20 +72,64 @@ class MainWindow(QMainWindow):
         layout.addWidget(self.sidebar)
 
         self.camera_widget = CameraViewWidget()
+        self.heatmap_widget = None
+        self.spectra_widget = None
+
+        self._top_splitter = QSplitter(Qt.Orientation.Horizontal)
+        self._top_splitter.addWidget(self.camera_widget)
+        self._top_splitter.addWidget(self._loading_placeholder())
+        self._top_splitter.setSizes(DEFAULT_SPLITTER_SIZES["top"])
+
+        self._main_splitter = QSplitter(Qt.Orientation.Vertical)
+        self._main_splitter.addWidget(self._top_splitter)
+        self._main_splitter.addWidget(self._loading_placeholder())
+        self._main_splitter.setSizes(DEFAULT_SPLITTER_SIZES["main"])
+
+        layout.addWidget(self._main_splitter)
+
+    @staticmethod
+    def _loading_placeholder() -> QLabel:
+        label = QLabel("Loading…")
+        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        label.setStyleSheet("color:#777;font-size:12px;")
+        return label
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.heatmap_widget is None:
+            QTimer.singleShot(0, self._init_plot_widgets)
+
+    def _init_plot_widgets(self):
+        if self.heatmap_widget is not None:
+            return
+
+        # matplotlib dominates startup time, so the plot widgets are built
+        # after the window has been painted once.
+        from .heatmap_preview_widget import HeatmapPreviewWidget
+        from .spectra_preview_widget import SpectraPreviewWidget
+
         self.heatmap_widget = HeatmapPreviewWidget()
         self.spectra_widget = SpectraPreviewWidget()
 
-        top = QSplitter(Qt.Orientation.Horizontal)
-        top.addWidget(self.camera_widget)
-        top.addWidget(self.heatmap_widget)
-        top.setSizes(DEFAULT_SPLITTER_SIZES["top"])
-
-        main = QSplitter(Qt.Orientation.Vertical)
-        main.addWidget(top)
-        main.addWidget(self.spectra_widget)
-        main.setSizes(DEFAULT_SPLITTER_SIZES["main"])
+        self._top_splitter.replaceWidget(1, self.heatmap_widget).deleteLater()
+        self._main_splitter.replaceWidget(1, self.spectra_widget).deleteLater()
 
-        layout.addWidget(main)
+        self.heatmap_widget.scan_point_selected.connect(
+            self._on_heatmap_point_selected
+        )
+        self.heatmap_widget.scan_point_hovered.connect(
+            self.spectra_widget.preview_point
+        )
+        self.heatmap_widget.region_selected.connect(
+            self.spectra_widget.set_region_stats
+        )
+        self.heatmap_widget.volume_view_selected.connect(self._show_volume_view)
+        self.spectra_widget.raman_range_selected.connect(
+            self._on_raman_range_changed
+        )
+        self.spectra_widget.live_requested.connect(
+            self._return_to_live_mode
+        )
 
     def _connect_signals(self):
         sb = self.sidebar
@@ -79,6 +137,24 @@ class MainWindow(QMainWindow):
         sb.connect_camera_requested.connect(self._connect_camera)
         sb.disconnect_camera_requested.connect(self._disconnect_camera)
         sb.capture_image_requested.connect(self._capture_image)
+        sb.live_view_toggled.connect(self._toggle_live_view)
+        sb.camera_geometry_changed.connect(self._on_camera_geometry_changed)
+        sb.mosaic_toggle_requested.connect(self._toggle_mosaic)
+        sb.mosaic_clear_requested.connect(self._clear_mosaic)
+        sb.autofocus_requested.connect(self._autofocus)
+
+        cw = self.camera_worker
+        cw.frame_captured.connect(self._on_frame_captured)
+        cw.capture_failed.connect(self._on_capture_failed)
+        cw.live_started.connect(self._on_live_started)
+        cw.live_failed.connect(self._on_live_failed)
+        cw.camera_released.connect(self._close_device)
+        cw.mosaic_started.connect(self.camera_widget.set_mosaic)
+        cw.mosaic_progress.connect(self._on_mosaic_progress)
+        cw.mosaic_finished.connect(self._on_mosaic_finished)
+        cw.mosaic_failed.connect(self._on_mosaic_failed)
+        cw.autofocus_finished.connect(self._on_autofocus_finished)
+        cw.autofocus_failed.connect(self._on_autofocus_failed)
 
         sb.connect_spectrometer_requested.connect(self._connect_spectrometer)
         sb.disconnect_spectrometer_requested.connect(self._disconnect_spectrometer)
@@ -87,90 +163,307 @@ class MainWindow(QMainWindow):
         sb.disconnect_motors_requested.connect(self._disconnect_motors)
 
         sb.scan_toggle_requested.connect(self._toggle_scan)
+        sb.roi_shape_changed.connect(self.camera_widget.set_roi_shape)
         sb.save_project_requested.connect(self._save_project)
         sb.open_project_requested.connect(self._open_project)
         sb.reset_requested.connect(self._reset_viewer)
 
-        self.heatmap_widget.scan_point_selected.connect(
-            self._on_heatmap_point_selected
-        )
-        self.spectra_widget.raman_range_selected.connect(
-            self._on_raman_range_changed
-        )
-        self.spectra_widget.live_requested.connect(
-            self._return_to_live_mode
+    def _device_widget(self, kind: str):
+        return {
+            CAMERA: self.sidebar.cam_conn,
+            SPECTROMETER: self.sidebar.spec_conn,
+            MOTORS: self.sidebar.motor_conn,
+        }[kind]
+
+    def _populate_device_lists(self, max_age_s: float = DEVICE_ENUM_CACHE_SEC):
+        # Each plugin is enumerated separately so a slow driver only delays
+        # its own entries.
+        for kind in (CAMERA, SPECTROMETER, MOTORS):
+            widget = self._device_widget(kind)
+            widget.populate_device_list([])
+
+            for plugin in self.controller.device_plugins(kind):
+                self.device_tasks.submit(
+                    self.controller.enumerate_plugin,
+                    plugin,
+                    max_age_s,
+                    on_result=widget.add_devices,
+                    on_error=lambda msg, name=plugin.name: logger.warning(
+                        f"Enumeration failed for {name}: {msg}"
+                    ),
+                    timeout_s=DEVICE_ENUM_TIMEOUT_SEC,
+                )
+
+    def _open_device(self, kind: str, name: str, on_opened) -> None:
+        self._device_widget(kind).set_busy("Connecting…")
+        self.device_tasks.submit(
+            self.controller.open_device,
+            kind,
+            name,
+            on_result=on_opened,
+            on_error=lambda msg: self._on_connect_failed(kind, name, msg),
+            timeout_s=DEVICE_CONNECT_TIMEOUT_SEC,
+            on_late_result=self._close_device,
         )
 
-    def _populate_device_lists(self):
-        self.sidebar.cam_conn.populate_device_list(
-            self.controller.list_cameras()
-        )
-        self.sidebar.spec_conn.populate_device_list(
-            self.controller.list_spectrometers()
-        )
-        self.sidebar.motor_conn.populate_device_list(
-            self.controller.list_motors()
-        )
+    def _close_device(self, device) -> None:
+        if device is not None:
+            self.device_tasks.submit(device.disconnect)
+
+    def _on_connect_failed(self, kind: str, name: str, message: str) -> None:
+        self._device_widget(kind).set_connected(False)
+        QMessageBox.warning(self, "Connect", f"Could not connect {name}:\n{message}")
 
     def _set_viewer_mode_ui(self, enabled: bool):
         sb = self.sidebar
 
+        if enabled:
+            self._stop_live_view()
+
         sb.cam_conn.setEnabled(not enabled)
         sb.spec_conn.setEnabled(not enabled)
         sb.motor_conn.setEnabled(not enabled)
 
         sb.capture_btn.setEnabled(not enabled)
+        sb.live_btn.setEnabled(not enabled)
         sb.scan_btn.setEnabled(not enabled)
+        sb.mosaic_btn.setEnabled(not enabled)
+        sb.autofocus_btn.setEnabled(not enabled)
 
     def _connect_camera(self, name: str):
-        self.controller.connect_camera(name)
-        self.camera_widget.camera = self.controller.camera
+        self._open_device(CAMERA, name, self._on_camera_connected)
+
+    def _on_camera_connected(self, camera):
+        self.controller.set_camera(camera)
+        self.camera_worker.set_camera(camera)
+        self.camera_widget.camera = camera
         self.sidebar.cam_conn.set_connected(True)
 
     def _disconnect_camera(self):
-        self.controller.disconnect_camera()
+        self._stop_live_view()
+        camera = self.controller.release_camera()
+        if camera is not None:
+            # Closed once the worker has finished any capture in flight;
+            # queued captures are dropped.
+            self.camera_worker.release(camera)
+            self._set_captures_pending(0)
+            self._set_mosaic_running(False)
+            self.sidebar.set_autofocus_active(False)
         self.camera_widget.camera = None
         self.camera_widget.set_image(None)
         self.sidebar.cam_conn.set_connected(False)
 
-    def _capture_image(self):
+    def _toggle_live_view(self, enabled: bool):
+        if not enabled:
+            self._stop_live_view()
+            return
+
         if not self.controller.camera:
             QMessageBox.warning(self, "Camera", "Camera not connected")
+            self._set_live_button(False)
             return
 
-        cam = self.controller.camera
+        self.camera_worker.start_live(self._camera_settings())
+
+    def _on_live_started(self, stream):
+        if not self.sidebar.live_btn.isChecked():
+            # Switched off again while the stream was starting.
+            self.camera_worker.stop_live()
+            return
+        self.camera_widget.start_live(stream)
+
+    def _on_live_failed(self, message: str):
+        self._set_live_button(False)
+        QMessageBox.warning(self, "Live View", message)
+
+    def _camera_settings(self) -> dict:
+        """Sidebar camera settings as pushed to the camera by the worker."""
         settings = self.sidebar.get_camera_settings()
+        settings["sensor_roi"] = (
+            self.camera_widget.sensor_roi() if settings["sensor_roi"] else None
+        )
+        self.camera_widget.raw_display = settings.pop("raw_display")
+        return settings
+
+    def _on_camera_geometry_changed(self):
+        if self.controller.camera is None or not self.camera_widget.is_live():
+            return
+
+        # Frame size changes, so the stream is rebuilt around the new geometry.
+        self.camera_worker.start_live(self._camera_settings())
+
+    def _stop_live_view(self):
+        if self.camera_widget.is_live():
+            self.camera_widget.stop_live()
+        if self.controller.camera is not None:
+            self.camera_worker.stop_live()
+        self._set_live_button(False)
+
+    def _set_live_button(self, checked: bool):
+        btn = self.sidebar.live_btn
+        btn.blockSignals(True)
+        btn.setChecked(checked)
+        btn.blockSignals(False)
+
+    def _capture_image(self):
+        if not self.controller.camera:
+            QMessageBox.warning(self, "Camera", "Camera not connected")
+            return
+
+        if self.camera_widget.is_live():
+            self.camera_widget.stop_live()
+            self._set_live_button(False)
+
+        # Runs on the camera worker: a click while a capture is queued only
+        # updates its settings, and the frame arrives via _on_frame_captured.
+        if self.camera_worker.request_capture(self._camera_settings()):
+            self._set_captures_pending(self._captures_pending + 1)
+
+    def _on_frame_captured(self, frame):
+        self._set_captures_pending(self._captures_pending - 1)
+        if self.controller.camera is None:
+            frame.release()
+            return
+        self.camera_widget.set_image(frame)
+
+    def _on_capture_failed(self, message: str):
+        self._set_captures_pending(self._captures_pending - 1)
+        QMessageBox.warning(self, "Capture", message)
+
+    def _set_captures_pending(self, count: int):
+        self._captures_pending = max(0, count)
+        self.sidebar.capture_btn.setText(
+            "Capturing…" if self._captures_pending else "Capture Image"
+        )
+
+    def _toggle_mosaic(self):
+        if self._mosaic_running:
+            # Stops after the field in flight; the partial mosaic is kept.
+            self.camera_worker.cancel_mosaic()
+            return
+
+        if not self.controller.camera or not self.controller.motors:
+            QMessageBox.warning(
+                self, "Mosaic", "Camera and motors must be connected"
+            )
+            return
+        if self.state.is_scanning:
+            QMessageBox.warning(self, "Mosaic", "Stop the scan first")
+            return
+
+        params = self.sidebar.get_mosaic_parameters()
+        area = None
+        if params["cover_roi"]:
+            area = self.camera_widget.sensor_roi()
+            if area is None:
+                QMessageBox.warning(self, "Mosaic", "Select ROI first")
+                return
+
+        self._stop_live_view()
+        request = MosaicRequest(
+            columns=params["columns"],
+            rows=params["rows"],
+            overlap=params["overlap"],
+            blend=params["blend"],
+            area=area,
+        )
+        settings = self._camera_settings()
+        self.camera_worker.acquire_mosaic(
+            settings, request, self.controller.motors, self.camera_widget.raw_display
+        )
+        self._set_mosaic_running(True)
+        self.sidebar.status_lbl.setText("Mosaic: starting")
 
-        cam.set_auto_exposure(settings["auto_exposure"])
-        cam.set_auto_white_balance(settings["auto_white_balance"])
+    def _on_mosaic_progress(self, done: int, total: int):
+        self.camera_widget.refresh_mosaic()
+        self.sidebar.status_lbl.setText(f"Mosaic: {done}/{total} fields")
 
-        if not settings["auto_exposure"]:
-            cam.set_exposure(settings["exposure_us"])
-            cam.set_gain(settings["gain"])
+    def _on_mosaic_finished(self, pyramid):
+        self._set_mosaic_running(False)
+        if self.camera_widget.mosaic() is pyramid:
+            self.camera_widget.refresh_mosaic(fit=True)
+        self.sidebar.status_lbl.setText(f"Mosaic: {len(pyramid)} tiles")
 
-        cam.set_gamma(settings["gamma"])
-        cam.set_contrast(settings["contrast"])
+    def _on_mosaic_failed(self, message: str):
+        self._set_mosaic_running(False)
+        self.sidebar.status_lbl.setText("Idle")
+        QMessageBox.warning(self, "Mosaic", message)
+
+    def _set_mosaic_running(self, running: bool):
+        self._mosaic_running = running
+        self.sidebar.set_mosaic_active(running)
+
+    def _clear_mosaic(self):
+        if not self._mosaic_running:
+            self.camera_widget.set_mosaic(None)
+
+    def _autofocus(self):
+        motors = self.controller.motors
+        if not self.controller.camera or not motors:
+            QMessageBox.warning(
+                self, "Autofocus", "Camera and motors must be connected"
+            )
+            return
+        if not motors.has_focus_axis():
+            QMessageBox.warning(self, "Autofocus", "Motors have no focus axis")
+            return
+        if self.state.is_scanning or self._mosaic_running:
+            QMessageBox.warning(self, "Autofocus", "Stop the scan or mosaic first")
+            return
 
-        self.camera_widget.set_image(
-            self.controller.capture_camera_image()
+        # Autofocus runs its own stream on the camera worker.
+        self._stop_live_view()
+        self.camera_worker.autofocus(
+            self._camera_settings(), motors, self.sidebar.get_autofocus_parameters()
         )
+        self.sidebar.set_autofocus_active(True)
+        self.sidebar.status_lbl.setText("Focusing…")
+
+    def _on_autofocus_finished(self, result):
+        self.sidebar.set_autofocus_active(False)
+        self.sidebar.status_lbl.setText(
+            f"Focus: Z {result.z:.2f} µm ({result.frames} frames, "
+            f"{result.elapsed_s:.1f} s)"
+        )
+
+    def _on_autofocus_failed(self, message: str):
+        self.sidebar.set_autofocus_active(False)
+        self.sidebar.status_lbl.setText("Idle")
+        QMessageBox.warning(self, "Autofocus", message)
 
     def _connect_spectrometer(self, name: str):
-        self.controller.connect_spectrometer(name)
+        self._open_device(SPECTROMETER, name, self._on_spectrometer_connected)
+
+    def _on_spectrometer_connected(self, spectrometer):
+        self.controller.set_spectrometer(spectrometer)
         self.sidebar.spec_conn.set_connected(True)
 
     def _disconnect_spectrometer(self):
-        self.controller.disconnect_spectrometer()
+        self._close_device(self.controller.release_spectrometer())
         self.sidebar.spec_conn.set_connected(False)
 
     def _connect_motors(self, name: str):
-        self.controller.connect_motors(name)
+        self._open_device(MOTORS, name, self._on_motors_connected)
+
+    def _on_motors_connected(self, motors):
+        self.controller.set_motors(motors)
         self.sidebar.motor_conn.set_connected(True)
 
     def _disconnect_motors(self):
-        self.controller.disconnect_motors()
+        self._close_device(self.controller.release_motors())
         self.sidebar.motor_conn.set_connected(False)
 
+    def closeEvent(self, event):
+        self._stop_live_view()
+        self.camera_worker.cancel_mosaic()
+        self.camera_worker.shutdown()
+        self.camera_widget.set_mosaic(None)
+        if self.controller.camera is not None:
+            self.controller.camera.stop_stream()
+        self.controller.close_scan()
+        self.device_tasks.shutdown()
+        super().closeEvent(event)
+
     def _toggle_scan(self):
         if self.controller.scan_worker is None:
             self._start_scan()
@@ -178,6 +471,10 @@ class MainWindow(QMainWindow):
             self._stop_scan()
 
     def _start_scan(self):
+        if self._mosaic_running:
+            QMessageBox.warning(self, "Scan", "Stop the mosaic first")
+            return
+
         roi = self.camera_widget.get_roi_rect()
         if roi is None:
             QMessageBox.warning(self, "Scan", "Select ROI first")
@@ -189,9 +486,40 @@ class MainWindow(QMainWindow):
             )
             return
 
-        worker = self.controller.start_scan(
-            roi, self.sidebar.get_scan_parameters()
-        )
+        params = self.sidebar.get_scan_parameters()
+        if params["z_stack"] and not self.controller.motors.has_focus_axis():
+            QMessageBox.warning(self, "Scan", "Motors have no focus axis")
+            return
+        if params["z_stack"] and params["survey"]:
+            QMessageBox.warning(
+                self, "Scan", "Survey scans cover a single plane; turn off Z stack"
+            )
+            return
+        if params["adaptive_dwell"] and (params["z_stack"] or params["survey"]):
+            QMessageBox.warning(
+                self,
+                "Scan",
+                "Adaptive dwell cannot be combined with Z stack or survey",
+            )
+            return
+        if params["sparse"] and (params["z_stack"] or params["survey"]):
+            QMessageBox.warning(
+                self,
+                "Scan",
+                "Sparse sampling cannot be combined with Z stack or survey",
+            )
+            return
+
+        try:
+            mask = self.camera_widget.scan_mask(params["mask_threshold"])
+        except RuntimeError as exc:
+            QMessageBox.warning(self, "Scan", str(exc))
+            return
+        if mask is not None:
+            params["mask"] = mask
+
+        worker = self.controller.start_scan(roi, params)
+        self._scan_worker = worker
 
         self.state.scan_mode = ScanMode.SCANNING
         self.sidebar.set_scan_active(True)
@@ -202,11 +530,13 @@ class MainWindow(QMainWindow):
         )
         worker.eta_updated.connect(self.sidebar.eta_lbl.setText)
         worker.point_acquired.connect(self._on_scan_point_acquired)
+        worker.slice_started.connect(self._on_slice_started)
         worker.finished.connect(self._scan_finished)
 
-        self.heatmap_widget.initialize_grid(
-            worker.generate_planned_points()
-        )
+        z_points = worker.z_points()
+        self.heatmap_widget.set_volume_views(z_points or None)
+        self.heatmap_widget.set_volume_views_enabled(False)
+        self.heatmap_widget.initialize_grid(worker.scan_grid())
 
         worker.start()
 
@@ -216,27 +546,108 @@ class MainWindow(QMainWindow):
         self.state.scan_mode = ScanMode.IDLE
 
     def _scan_finished(self, points):
-        if not points:
+        worker, self._scan_worker = self._scan_worker, None
+        volume = worker.volume if worker else None
+        survey = worker.survey_report if worker else None
+        mask_grid = worker.mask_grid if worker else None
+        mask_report = worker.mask_report if worker else None
+        sparse_nodes = worker.sparse_nodes if worker else None
+
+        if volume is not None and not volume.completed_slices:
+            volume.close()
+            volume = None
+
+        if not points and volume is None:
             self.sidebar.set_scan_active(False)
             self.state.scan_mode = ScanMode.IDLE
+            self.heatmap_widget.set_volume_views(None)
             return
 
         self._set_viewer_mode_ui(True)
         self.controller.finalize_scan(
-            points, self.sidebar.get_scan_parameters()
+            points,
+            self.sidebar.get_scan_parameters(),
+            volume=volume,
+            survey=survey,
+            mask_grid=mask_grid,
+            mask_report=mask_report,
+            sparse_nodes=sparse_nodes,
         )
 
         self.state.scan_mode = ScanMode.VIEWER
         self.sidebar.set_scan_active(False)
         self.sidebar.set_save_enabled(True)
         self.sidebar.reset_btn.setVisible(True)
+        status = []
+        if mask_report is not None:
+            status.append(
+                f"Mask: {mask_report.points}/{mask_report.grid_points} points, "
+                f"{mask_report.saved_s:.0f} s saved"
+            )
+        if sparse_nodes is not None:
+            sparse = self.controller.current_scan.scan_meta["sparse"]
+            status.append(
+                f"Sparse: {len(points)}/{sparse['grid_points']} points acquired"
+            )
+        if survey is not None:
+            saved = survey.saved_s / survey.uniform_s if survey.uniform_s else 0.0
+            status.append(
+                f"Survey: {survey.detail_points}/{survey.points} re-measured, "
+                f"{survey.saved_s:.0f} s ({saved:.0%}) saved"
+            )
+        if status:
+            self.sidebar.status_lbl.setText("\n".join(status))
+
+        if volume is not None:
+            self.heatmap_widget.set_volume_views_enabled(True)
+            self._show_volume_view(-1)
+            return
 
+        self._show_reconstruction(self.controller.current_scan)
         self.heatmap_widget.populate_from_points(
             points,
             self.sidebar.raman_min.value(),
             self.sidebar.raman_max.value(),
         )
 
+    def _show_reconstruction(self, scan):
+        """Reconstruct the unacquired nodes of a sparse scan, inside its
+        mask if it has one."""
+        sparse = scan.scan_meta.get("sparse")
+        self.heatmap_widget.set_reconstruction(
+            None if sparse is None else sparse["method"], scan.scan_mask
+        )
+
+    def _on_slice_started(self, k: int, z: float):
+        # Each slice starts from an empty map; finished slices stay on disk.
+        self._live_scan_points = []
+        self.heatmap_widget.select_volume_view(k)
+        self.heatmap_widget.populate_from_points(
+            self._live_scan_points,
+            self.sidebar.raman_min.value(),
+            self.sidebar.raman_max.value(),
+        )
+
+    def _show_volume_view(self, k: int, bounds=None):
+        """Show slice ``k`` of the current Z-stack, or its maximum projection
+        for -1."""
+        scan = self.controller.current_scan
+        if scan is None or scan.volume is None:
+            return
+
+        rmin, rmax = bounds or (
+            self.sidebar.raman_min.value(),
+            self.sidebar.raman_max.value(),
+        )
+        if k < 0:
+            points = scan.volume.projection_points(rmin, rmax)
+        else:
+            points = scan.volume.slice_points(k)
+
+        self._live_scan_points = points
+        self.heatmap_widget.select_volume_view(k)
+        self.heatmap_widget.populate_from_points(points, rmin, rmax)
+
     def _on_scan_point_acquired(self, point):
         self._live_scan_points.append(point)
         self._last_live_point = point
@@ -268,7 +679,11 @@ class MainWindow(QMainWindow):
             self.spectra_widget.update_from_scan_point(self._last_live_point)
 
     def _on_raman_range_changed(self, rmin, rmax):
-        self.heatmap_widget.set_raman_range(rmin, rmax)
+        if self.state.is_viewer and self.heatmap_widget.volume_view() == -1:
+            # The brightest slice of each pixel depends on the band.
+            self._show_volume_view(-1, (rmin, rmax))
+        else:
+            self.heatmap_widget.set_raman_range(rmin, rmax)
 
         self.sidebar.raman_min.blockSignals(True)
         self.sidebar.raman_max.blockSignals(True)
@@ -306,8 +721,11 @@ class MainWindow(QMainWindow):
         self._set_viewer_mode_ui(True)
         scan = self.controller.load_scan(Path(path))
 
-        measured = self._scanpoints_from_scanresult(scan)
-        planned = self._planned_points_from_scanmeta(scan)
+        grid = self._scan_grid_from_scanmeta(scan)
+        if scan.volume is not None:
+            measured = scan.volume.projection_points(*scan.heatmap_bounds)
+        else:
+            measured = self._scanpoints_from_scanresult(scan)
 
         self._live_scan_points = measured
         self._live_mode = False
@@ -316,7 +734,12 @@ class MainWindow(QMainWindow):
         self.sidebar.reset_btn.setVisible(True)
         self.sidebar.set_save_enabled(False)
 
-        self.heatmap_widget.initialize_grid(planned)
+        self.heatmap_widget.set_volume_views(
+            None if scan.volume is None else scan.volume.zs
+        )
+        self.heatmap_widget.set_volume_views_enabled(True)
+        self.heatmap_widget.initialize_grid(grid)
+        self._show_reconstruction(scan)
         self.heatmap_widget.populate_from_points(
             measured,
             scan.heatmap_bounds[0],
@@ -340,7 +763,7 @@ class MainWindow(QMainWindow):
         self._set_viewer_mode_ui(False)
 
         self.state.scan_mode = ScanMode.IDLE
-        self.controller.current_scan = None
+        self.controller.close_scan()
 
         self.sidebar.reset_btn.setVisible(False)
         self.sidebar.set_save_enabled(False)
@@ -351,28 +774,34 @@ class MainWindow(QMainWindow):
         self.spectra_widget.clear()
         self.camera_widget.clear_roi()
         self.camera_widget.set_image(None)
+        self._clear_mosaic()
 
-    def _planned_points_from_scanmeta(self, scan):
-        x0, y0, w, h = scan.scan_meta["roi"]
-        step_x = scan.scan_meta["step_size_x"]
-        step_y = scan.scan_meta["step_size_y"]
-
-        xs = np.arange(x0, x0 + w, step_x)
-        ys = np.arange(y0, y0 + h, step_y)
-
-        return [
-            ScanPoint(float(x), float(y), None, None)
-            for y in ys
-            for x in xs
-        ]
+    def _scan_grid_from_scanmeta(self, scan):
+        return ScanGrid.from_roi(
+            *scan.scan_meta["roi"],
+            scan.scan_meta["step_size_x"],
+            scan.scan_meta["step_size_y"],
+        )
 
     def _scanpoints_from_scanresult(self, scan):
+        # Per-point acquisition columns are optional (older projects and
+        # fixed-dwell scans lack some of them).
+        fields = [
+            (name, kind)
+            for name, kind in (
+                ("integration_time_ms", float),
+                ("dwell_ms", float),
+                ("accumulations", int),
+            )
+            if name in scan.spectra_df
+        ]
         return [
             ScanPoint(
                 float(x),
                 float(y),
                 df["wavenumber_cm1"].to_numpy(float),
                 df["intensity"].to_numpy(float),
+                **{name: kind(df[name].iloc[0]) for name, kind in fields},
             )
             for (x, y), df in scan.spectra_df.groupby(["x", "y"])
         ]
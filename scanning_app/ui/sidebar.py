@@ -15,8 +15,16 @@ from PyQt6.QtWidgets import (
 )
 
 from config import (
+    ADAPTIVE_DWELL_EXPOSURE_MS,
+    ADAPTIVE_DWELL_MAX_MS,
+    ADAPTIVE_DWELL_TARGET_SNR,
+    AUTOFOCUS_METRIC,
+    AUTOFOCUS_RANGE_UM,
     DEFAULT_STEP_SIZE_X,
     DEFAULT_STEP_SIZE_Y,
+    DEFAULT_STEP_SIZE_Z,
+    DEFAULT_Z_START,
+    DEFAULT_Z_STOP,
     EXPOSURE_DEFAULT,
     EXPOSURE_MAX,
     EXPOSURE_MIN,
@@ -25,7 +33,32 @@ from config import (
     GAIN_MIN,
     RAMAN_MAX_LIMIT,
     RAMAN_MIN_LIMIT,
+    SPARSE_FRACTION_PERCENT,
+    SPARSE_METHOD,
+    SPARSE_PATTERN,
+    SPECTRUM_INTEGRATION_TIME_MS,
+    SURVEY_DILATION,
+    SURVEY_INTEGRATION_TIME_MS,
+    SURVEY_METRIC,
+    SURVEY_THRESHOLD,
+    CAMERA_RAW_DISPLAY,
+    CAMERA_STACK_ALIGN,
+    CAMERA_STACK_FRAMES,
+    CAMERA_STACK_MAX_FRAMES,
+    MOSAIC_BLEND,
+    MOSAIC_DEFAULT_COLUMNS,
+    MOSAIC_DEFAULT_OVERLAP,
+    MOSAIC_DEFAULT_ROWS,
+    MOTOR_STEP_RANGE_MAX,
+    MOTOR_STEP_RANGE_MIN,
+    MOTOR_Z_RANGE_MAX,
+    MOTOR_Z_RANGE_MIN,
 )
+from devices.camera.autofocus import LAPLACIAN, TENENGRAD
+from devices.camera.demosaic import BILINEAR, LUMINANCE, SUPERPIXEL
+from devices.scan_mask import BRIGHT, DARK
+from devices.sparse_scan import BIHARMONIC, BLUE_NOISE, LOW_RANK, RANDOM, TV
+from devices.survey_scan import INTENSITY, SNR
 
 from .ui_components import DeviceConnectionWidget
 
@@ -39,7 +72,13 @@ class SidebarWidget(QScrollArea):
     disconnect_motors_requested = pyqtSignal()
 
     capture_image_requested = pyqtSignal()
+    live_view_toggled = pyqtSignal(bool)
+    camera_geometry_changed = pyqtSignal()
+    mosaic_toggle_requested = pyqtSignal()
+    mosaic_clear_requested = pyqtSignal()
+    autofocus_requested = pyqtSignal()
     scan_toggle_requested = pyqtSignal()
+    roi_shape_changed = pyqtSignal(str)
     save_project_requested = pyqtSignal()
     open_project_requested = pyqtSignal()
     reset_requested = pyqtSignal()
@@ -110,6 +149,11 @@ class SidebarWidget(QScrollArea):
         self.capture_btn.clicked.connect(self.capture_image_requested.emit)
         layout.addWidget(self.capture_btn)
 
+        self.live_btn = QPushButton("Live View")
+        self.live_btn.setCheckable(True)
+        self.live_btn.toggled.connect(self.live_view_toggled.emit)
+        layout.addWidget(self.live_btn)
+
         self.cam_toggle = self._collapsible_toggle("Shot Settings")
         layout.addWidget(self.cam_toggle)
 
@@ -155,12 +199,97 @@ class SidebarWidget(QScrollArea):
         cam_layout.addWidget(QLabel("Binning"))
         cam_layout.addWidget(self.binning_combo)
 
+        self.sensor_roi_chk = QCheckBox("Crop Sensor to ROI")
+        cam_layout.addWidget(self.sensor_roi_chk)
+
+        # (label, raw sensor data, raw display method)
+        self._sensor_modes = [
+            ("RGB", False, CAMERA_RAW_DISPLAY),
+            ("Raw (color)", True, BILINEAR),
+            ("Raw (fast color, half size)", True, SUPERPIXEL),
+            ("Raw (luminance, half size)", True, LUMINANCE),
+        ]
+        self.sensor_mode_combo = QComboBox()
+        self.sensor_mode_combo.addItems([mode[0] for mode in self._sensor_modes])
+
+        cam_layout.addWidget(QLabel("Sensor Mode"))
+        cam_layout.addWidget(self.sensor_mode_combo)
+
+        self.stack_spin = QSpinBox()
+        self.stack_spin.setRange(1, CAMERA_STACK_MAX_FRAMES)
+        self.stack_spin.setValue(CAMERA_STACK_FRAMES)
+        self.stack_spin.setToolTip("Average this many live frames per capture")
+
+        self.stack_align_chk = QCheckBox("Align Stacked Frames")
+        self.stack_align_chk.setChecked(CAMERA_STACK_ALIGN)
+
+        cam_layout.addWidget(QLabel("Stack Frames"))
+        cam_layout.addWidget(self.stack_spin)
+        cam_layout.addWidget(self.stack_align_chk)
+
+        self.binning_combo.currentIndexChanged.connect(
+            lambda _: self.camera_geometry_changed.emit()
+        )
+        self.sensor_roi_chk.toggled.connect(
+            lambda _: self.camera_geometry_changed.emit()
+        )
+        self.sensor_mode_combo.currentIndexChanged.connect(
+            lambda _: self.camera_geometry_changed.emit()
+        )
+
         layout.addWidget(self.cam_content)
 
         self.cam_toggle.toggled.connect(
             lambda v: self._toggle(self.cam_toggle, self.cam_content, v)
         )
 
+        self.mosaic_toggle = self._collapsible_toggle("Mosaic")
+        layout.addWidget(self.mosaic_toggle)
+
+        self.mosaic_content = QWidget()
+        self.mosaic_content.setVisible(False)
+        mosaic_layout = QVBoxLayout(self.mosaic_content)
+
+        self.mosaic_cols_spin = QSpinBox()
+        self.mosaic_cols_spin.setRange(1, 1000)
+        self.mosaic_cols_spin.setValue(MOSAIC_DEFAULT_COLUMNS)
+
+        self.mosaic_rows_spin = QSpinBox()
+        self.mosaic_rows_spin.setRange(1, 1000)
+        self.mosaic_rows_spin.setValue(MOSAIC_DEFAULT_ROWS)
+
+        self.mosaic_overlap_spin = QSpinBox()
+        self.mosaic_overlap_spin.setRange(0, 50)
+        self.mosaic_overlap_spin.setSuffix(" %")
+        self.mosaic_overlap_spin.setValue(int(MOSAIC_DEFAULT_OVERLAP * 100))
+
+        self.mosaic_roi_chk = QCheckBox("Cover ROI")
+        self.mosaic_roi_chk.setToolTip("Tile the selected ROI instead of columns x rows")
+        self.mosaic_blend_chk = QCheckBox("Blend Overlap")
+        self.mosaic_blend_chk.setChecked(MOSAIC_BLEND)
+
+        self.mosaic_btn = QPushButton("Acquire Mosaic")
+        self.mosaic_btn.clicked.connect(self.mosaic_toggle_requested.emit)
+        self.mosaic_clear_btn = QPushButton("Clear Mosaic")
+        self.mosaic_clear_btn.clicked.connect(self.mosaic_clear_requested.emit)
+
+        mosaic_layout.addWidget(QLabel("Columns"))
+        mosaic_layout.addWidget(self.mosaic_cols_spin)
+        mosaic_layout.addWidget(QLabel("Rows"))
+        mosaic_layout.addWidget(self.mosaic_rows_spin)
+        mosaic_layout.addWidget(QLabel("Overlap"))
+        mosaic_layout.addWidget(self.mosaic_overlap_spin)
+        mosaic_layout.addWidget(self.mosaic_roi_chk)
+        mosaic_layout.addWidget(self.mosaic_blend_chk)
+        mosaic_layout.addWidget(self.mosaic_btn)
+        mosaic_layout.addWidget(self.mosaic_clear_btn)
+
+        layout.addWidget(self.mosaic_content)
+
+        self.mosaic_toggle.toggled.connect(
+            lambda v: self._toggle(self.mosaic_toggle, self.mosaic_content, v)
+        )
+
         return group
 
     def _build_spectrometer(self):
@@ -213,6 +342,30 @@ class SidebarWidget(QScrollArea):
         motor_layout.addWidget(QLabel("Move Speed"))
         motor_layout.addWidget(self.motor_speed)
 
+        self.af_range_spin = QDoubleSpinBox()
+        self.af_range_spin.setRange(1.0, 500.0)
+        self.af_range_spin.setSuffix(" µm")
+        self.af_range_spin.setValue(AUTOFOCUS_RANGE_UM)
+
+        self._af_metrics = [
+            ("Tenengrad", TENENGRAD),
+            ("Variance of Laplacian", LAPLACIAN),
+        ]
+        self.af_metric_combo = QComboBox()
+        self.af_metric_combo.addItems([metric[0] for metric in self._af_metrics])
+        self.af_metric_combo.setCurrentIndex(
+            [metric[1] for metric in self._af_metrics].index(AUTOFOCUS_METRIC)
+        )
+
+        self.autofocus_btn = QPushButton("Autofocus")
+        self.autofocus_btn.clicked.connect(self.autofocus_requested.emit)
+
+        motor_layout.addWidget(QLabel("Autofocus Range (±)"))
+        motor_layout.addWidget(self.af_range_spin)
+        motor_layout.addWidget(QLabel("Focus Metric"))
+        motor_layout.addWidget(self.af_metric_combo)
+        motor_layout.addWidget(self.autofocus_btn)
+
         layout.addWidget(self.motor_content)
 
         self.motor_toggle.toggled.connect(
@@ -234,6 +387,127 @@ class SidebarWidget(QScrollArea):
         self.step_x = self._spin("Step X (µm)", DEFAULT_STEP_SIZE_X, 0.1)
         self.step_y = self._spin("Step Y (µm)", DEFAULT_STEP_SIZE_Y, 0.1)
 
+        # Scan only part of the ROI: inside a lasso and/or on objects found by
+        # thresholding the camera image
+        self._roi_shapes = [("Rectangle ROI", "rectangle"), ("Lasso ROI", "lasso")]
+        self.roi_shape_combo = QComboBox()
+        self.roi_shape_combo.addItems([shape[0] for shape in self._roi_shapes])
+        self.roi_shape_combo.currentIndexChanged.connect(
+            lambda index: self.roi_shape_changed.emit(self._roi_shapes[index][1])
+        )
+        self._mask_modes = [
+            ("Scan whole ROI", None),
+            ("Scan bright objects", BRIGHT),
+            ("Scan dark objects", DARK),
+        ]
+        self.mask_combo = QComboBox()
+        self.mask_combo.addItems([mode[0] for mode in self._mask_modes])
+
+        # Z stack: repeat the XY raster at each focus position
+        self.z_stack_chk = QCheckBox("Z stack")
+        self.z_start = self._spin(
+            "Z start (µm)", DEFAULT_Z_START, 1.0, MOTOR_Z_RANGE_MIN, MOTOR_Z_RANGE_MAX
+        )
+        self.z_stop = self._spin(
+            "Z stop (µm)", DEFAULT_Z_STOP, 1.0, MOTOR_Z_RANGE_MIN, MOTOR_Z_RANGE_MAX
+        )
+        self.step_z = self._spin(
+            "Step Z (µm)",
+            DEFAULT_STEP_SIZE_Z,
+            0.1,
+            MOTOR_STEP_RANGE_MIN,
+            MOTOR_STEP_RANGE_MAX,
+        )
+        for w in (self.z_start, self.z_stop, self.step_z):
+            w.setEnabled(False)
+            self.z_stack_chk.toggled.connect(w.setEnabled)
+
+        # Survey: short integration everywhere, full integration where the
+        # band has signal
+        self.survey_chk = QCheckBox("Survey first")
+        self.survey_integration_spin = QSpinBox()
+        self.survey_integration_spin.setPrefix("Survey integration: ")
+        self.survey_integration_spin.setSuffix(" ms")
+        self.survey_integration_spin.setRange(1, SPECTRUM_INTEGRATION_TIME_MS)
+        self.survey_integration_spin.setValue(SURVEY_INTEGRATION_TIME_MS)
+
+        self._survey_metrics = [("SNR", SNR), ("Band intensity", INTENSITY)]
+        self.survey_metric_combo = QComboBox()
+        self.survey_metric_combo.addItems([m[0] for m in self._survey_metrics])
+        self.survey_metric_combo.setCurrentIndex(
+            [m[1] for m in self._survey_metrics].index(SURVEY_METRIC)
+        )
+        self.survey_threshold = self._spin(
+            "Threshold", SURVEY_THRESHOLD, 0.5, 0.0, 1000.0
+        )
+        self.survey_dilation_spin = QSpinBox()
+        self.survey_dilation_spin.setPrefix("Grow selection: ")
+        self.survey_dilation_spin.setSuffix(" px")
+        self.survey_dilation_spin.setRange(0, 10)
+        self.survey_dilation_spin.setValue(SURVEY_DILATION)
+
+        for w in (
+            self.survey_integration_spin,
+            self.survey_metric_combo,
+            self.survey_threshold,
+            self.survey_dilation_spin,
+        ):
+            w.setEnabled(False)
+            self.survey_chk.toggled.connect(w.setEnabled)
+
+        # Adaptive dwell: accumulate exposures until the band SNR is reached
+        self.dwell_chk = QCheckBox("Adaptive dwell")
+        self.dwell_snr = self._spin(
+            "Target SNR", ADAPTIVE_DWELL_TARGET_SNR, 1.0, 1.0, 10000.0
+        )
+        self.dwell_exposure_spin = QSpinBox()
+        self.dwell_exposure_spin.setPrefix("Exposure: ")
+        self.dwell_exposure_spin.setSuffix(" ms")
+        self.dwell_exposure_spin.setRange(1, 60_000)
+        self.dwell_exposure_spin.setValue(ADAPTIVE_DWELL_EXPOSURE_MS)
+        self.dwell_max_spin = QSpinBox()
+        self.dwell_max_spin.setPrefix("Max dwell: ")
+        self.dwell_max_spin.setSuffix(" ms")
+        self.dwell_max_spin.setRange(1, 600_000)
+        self.dwell_max_spin.setValue(ADAPTIVE_DWELL_MAX_MS)
+
+        for w in (self.dwell_snr, self.dwell_exposure_spin, self.dwell_max_spin):
+            w.setEnabled(False)
+            self.dwell_chk.toggled.connect(w.setEnabled)
+
+        # Sparse sampling: acquire part of the grid, reconstruct the maps
+        self.sparse_chk = QCheckBox("Sparse sampling")
+        self.sparse_fraction_spin = QSpinBox()
+        self.sparse_fraction_spin.setPrefix("Acquire: ")
+        self.sparse_fraction_spin.setSuffix(" % of points")
+        self.sparse_fraction_spin.setRange(1, 100)
+        self.sparse_fraction_spin.setValue(SPARSE_FRACTION_PERCENT)
+
+        self._sparse_patterns = [("Blue noise", BLUE_NOISE), ("Random", RANDOM)]
+        self.sparse_pattern_combo = QComboBox()
+        self.sparse_pattern_combo.addItems([p[0] for p in self._sparse_patterns])
+        self.sparse_pattern_combo.setCurrentIndex(
+            [p[1] for p in self._sparse_patterns].index(SPARSE_PATTERN)
+        )
+        self._sparse_methods = [
+            ("Biharmonic inpainting", BIHARMONIC),
+            ("TV inpainting", TV),
+            ("Low-rank cube", LOW_RANK),
+        ]
+        self.sparse_method_combo = QComboBox()
+        self.sparse_method_combo.addItems([m[0] for m in self._sparse_methods])
+        self.sparse_method_combo.setCurrentIndex(
+            [m[1] for m in self._sparse_methods].index(SPARSE_METHOD)
+        )
+
+        for w in (
+            self.sparse_fraction_spin,
+            self.sparse_pattern_combo,
+            self.sparse_method_combo,
+        ):
+            w.setEnabled(False)
+            self.sparse_chk.toggled.connect(w.setEnabled)
+
         self.raman_min = self._spin(
             "Raman Min",
             RAMAN_MIN_LIMIT,
@@ -272,6 +546,25 @@ class SidebarWidget(QScrollArea):
         for w in (
             self.step_x,
             self.step_y,
+            self.roi_shape_combo,
+            self.mask_combo,
+            self.z_stack_chk,
+            self.z_start,
+            self.z_stop,
+            self.step_z,
+            self.survey_chk,
+            self.survey_integration_spin,
+            self.survey_metric_combo,
+            self.survey_threshold,
+            self.survey_dilation_spin,
+            self.dwell_chk,
+            self.dwell_snr,
+            self.dwell_exposure_spin,
+            self.dwell_max_spin,
+            self.sparse_chk,
+            self.sparse_fraction_spin,
+            self.sparse_pattern_combo,
+            self.sparse_method_combo,
             self.raman_min,
             self.raman_max,
             self.status_lbl,
@@ -298,11 +591,38 @@ class SidebarWidget(QScrollArea):
         return {
             "step_size_x": float(self.step_x.value()),
             "step_size_y": float(self.step_y.value()),
+            "mask_threshold": self._mask_modes[self.mask_combo.currentIndex()][1],
+            "z_stack": self.z_stack_chk.isChecked(),
+            "z_start": float(self.z_start.value()),
+            "z_stop": float(self.z_stop.value()),
+            "step_size_z": float(self.step_z.value()),
+            "survey": self.survey_chk.isChecked(),
+            "survey_integration_ms": float(self.survey_integration_spin.value()),
+            "survey_metric": self._survey_metrics[
+                self.survey_metric_combo.currentIndex()
+            ][1],
+            "survey_threshold": float(self.survey_threshold.value()),
+            "survey_dilation": int(self.survey_dilation_spin.value()),
+            "adaptive_dwell": self.dwell_chk.isChecked(),
+            "dwell_target_snr": float(self.dwell_snr.value()),
+            "dwell_exposure_ms": float(self.dwell_exposure_spin.value()),
+            "dwell_max_ms": float(self.dwell_max_spin.value()),
+            "sparse": self.sparse_chk.isChecked(),
+            "sparse_fraction": self.sparse_fraction_spin.value() / 100.0,
+            "sparse_pattern": self._sparse_patterns[
+                self.sparse_pattern_combo.currentIndex()
+            ][1],
+            "sparse_method": self._sparse_methods[
+                self.sparse_method_combo.currentIndex()
+            ][1],
             "raman_min": float(self.raman_min.value()),
             "raman_max": float(self.raman_max.value()),
         }
     
     def get_camera_settings(self) -> dict:
+        _, raw_mode, raw_display = self._sensor_modes[
+            self.sensor_mode_combo.currentIndex()
+        ]
         return {
             "exposure_us": int(self.expo_spin.value()),
             "gain": int(self.gain_spin.value()),
@@ -310,9 +630,37 @@ class SidebarWidget(QScrollArea):
             "auto_white_balance": self.auto_wb_chk.isChecked(),
             "gamma": int(self.gamma_spin.value()),
             "contrast": int(self.contrast_spin.value()),
-            "binning": self.binning_combo.currentText(),
+            "binning": int(self.binning_combo.currentText().rstrip("x")),
+            "sensor_roi": self.sensor_roi_chk.isChecked(),
+            "raw_mode": raw_mode,
+            "raw_display": raw_display,
+            "stack_frames": int(self.stack_spin.value()),
+            "stack_align": self.stack_align_chk.isChecked(),
+        }
+
+    def get_mosaic_parameters(self) -> dict:
+        return {
+            "columns": int(self.mosaic_cols_spin.value()),
+            "rows": int(self.mosaic_rows_spin.value()),
+            "overlap": self.mosaic_overlap_spin.value() / 100.0,
+            "blend": self.mosaic_blend_chk.isChecked(),
+            "cover_roi": self.mosaic_roi_chk.isChecked(),
         }
 
+    def get_autofocus_parameters(self) -> dict:
+        return {
+            "z_range": float(self.af_range_spin.value()),
+            "metric": self._af_metrics[self.af_metric_combo.currentIndex()][1],
+        }
+
+    def set_autofocus_active(self, active: bool):
+        self.autofocus_btn.setEnabled(not active)
+        self.autofocus_btn.setText("Focusing…" if active else "Autofocus")
+
+    def set_mosaic_active(self, active: bool):
+        self.mosaic_btn.setText("Stop Mosaic" if active else "Acquire Mosaic")
+        self.mosaic_clear_btn.setEnabled(not active)
+
     def set_scan_active(self, active: bool):
         if active:
             self.scan_btn.setText("Stop scan")
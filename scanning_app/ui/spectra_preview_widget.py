@@ -1,11 +1,24 @@
-from PyQt6.QtCore import pyqtSignal
+import numpy as np
+from PyQt6.QtCore import QTimer, pyqtSignal
 from PyQt6.QtWidgets import QVBoxLayout, QWidget, QPushButton
 from loguru import logger
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 from matplotlib.widgets import SpanSelector
 
-from config import PLOT_DPI, RAMAN_MAX_LIMIT, RAMAN_MIN_LIMIT
+from config import (
+    PLOT_DPI,
+    RAMAN_MAX_LIMIT,
+    RAMAN_MIN_LIMIT,
+    SPECTRUM_REDRAW_MAX_FPS,
+)
+
+# Region statistics overlay
+REGION_COLOR = "#E65100"
+
+# A previewed spectrum is blitted into the current y range when it spans at
+# least this fraction of it; otherwise the axes are rescaled and redrawn.
+_MIN_Y_FILL = 0.5
 
 
 class SpectraPreviewWidget(QWidget):
@@ -23,6 +36,18 @@ class SpectraPreviewWidget(QWidget):
         self._raman_min = RAMAN_MIN_LIMIT
         self._raman_max = RAMAN_MAX_LIMIT
 
+        # Shown spectrum: the hovered one while previewing, else the last
+        # one set. Redraws are throttled to the screen refresh; requests in
+        # between only mark the plot stale, so the latest spectrum wins.
+        # The spectrum lines are animated: every full draw stores the axes
+        # without them, so a preview only blits the lines on top.
+        self._last_spectrum = None
+        self._preview = None
+        self._redraw_pending = False
+        self._redraw_timer = QTimer(self)
+        self._redraw_timer.setSingleShot(True)
+        self._redraw_timer.timeout.connect(self._on_redraw_timer)
+
         self.live_btn = QPushButton("Live")
         self.live_btn.setVisible(False)
         self.live_btn.clicked.connect(self._on_live_clicked)
@@ -30,6 +55,8 @@ class SpectraPreviewWidget(QWidget):
         self._init_ui()
         self._init_axes()
         self._show_empty_message()
+        # Before the span selector's, so its background includes the lines
+        self.canvas.mpl_connect("draw_event", self._on_draw)
         self.canvas.draw_idle()
 
         self._span = SpanSelector(
@@ -66,8 +93,19 @@ class SpectraPreviewWidget(QWidget):
         self.ax.set_ylabel("Intensity (a.u.)", fontsize=10)
         self.ax.set_xlim(RAMAN_MIN_LIMIT, RAMAN_MAX_LIMIT)
 
+        # Full spectrum and the part in the Raman band, updated in place
+        (self._full_line,) = self.ax.plot(
+            [], [], color="#B0B0B0", lw=1.0, zorder=1, animated=True
+        )
+        (self._band_line,) = self.ax.plot(
+            [], [], color="#1976D2", lw=1.6, zorder=2, animated=True
+        )
+        self._empty_text = None
+        self._background = None
+        self._region_artists = []
+
     def _show_empty_message(self):
-        self.ax.text(
+        self._empty_text = self.ax.text(
             0.5,
             0.5,
             "No spectrum acquired",
@@ -79,44 +117,169 @@ class SpectraPreviewWidget(QWidget):
         )
 
     def update_spectrum(self, raman_shifts, intensities):
-        if raman_shifts is None or intensities is None:
+        if not self._valid(raman_shifts, intensities):
             return
 
-        if len(raman_shifts) < 2 or len(intensities) < 2:
+        self._last_spectrum = (raman_shifts, intensities)
+        self._request_redraw()
+
+    def preview_spectrum(self, raman_shifts, intensities):
+        """Show a spectrum until ``end_preview``, e.g. the one under the
+        mouse; the spectrum set by ``update_spectrum`` is kept meanwhile."""
+        if not self._valid(raman_shifts, intensities):
             return
 
-        if len(raman_shifts) != len(intensities):
+        self._preview = (raman_shifts, intensities)
+        self._request_redraw()
+
+    def end_preview(self):
+        if self._preview is None:
+            return
+        self._preview = None
+        self._request_redraw()
+
+    def preview_point(self, point):
+        """``preview_spectrum`` of a scan point; None ends the preview."""
+        if point is None:
+            self.end_preview()
+        else:
+            self.preview_spectrum(point.raman_shifts, point.intensities)
+
+    def set_region_stats(self, stats):
+        """Overlay the mean, +-1 std band and min/max of a region's spectra
+        (``devices.region_stats.SpectralStats``); None removes it."""
+        for artist in self._region_artists:
+            artist.remove()
+        self._region_artists = []
+
+        if stats is not None:
+            self._remove_empty_message()
+            shifts, mean, std = stats.raman_shifts, stats.mean, stats.std
+            band = self.ax.fill_between(
+                shifts,
+                mean - std,
+                mean + std,
+                color=REGION_COLOR,
+                alpha=0.2,
+                lw=0,
+                zorder=3,
+                label="± 1 std",
+            )
+            (mean_line,) = self.ax.plot(
+                shifts,
+                mean,
+                color=REGION_COLOR,
+                lw=1.4,
+                zorder=4,
+                label=f"ROI mean ({stats.count} px)",
+            )
+            extreme_lines = [
+                self.ax.plot(
+                    shifts, values, color=REGION_COLOR, lw=0.8, ls=":", zorder=3
+                )[0]
+                for values in (stats.minimum, stats.maximum)
+            ]
+            extreme_lines[0].set_label("min / max")
+            legend = self.ax.legend(
+                handles=[mean_line, band, extreme_lines[0]],
+                loc="upper right",
+                fontsize=8,
+                frameon=False,
+            )
+            self._region_artists = [band, mean_line, *extreme_lines, legend]
+
+        self._request_redraw()
+
+    @staticmethod
+    def _valid(raman_shifts, intensities) -> bool:
+        if raman_shifts is None or intensities is None:
+            return False
+        if len(raman_shifts) < 2 or len(intensities) < 2:
+            return False
+        return len(raman_shifts) == len(intensities)
+
+    def _request_redraw(self):
+        if self._redraw_timer.isActive():
+            self._redraw_pending = True
+            return
+        self._redraw()
+        self._redraw_timer.start(self._redraw_interval_ms())
+
+    def _on_redraw_timer(self):
+        if self._redraw_pending:
+            self._redraw_pending = False
+            self._redraw()
+            self._redraw_timer.start(self._redraw_interval_ms())
+
+    def _redraw_interval_ms(self) -> int:
+        screen = self.screen()
+        fps = screen.refreshRate() if screen is not None else 0.0
+        if not fps > 0:
+            fps = SPECTRUM_REDRAW_MAX_FPS
+        return max(1, int(1000 / min(fps, SPECTRUM_REDRAW_MAX_FPS)))
+
+    def _remove_empty_message(self):
+        if self._empty_text is not None:
+            self._empty_text.remove()
+            self._empty_text = None
+
+    def _redraw(self):
+        spectrum = self._preview or self._last_spectrum
+        if spectrum is None:
+            # E.g. the preview ended before any spectrum was acquired
+            self._full_line.set_data([], [])
+            self._band_line.set_data([], [])
+            if not self._region_artists and self._empty_text is None:
+                self._show_empty_message()
+            self._rescale_and_draw()
             return
 
-        self._last_spectrum = (raman_shifts, intensities)
+        raman_shifts, intensities = spectrum
+        self._remove_empty_message()
+
+        mask = (raman_shifts >= self._raman_min) & (raman_shifts <= self._raman_max)
+        # The band line covers the full one: draw the latter only outside
+        # the band, up to and including the band's edge samples.
+        hidden = mask.copy()
+        hidden[:-1] &= mask[1:]
+        hidden[1:] &= mask[:-1]
+        self._full_line.set_data(
+            raman_shifts, np.where(hidden, np.nan, intensities)
+        )
+        self._band_line.set_data(raman_shifts[mask], intensities[mask])
+
+        if self._preview is not None and self._fits_y_range(intensities):
+            self.canvas.restore_region(self._background)
+            self._draw_lines()
+            for artist in self._span.artists:
+                if artist.get_visible():
+                    self.ax.draw_artist(artist)
+            self.canvas.blit(self.ax.bbox)
+            return
 
-        self._suppress_span_signal = True
-        try:
-            self._init_axes()
+        self._rescale_and_draw()
 
-            self.ax.plot(
-                raman_shifts,
-                intensities,
-                color="#B0B0B0",
-                lw=1.0,
-                zorder=1,
-            )
+    def _rescale_and_draw(self):
+        self.ax.relim()
+        self.ax.autoscale(axis="y")
+        self.canvas.draw_idle()
 
-            mask = (raman_shifts >= self._raman_min) & (raman_shifts <= self._raman_max)
+    def _fits_y_range(self, intensities) -> bool:
+        if self._background is None:
+            return False
+        low, high = float(np.nanmin(intensities)), float(np.nanmax(intensities))
+        y_min, y_max = self.ax.get_ylim()
+        return y_min <= low and high <= y_max and high - low >= _MIN_Y_FILL * (
+            y_max - y_min
+        )
 
-            self.ax.plot(
-                raman_shifts[mask],
-                intensities[mask],
-                color="#1976D2",
-                lw=1.6,
-                zorder=2,
-            )
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._draw_lines()
 
-            self.ax.relim()
-            self.ax.autoscale(axis="y")
-            self.canvas.draw_idle()
-        finally:
-            self._suppress_span_signal = False
+    def _draw_lines(self):
+        self.ax.draw_artist(self._full_line)
+        self.ax.draw_artist(self._band_line)
 
     def _on_click(self, event):
         if event.inaxes != self.ax or event.xdata is None:
@@ -141,8 +304,7 @@ class SpectraPreviewWidget(QWidget):
         self._raman_min = xmin
         self._raman_max = xmax
 
-        if hasattr(self, "_last_spectrum"):
-            self.update_spectrum(*self._last_spectrum)
+        self._request_redraw()
 
         self.raman_range_selected.emit(xmin, xmax)
 
@@ -157,18 +319,19 @@ class SpectraPreviewWidget(QWidget):
             finally:
                 self._suppress_span_signal = False
 
-        if hasattr(self, "_last_spectrum"):
-            self.update_spectrum(*self._last_spectrum)
+        self._request_redraw()
 
     def set_interactive(self, enabled: bool):
         if self._span is not None:
             self._span.set_active(enabled)
 
     def clear(self):
+        self._redraw_timer.stop()
+        self._redraw_pending = False
+        self._last_spectrum = None
+        self._preview = None
         self._init_axes()
         self._show_empty_message()
-        if hasattr(self, "_last_spectrum"):
-            delattr(self, "_last_spectrum")
         self.live_btn.setVisible(False)
         self.canvas.draw_idle()
 
@@ -50,8 +50,19 @@ class DeviceConnectionWidget(QWidget):
         self.combo.addItem(f"Select {self.device_name}...")
         self.combo.addItems(devices)
 
+    def add_devices(self, devices: list[str]) -> None:
+        existing = {self.combo.itemText(i) for i in range(self.combo.count())}
+        self.combo.addItems([d for d in devices if d not in existing])
+
+    def set_busy(self, message: str) -> None:
+        self.status_label.setText(f"Status: {message}")
+        self.status_label.setStyleSheet("color: #777; font-size: 11px;")
+        self.connect_btn.setEnabled(False)
+        self.combo.setEnabled(False)
+
     def set_connected(self, connected: bool, info: str = "") -> None:
         self._connected = connected
+        self.connect_btn.setEnabled(True)
 
         if connected:
             self.status_label.setText(f"Status: Connected {info}")
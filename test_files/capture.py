@@ -1,11 +1,14 @@
 import toupcam
 import ctypes
+import threading
 import numpy as np
 from PIL import Image
-import time
 
-def event_cb(n_event, ctx):
-    pass
+STILL_TIMEOUT_S = 2.0
+
+def event_cb(n_event, still_ready):
+    if n_event == toupcam.TOUPCAM_EVENT_STILLIMAGE:
+        still_ready.set()
 
 def capture():
     hcam = toupcam.Toupcam.Open(None)
@@ -15,12 +18,15 @@ def capture():
     w, h = hcam.get_Size()
 
     hcam.put_AutoExpoEnable(0)
-    hcam.put_ExpoTime(10000)      
-    hcam.put_ExpoAGain(100)      
-
-    hcam.StartPullModeWithCallback(event_cb, None)
-    hcam.Snap(0)
-    time.sleep(0.3)
+    hcam.put_ExpoTime(10000)
+    hcam.put_ExpoAGain(100)
+
+    still_ready = threading.Event()
+    hcam.StartPullModeWithCallback(event_cb, still_ready)
+    hcam.Snap(0xffffffff)  # current preview resolution, matches get_Size()
+    if not still_ready.wait(STILL_TIMEOUT_S + 2 * hcam.get_ExpoTime() / 1e6):
+        hcam.Close()
+        raise TimeoutError("still image not delivered")
 
     buf = ctypes.create_string_buffer(w * h * 3)
     hcam.PullStillImageV2(buf, 24, None)